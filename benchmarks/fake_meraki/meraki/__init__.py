@@ -0,0 +1,443 @@
+"""
+Offline stand-in for the Meraki Dashboard SDK, used by run_benchmarks.py.
+
+Putting benchmarks/fake_meraki first on PYTHONPATH makes `import meraki` load this
+module instead of the real SDK, so the importers run unmodified against a synthetic
+organization. Everything is configured through environment variables:
+
+    MERAKI_BENCH_NETWORKS       networks in the organization (default 50)
+    MERAKI_BENCH_SWITCHES       switches per network (default 2)
+    MERAKI_BENCH_APS            access points per network (default 2)
+    MERAKI_BENCH_SSIDS          SSIDs per network (default 4)
+    MERAKI_BENCH_VLANS          MX VLANs per network (default 4)
+    MERAKI_BENCH_PORTS          ports per switch (default 24)
+    MERAKI_BENCH_LATENCY        seconds per request (default 0.05)
+    MERAKI_BENCH_JITTER         extra random latency, up to this many seconds (default 0)
+    MERAKI_BENCH_429_RATE       probability that a request answers 429 (default 0)
+    MERAKI_BENCH_RATE_LIMIT     requests per second before answering 429, 0 = unlimited (default 0)
+    MERAKI_BENCH_RETRY_AFTER    Retry-After seconds sent with a 429 (default 1)
+    MERAKI_BENCH_ACTION_SECONDS seconds an action batch takes per action (default 0.02)
+    MERAKI_BENCH_STATS          file to append this process' call counts to, as one JSON line
+
+Paginated endpoints go through a session like the SDK's: each page is one request
+(and one latency), capped at the endpoint's maximum perPage, and links to the next
+page with an opaque cursor in its Link header.
+Action batches are accepted with the real limits (100 actions, 5 running batches per
+organization), complete asynchronously after their per-action time, and fail if an
+action targets an unknown network.
+"""
+
+import atexit
+import base64
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+ORG_ID = "900000"
+ORG_NAME = "Bench Org"
+
+
+def _env(name, default, cast=float):
+    return cast(os.environ.get(f"MERAKI_BENCH_{name}", default))
+
+
+NETWORKS = _env("NETWORKS", 50, int)
+SWITCHES = _env("SWITCHES", 2, int)
+APS = _env("APS", 2, int)
+SSIDS = _env("SSIDS", 4, int)
+VLANS = _env("VLANS", 4, int)
+PORTS = _env("PORTS", 24, int)
+LATENCY = _env("LATENCY", 0.05)
+JITTER = _env("JITTER", 0)
+RATE_429 = _env("429_RATE", 0)
+RATE_LIMIT = _env("RATE_LIMIT", 0)
+RETRY_AFTER = _env("RETRY_AFTER", 1)
+ACTION_SECONDS = _env("ACTION_SECONDS", 0.02)
+STATS_FILE = os.environ.get("MERAKI_BENCH_STATS")
+
+_lock = threading.Lock()
+_random = random.Random(2188)
+_stats = {"requests": 0, "throttled": 0, "endpoints": {}}
+_window = {"second": 0, "count": 0}
+
+
+class _Response:
+    def __init__(self, status, headers):
+        self.status_code = status
+        self.headers = headers
+        self.reason = "Too Many Requests" if status == 429 else "Error"
+
+
+class APIError(Exception):
+    """
+    Mirrors meraki.exceptions.APIError: status, message and the HTTP response.
+    """
+
+    def __init__(self, operation, status, message, headers=None):
+        self.operation = operation
+        self.status = status
+        self.message = message
+        self.response = _Response(status, headers or {})
+        super().__init__(f"{operation}, {status} - {message}")
+
+
+def _request(operation):
+    """
+    Account for one HTTP request: sleep for the configured latency, then answer 429
+    when throttled (randomly or above the rate limit).
+    """
+    with _lock:
+        _stats["requests"] += 1
+        _stats["endpoints"][operation] = _stats["endpoints"].get(operation, 0) + 1
+        throttled = RATE_429 > 0 and _random.random() < RATE_429
+        if RATE_LIMIT > 0:
+            second = int(time.monotonic())
+            if second != _window["second"]:
+                _window["second"], _window["count"] = second, 0
+            _window["count"] += 1
+            throttled = throttled or _window["count"] > RATE_LIMIT
+        if throttled:
+            _stats["throttled"] += 1
+        delay = LATENCY + (_random.random() * JITTER if JITTER else 0)
+    time.sleep(delay)
+    if throttled:
+        raise APIError(operation, 429, "Too Many Requests", {"Retry-After": str(RETRY_AFTER)})
+
+
+class _PageResponse:
+    """
+    One page of a listing, as much of an httpx.Response as the SDK's paging uses.
+    """
+
+    def __init__(self, items, links):
+        self.status_code = 200
+        self.links = links
+        self._items = items
+
+    def json(self):
+        return self._items
+
+    def close(self):
+        pass
+
+
+class _Session:
+    """
+    Mirrors the SDK's session for paginated list calls: get_pages() requests page after
+    page through request(), which serves one page per call and links the next one.
+    Cursors are opaque tokens, not item IDs.
+    """
+
+    def __init__(self):
+        self._listings = {}
+
+    def listing(self, operation, list_items, max_per_page, default_per_page):
+        self._listings[operation] = (list_items, max_per_page, default_per_page)
+
+    def request(self, metadata, method, url, params=None):
+        operation = metadata["operation"]
+        path, _, query = url.partition("?")
+        params = dict(params or {})
+        for key, value in urllib.parse.parse_qsl(query):
+            if key.endswith("[]"):
+                params.setdefault(key, []).append(value)
+            else:
+                params[key] = value
+        _request(operation)
+        list_items, max_per_page, default_per_page = self._listings[operation]
+        items = list_items(path, params)
+        per_page = min(int(params.get("perPage", default_per_page)), max_per_page)
+        cursor = params.pop("startingAfter", None)
+        start = int(base64.urlsafe_b64decode(cursor).decode()) if cursor else 0
+        links = {}
+        if start + per_page < len(items):
+            token = base64.urlsafe_b64encode(str(start + per_page).encode()).decode()
+            links["next"] = {"url": f"{path}?{urllib.parse.urlencode(dict(params, startingAfter=token), doseq=True)}"}
+        return _PageResponse(items[start:start + per_page], links)
+
+    def get_pages(self, metadata, url, params=None, total_pages=1, direction="next"):
+        total_pages = -1 if total_pages == "all" else int(total_pages)
+        items = []
+        while url and total_pages != 0:
+            response = self.request(metadata, "GET", url, params=params)
+            items.extend(response.json())
+            url, params = response.links.get("next", {}).get("url"), None
+            total_pages -= 1
+        return items
+
+
+def _list_params(kwargs, query_params, array_params=()):
+    params = {k: v for k, v in kwargs.items() if k in query_params}
+    params.update({f"{k}[]": v for k, v in kwargs.items() if k in array_params})
+    return params
+
+
+def _write_stats():
+    if STATS_FILE:
+        with open(STATS_FILE, "a") as f:
+            f.write(json.dumps(_stats) + "\n")
+
+
+atexit.register(_write_stats)
+
+
+# ----------------------------- Synthetic organization ----------------------------- #
+
+def _network(i):
+    return {
+        "id": f"L_{100000 + i}",
+        "organizationId": ORG_ID,
+        "name": f"Bench Net {i:05d}",
+        "productTypes": ["appliance", "switch", "wireless"],
+        "timeZone": ("America/Los_Angeles", "Europe/Amsterdam", "Asia/Tokyo")[i % 3],
+        "tags": [("east", "west", "central")[i % 3]],
+        "enrollmentString": None,
+        "url": f"https://n1.meraki.com/bench-{i}/manage/usage/list",
+        "notes": "",
+        "isBoundToConfigTemplate": False,
+    }
+
+
+def _devices(i):
+    net_id = _network(i)["id"]
+    models = [("appliance", "MX68")] + [("switch", "MS120-24P")] * SWITCHES + [("wireless", "MR36")] * APS
+    return [
+        {
+            "name": f"bench-{i}-{j}",
+            "serial": f"Q2BN-{i:05d}-{j:03d}",
+            "mac": f"00:18:0a:{i // 256 % 256:02x}:{i % 256:02x}:{j:02x}",
+            "networkId": net_id,
+            "productType": product,
+            "model": model,
+            "address": "",
+            "lat": 37.4,
+            "lng": -122.0,
+            "firmware": f"{product}-18-107",
+            "tags": [],
+        }
+        for j, (product, model) in enumerate(models)
+    ]
+
+
+_NETWORKS = [_network(i) for i in range(NETWORKS)]
+_NETWORK_INDEX = {net["id"]: i for i, net in enumerate(_NETWORKS)}
+_ACTION_BATCHES = {}
+
+
+def _index(network_id):
+    if network_id not in _NETWORK_INDEX:
+        raise APIError("lookup", 404, "Not found")
+    return _NETWORK_INDEX[network_id]
+
+
+def _ports(serial):
+    return [
+        {
+            "portId": str(p),
+            "name": None,
+            "tags": [],
+            "enabled": True,
+            "poeEnabled": True,
+            "type": "access",
+            "vlan": 1 + p % max(VLANS, 1),
+            "voiceVlan": None,
+            "allowedVlans": "all",
+            "rstpEnabled": True,
+            "stpGuard": "disabled",
+            "linkNegotiation": "Auto negotiate",
+        }
+        for p in range(1, PORTS + 1)
+    ]
+
+
+class Organizations:
+    def __init__(self, session):
+        self._session = session
+        session.listing("getOrganizationNetworks", lambda path, params: _NETWORKS, 100000, 1000)
+        session.listing("getOrganizationDevices", self._list_devices, 1000, 1000)
+        session.listing("getOrganizationConfigurationChanges", lambda path, params: [], 100000, 5000)
+
+    @staticmethod
+    def _list_devices(path, params):
+        network_ids = params.get("networkIds[]")
+        if isinstance(network_ids, str):
+            network_ids = [network_ids]
+        indexes = [_index(net_id) for net_id in network_ids] if network_ids else range(NETWORKS)
+        return [d for i in indexes for d in _devices(i)]
+
+    def getOrganizations(self, **kwargs):
+        _request("getOrganizations")
+        return [{"id": ORG_ID, "name": ORG_NAME, "url": "https://n1.meraki.com/o/bench/manage/organization/overview"}]
+
+    def getOrganizationNetworks(self, organizationId, total_pages=1, direction="next", **kwargs):
+        metadata = {"tags": ["organizations"], "operation": "getOrganizationNetworks"}
+        params = _list_params(kwargs, ("perPage", "startingAfter", "endingBefore", "tags"))
+        return self._session.get_pages(metadata, f"/organizations/{organizationId}/networks", params,
+                                       total_pages, direction)
+
+    def getOrganizationDevices(self, organizationId, total_pages=1, direction="next", **kwargs):
+        metadata = {"tags": ["organizations"], "operation": "getOrganizationDevices"}
+        params = _list_params(kwargs, ("perPage", "startingAfter", "endingBefore"), ("networkIds", "serials"))
+        return self._session.get_pages(metadata, f"/organizations/{organizationId}/devices", params,
+                                       total_pages, direction)
+
+    def getOrganizationConfigurationChanges(self, organizationId, total_pages=1, direction="prev", **kwargs):
+        metadata = {"tags": ["organizations"], "operation": "getOrganizationConfigurationChanges"}
+        params = _list_params(kwargs, ("t0", "t1", "timespan", "perPage", "startingAfter", "endingBefore"))
+        return self._session.get_pages(metadata, f"/organizations/{organizationId}/configurationChanges", params,
+                                       total_pages, direction)
+
+    def createOrganizationNetwork(self, organizationId, name, productTypes, **kwargs):
+        _request("createOrganizationNetwork")
+        with _lock:
+            if any(net["name"] == name for net in _NETWORKS):
+                raise APIError("createOrganizationNetwork", 400, f"Name {name} is already in use")
+            net = dict(_network(len(_NETWORKS)), name=name, productTypes=list(productTypes),
+                       tags=kwargs.get("tags", []), timeZone=kwargs.get("timeZone", "America/Los_Angeles"),
+                       notes=kwargs.get("notes", ""))
+            _NETWORK_INDEX[net["id"]] = len(_NETWORKS)
+            _NETWORKS.append(net)
+        return net
+
+    def createOrganizationActionBatch(self, organizationId, actions, confirmed=False, synchronous=False, **kwargs):
+        _request("createOrganizationActionBatch")
+        if len(actions) > (20 if synchronous else 100):
+            raise APIError("createOrganizationActionBatch", 400, "Too many actions in the batch")
+        now = time.monotonic()
+        with _lock:
+            running = sum(1 for b in _ACTION_BATCHES.values() if b["confirmed"] and b["done_at"] > now)
+            if confirmed and running >= 5:
+                raise APIError("createOrganizationActionBatch", 400,
+                               "Too many concurrently executing batches. Maximum is 5 confirmed but not yet executed batches.")
+            batch_id = str(len(_ACTION_BATCHES) + 1)
+            errors = [
+                f"Action {i}: network {a['resource'].split('/')[2]} not found" for i, a in enumerate(actions)
+                if a["resource"].startswith("/networks/") and a["resource"].split("/")[2] not in _NETWORK_INDEX
+            ]
+            _ACTION_BATCHES[batch_id] = {"confirmed": confirmed, "done_at": now + ACTION_SECONDS * len(actions),
+                                         "errors": errors[:1], "actions": actions}
+        return self.getOrganizationActionBatch(organizationId, batch_id, _count=False)
+
+    def getOrganizationActionBatch(self, organizationId, actionBatchId, _count=True):
+        if _count:
+            _request("getOrganizationActionBatch")
+        batch = _ACTION_BATCHES.get(actionBatchId)
+        if batch is None:
+            raise APIError("getOrganizationActionBatch", 404, "Not found")
+        done = batch["confirmed"] and time.monotonic() >= batch["done_at"]
+        return {
+            "id": actionBatchId, "organizationId": organizationId, "confirmed": batch["confirmed"],
+            "synchronous": False, "actions": batch["actions"],
+            "status": {"completed": done and not batch["errors"], "failed": done and bool(batch["errors"]),
+                       "errors": batch["errors"] if done else [], "createdResources": []},
+        }
+
+
+class Networks:
+    def getNetwork(self, networkId):
+        _request("getNetwork")
+        return dict(_NETWORKS[_index(networkId)])
+
+    def getNetworkDevices(self, networkId):
+        _request("getNetworkDevices")
+        i = _index(networkId)
+        return _devices(i) if i < NETWORKS else []
+
+    def getNetworkWebhooksHttpServers(self, networkId):
+        _request("getNetworkWebhooksHttpServers")
+        i = _index(networkId)
+        return [{"id": f"aHR0cHM6Ly9iZW5jaC{i}", "name": "SIEM", "url": "https://siem.example.com/hook",
+                 "networkId": networkId, "payloadTemplate": {"payloadTemplateId": "wpt_00001", "name": "Meraki (included)"}}]
+
+    def getNetworkAlertsSettings(self, networkId):
+        _request("getNetworkAlertsSettings")
+        _index(networkId)
+        return {
+            "defaultDestinations": {"emails": ["noc@example.com"], "allAdmins": False, "snmp": False, "httpServerIds": []},
+            "alerts": [
+                {"type": alert, "enabled": True, "alertDestinations": {"emails": [], "allAdmins": False,
+                                                                       "snmp": False, "httpServerIds": []}, "filters": {}}
+                for alert in ("gatewayDown", "repeaterDown", "switchDown", "settingsChanged", "vpnConnectivityChange")
+            ],
+        }
+
+
+class Appliance:
+    def getNetworkApplianceVlans(self, networkId):
+        _request("getNetworkApplianceVlans")
+        i = _index(networkId)
+        return [
+            {"id": 10 * (v + 1), "networkId": networkId, "name": f"vlan-{v}",
+             "applianceIp": f"10.{i % 250}.{v}.1", "subnet": f"10.{i % 250}.{v}.0/24",
+             "fixedIpAssignments": {}, "reservedIpRanges": [], "dnsNameservers": "upstream_dns", "dhcpHandling": "Run a DHCP server"}
+            for v in range(VLANS)
+        ]
+
+    def getNetworkApplianceFirewallL3FirewallRules(self, networkId):
+        _request("getNetworkApplianceFirewallL3FirewallRules")
+        _index(networkId)
+        return {"rules": [
+            {"comment": "Block guest to corp", "policy": "deny", "protocol": "any", "srcPort": "Any",
+             "srcCidr": "10.0.30.0/24", "destPort": "Any", "destCidr": "10.0.10.0/24", "syslogEnabled": False},
+            {"comment": "Default rule", "policy": "allow", "protocol": "Any", "srcPort": "Any",
+             "srcCidr": "Any", "destPort": "Any", "destCidr": "Any", "syslogEnabled": False},
+        ]}
+
+
+class Wireless:
+    def getNetworkWirelessSsids(self, networkId):
+        _request("getNetworkWirelessSsids")
+        _index(networkId)
+        return [
+            {"number": n, "name": f"Bench SSID {n}", "enabled": n < SSIDS // 2 + 1, "splashPage": "None",
+             "ssidAdminAccessible": False, "authMode": "psk", "psk": "benchmark-psk", "encryptionMode": "wpa",
+             "wpaEncryptionMode": "WPA2 only", "ipAssignmentMode": "Bridge mode", "useVlanTagging": True,
+             "defaultVlanId": 10 * (n % max(VLANS, 1) + 1), "visible": True, "availableOnAllAps": True}
+            for n in range(SSIDS)
+        ]
+
+    def getNetworkWirelessSettings(self, networkId):
+        _request("getNetworkWirelessSettings")
+        _index(networkId)
+        return {"meshingEnabled": False, "ipv6BridgeEnabled": False, "locationAnalyticsEnabled": False,
+                "ledLightsOn": True, "upgradeStrategy": "minimizeUpgradeTime"}
+
+
+class Switch:
+    def __init__(self, session):
+        self._session = session
+        session.listing("getOrganizationSwitchPortsBySwitch", self._list_switches, 50, 50)
+
+    @staticmethod
+    def _list_switches(path, params):
+        network_ids = params.get("networkIds[]") or []
+        network_ids = {network_ids} if isinstance(network_ids, str) else set(network_ids)
+        return [
+            {"name": d["name"], "serial": d["serial"], "mac": d["mac"], "model": d["model"],
+             "network": {"id": d["networkId"], "name": _NETWORKS[i]["name"]}, "ports": _ports(d["serial"])}
+            for i in range(NETWORKS) for d in _devices(i)
+            if d["productType"] == "switch" and (not network_ids or d["networkId"] in network_ids)
+        ]
+
+    def getDeviceSwitchPorts(self, serial):
+        _request("getDeviceSwitchPorts")
+        return _ports(serial)
+
+    def getOrganizationSwitchPortsBySwitch(self, organizationId, total_pages=1, direction="next", **kwargs):
+        metadata = {"tags": ["switch"], "operation": "getOrganizationSwitchPortsBySwitch"}
+        params = _list_params(kwargs, ("perPage", "startingAfter", "endingBefore"), ("networkIds", "serials"))
+        return self._session.get_pages(metadata, f"/organizations/{organizationId}/switch/ports/bySwitch", params,
+                                       total_pages, direction)
+
+
+class DashboardAPI:
+    def __init__(self, api_key=None, base_url=None, **kwargs):
+        self._session = _Session()
+        self.organizations = Organizations(self._session)
+        self.networks = Networks()
+        self.appliance = Appliance()
+        self.wireless = Wireless()
+        self.switch = Switch(self._session)
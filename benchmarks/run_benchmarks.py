@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py
+
+Offline benchmark for the Meraki importers. The real scripts are run end to end, as
+subprocesses, against a synthetic organization served by the fake SDK in
+benchmarks/fake_meraki (see its docstring for the knobs), with a no-op terraform from
+benchmarks/fake_bin on PATH. Nothing talks to the Dashboard or downloads providers.
+
+Scenarios:
+  brownfield        brownfield/import_meraki.py, once per --workers value
+  workspace         workspaces/import_meraki_workspace.py
+  generate_imports  workspaces/generate_imports.py, on the workspace scenario's output
+  apply             greenfield/apply_meraki.py, creating --networks copies of the
+                    network_ironman site through action batches
+
+For each run the report gives wall time, Dashboard requests (and how many were
+answered 429), peak RSS and the files/bytes written. Use --report to save it as JSON
+and --compare to diff against an earlier report, failing when wall time or request
+count regressed by more than --max_regression.
+
+Usage:
+    python3 benchmarks/run_benchmarks.py --networks 200 --latency 0.05 --workers 4,8,16
+    python3 benchmarks/run_benchmarks.py --report after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+FAKE_SDK_DIR = BENCH_DIR / "fake_meraki"
+FAKE_BIN_DIR = BENCH_DIR / "fake_bin"
+
+SCENARIOS = ("brownfield", "workspace", "generate_imports", "apply")
+SITE_TEMPLATE = REPO_DIR / "greenfield" / "network_ironman"
+
+# Must match benchmarks/fake_meraki/meraki.
+ORG_NAME = "Bench Org"
+API_KEY = "benchmark"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Meraki importers against a synthetic organization")
+    parser.add_argument("--networks", type=int, default=50, help="Networks in the organization (default: 50)")
+    parser.add_argument("--switches", type=int, default=2, help="Switches per network (default: 2)")
+    parser.add_argument("--aps", type=int, default=2, help="Access points per network (default: 2)")
+    parser.add_argument("--ssids", type=int, default=4, help="SSIDs per network (default: 4)")
+    parser.add_argument("--vlans", type=int, default=4, help="MX VLANs per network (default: 4)")
+    parser.add_argument("--ports", type=int, default=24, help="Ports per switch (default: 24)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per Dashboard request (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency per request, in seconds")
+    parser.add_argument("--error_rate_429", type=float, default=0.0,
+                        help="Probability that a request is answered with 429 (default: 0)")
+    parser.add_argument("--server_rate_limit", type=float, default=0.0,
+                        help="Requests per second the fake Dashboard accepts before answering 429 (default: unlimited)")
+    parser.add_argument("--rate_limit", type=float, default=None,
+                        help="--rate_limit passed to the importers (default: the importers' own default)")
+    parser.add_argument("--workers", default="8",
+                        help="Comma-separated brownfield --workers values to run, e.g. 4,8,16 (default: 8)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios to run (default: {','.join(SCENARIOS)})")
+    parser.add_argument("--brownfield_args", default="", help="Extra arguments for import_meraki.py")
+    parser.add_argument("--workspace_args", default="", help="Extra arguments for import_meraki_workspace.py")
+    parser.add_argument("--generate_imports_args", default="", help="Extra arguments for generate_imports.py")
+    parser.add_argument("--apply_args", default="", help="Extra arguments for apply_meraki.py")
+    parser.add_argument("--work_dir", default=None, help="Keep the runs' output here instead of a temporary directory")
+    parser.add_argument("--report", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="Earlier --report to compare against")
+    parser.add_argument("--max_regression", type=float, default=0.2,
+                        help="With --compare, fail if wall time or requests grew by more than this fraction (default: 0.2)")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    try:
+        args.workers = [int(w) for w in args.workers.split(",") if w.strip()]
+    except ValueError:
+        parser.error("--workers must be a comma-separated list of integers")
+    return args
+
+
+def fake_environment(args, stats_file: Path) -> dict:
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(FAKE_SDK_DIR), env.get("PYTHONPATH")]))
+    env["PATH"] = os.pathsep.join([str(FAKE_BIN_DIR), env.get("PATH", "")])
+    env.update({
+        "MERAKI_BENCH_NETWORKS": str(args.networks),
+        "MERAKI_BENCH_SWITCHES": str(args.switches),
+        "MERAKI_BENCH_APS": str(args.aps),
+        "MERAKI_BENCH_SSIDS": str(args.ssids),
+        "MERAKI_BENCH_VLANS": str(args.vlans),
+        "MERAKI_BENCH_PORTS": str(args.ports),
+        "MERAKI_BENCH_LATENCY": str(args.latency),
+        "MERAKI_BENCH_JITTER": str(args.jitter),
+        "MERAKI_BENCH_429_RATE": str(args.error_rate_429),
+        "MERAKI_BENCH_RATE_LIMIT": str(args.server_rate_limit),
+        "MERAKI_BENCH_STATS": str(stats_file),
+        "TF_PLUGIN_CACHE_DIR": str(stats_file.parent / "plugin-cache"),
+    })
+    return env
+
+
+def write_sites(directory: Path, count: int):
+    """
+    Copy the network_ironman greenfield site count times, each with its own network
+    name; returns the site directories relative to directory's parent.
+    """
+    sites = []
+    for i in range(count):
+        site = directory / f"site_{i:05d}"
+        if site.exists():
+            shutil.rmtree(site)
+        shutil.copytree(SITE_TEMPLATE, site)
+        network_yaml = site / "network.yaml"
+        network_yaml.write_text(network_yaml.read_text().replace('name: "IronMan"', f'name: "Bench Site {i:05d}"'))
+        sites.append(str(site.relative_to(directory.parent)))
+    return sites
+
+
+def tree_size(path: Path):
+    """
+    (files, bytes) under path, not counting the response cache.
+    """
+    files = size = 0
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if d != ".meraki_cache"]
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def run_scenario(name, cmd, cwd: Path, env: dict, stats_file: Path) -> dict:
+    """
+    Run one importer to completion and measure it.
+    """
+    if stats_file.exists():
+        stats_file.unlink()
+    before = tree_size(cwd)
+    log_path = cwd.parent / f"{cwd.name}.log"
+    print(f"▶ {name}: {' '.join(shlex.quote(c) for c in cmd)}")
+    start = time.monotonic()
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(cmd, cwd=str(cwd), env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, rusage = os.wait4(proc.pid, 0)
+    wall = time.monotonic() - start
+    returncode = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status >> 8
+
+    requests = throttled = 0
+    endpoints = {}
+    if stats_file.exists():
+        for line in stats_file.read_text().splitlines():
+            stats = json.loads(line)
+            requests += stats["requests"]
+            throttled += stats["throttled"]
+            for endpoint, count in stats["endpoints"].items():
+                endpoints[endpoint] = endpoints.get(endpoint, 0) + count
+
+    after = tree_size(cwd)
+    result = {
+        "scenario": name,
+        "returncode": returncode,
+        "wall_seconds": round(wall, 2),
+        "requests": requests,
+        "throttled": throttled,
+        "peak_rss_mb": round(rusage.ru_maxrss / 1024.0, 1),
+        "files_written": after[0] - before[0],
+        "bytes_written": after[1] - before[1],
+        "endpoints": dict(sorted(endpoints.items(), key=lambda kv: -kv[1])),
+        "log": str(log_path),
+    }
+    status_mark = "✅" if returncode == 0 else f"❌ exit {returncode}"
+    print(f"  {status_mark} {result['wall_seconds']}s, {requests} requests ({throttled} throttled), "
+          f"{result['peak_rss_mb']} MB peak RSS, {result['files_written']} files / {result['bytes_written']} bytes")
+    return result
+
+
+def run_all(args, work_dir: Path):
+    stats_file = work_dir / "requests.jsonl"
+    env = fake_environment(args, stats_file)
+    rate = ["--rate_limit", str(args.rate_limit)] if args.rate_limit else []
+    results = []
+
+    if "brownfield" in args.scenarios:
+        for workers in args.workers:
+            run_dir = work_dir / f"brownfield_w{workers}"
+            run_dir.mkdir(parents=True, exist_ok=True)
+            cmd = [sys.executable, str(REPO_DIR / "brownfield" / "import_meraki.py"),
+                   "--api_key", API_KEY, "--org_name", ORG_NAME, "--workers", str(workers), "--no_cache",
+                   *rate, *shlex.split(args.brownfield_args)]
+            results.append(run_scenario(f"brownfield (workers={workers})", cmd, run_dir, env, stats_file))
+
+    workspace_dir = work_dir / "workspace"
+    if "workspace" in args.scenarios or "generate_imports" in args.scenarios:
+        workspace_dir.mkdir(parents=True, exist_ok=True)
+        cmd = [sys.executable, str(REPO_DIR / "workspaces" / "import_meraki_workspace.py"),
+               "--api_key", API_KEY, "--org_name", ORG_NAME, "--output_dir", ".", "--no_cache",
+               *rate, *shlex.split(args.workspace_args)]
+        result = run_scenario("workspace", cmd, workspace_dir, env, stats_file)
+        if "workspace" in args.scenarios:
+            results.append(result)
+
+    if "generate_imports" in args.scenarios:
+        cmd = [sys.executable, str(REPO_DIR / "workspaces" / "generate_imports.py"),
+               *shlex.split(args.generate_imports_args)]
+        results.append(run_scenario("generate_imports", cmd, workspace_dir, env, stats_file))
+
+    if "apply" in args.scenarios:
+        apply_dir = work_dir / "apply"
+        apply_dir.mkdir(parents=True, exist_ok=True)
+        sites = write_sites(apply_dir / "sites", args.networks)
+        cmd = [sys.executable, str(REPO_DIR / "greenfield" / "apply_meraki.py"),
+               "--api_key", API_KEY, "--org_name", ORG_NAME, *rate, *shlex.split(args.apply_args), *sites]
+        results.append(run_scenario("apply", cmd, apply_dir, env, stats_file))
+
+    return results
+
+
+def compare(results, baseline_path, max_regression: float) -> bool:
+    """
+    Print wall time and request deltas against an earlier report; return False if any
+    scenario regressed by more than max_regression.
+    """
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if before is None:
+            print(f"  {result['scenario']}: not in baseline")
+            continue
+        for metric in ("wall_seconds", "requests", "peak_rss_mb", "bytes_written"):
+            old, new = before.get(metric, 0), result[metric]
+            change = (new - old) / old if old else 0.0
+            regressed = metric in ("wall_seconds", "requests") and change > max_regression
+            ok = ok and not regressed
+            print(f"  {result['scenario']:<28} {metric:<14} {old:>12} → {new:<12} {change:+.1%}"
+                  f"{'  ⚠️ regression' if regressed else ''}")
+    return ok
+
+
+def main():
+    args = parse_args()
+    if args.work_dir:
+        work_dir = Path(args.work_dir).resolve()
+        work_dir.mkdir(parents=True, exist_ok=True)
+        results = run_all(args, work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="meraki-bench-") as tmp:
+            results = run_all(args, Path(tmp))
+
+    report = {
+        "parameters": {
+            k: getattr(args, k) for k in (
+                "networks", "switches", "aps", "ssids", "vlans", "ports", "latency", "jitter",
+                "error_rate_429", "server_rate_limit", "rate_limit", "workers",
+            )
+        },
+        "results": results,
+    }
+    print(f"\n{'scenario':<28} {'wall s':>8} {'requests':>9} {'429s':>6} {'RSS MB':>8} {'files':>7} {'bytes':>12}")
+    for r in results:
+        print(f"{r['scenario']:<28} {r['wall_seconds']:>8} {r['requests']:>9} {r['throttled']:>6} "
+              f"{r['peak_rss_mb']:>8} {r['files_written']:>7} {r['bytes_written']:>12}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+    failed = any(r["returncode"] != 0 for r in results)
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
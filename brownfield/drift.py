@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+drift.py
+
+Detect drift between the Dashboard and an exported data tree, without Terraform.
+
+Live configuration is fetched for the selected networks concurrently (through the
+same rate-limited scheduler as the importers) and compared, service by service, with
+the files written by import_meraki.py or import_meraki_workspace.py. The layout is
+detected from --path:
+
+  brownfield  <path>/data/<yaml|json>/<org>/<network>_<id>.<yaml|json>, the combined
+              per-network documents (network, devices, vlans, ssids, firewallRules,
+              switchPorts, wirelessSettings, webhook_receivers, alert_settings)
+  workspace   <path>/data/<network>/<service>.<yaml|json>, with network IDs read from
+              terraform.tfvars (or stacks/*/terraform.tfvars)
+
+The comparison is structural: dictionaries by key, lists of records by their identity
+field (number, id, serial, portId, type) and other lists by position. Volatile fields
+(VOLATILE_FIELDS, plus --ignore) are skipped. They are given as paths with [] for any
+list record, e.g. devices[].firmware; a bare field name given with --ignore is skipped
+at any depth. A service the Dashboard refuses
+(e.g. VLANs on a network without them) counts as empty, as it does in the exporters.
+
+The JSON report lists every difference per network and service:
+
+  {"path": "ssids[number=3].enabled", "change": "changed", "exported": true, "live": false}
+
+plus networks that exist on only one side. The exit code is 0 without drift, 2 with
+drift and 1 if the sweep could not run.
+
+Usage:
+    python3 drift.py --api_key <KEY> --org_name "<ORG>" --path . [--network_regex ...] [--report drift_report.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import meraki
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+import dashboard_scheduler
+import network_filter
+import org_inventory
+import serialization
+
+# Fields that change without anyone changing the configuration, by path.
+VOLATILE_FIELDS = {
+    "network.url",
+    "devices[].firmware", "devices[].lanIp", "devices[].status", "devices[].lastReportedAt",
+    "ssids[].adminSplashUrl",
+}
+
+# Identity fields of list records, in order of preference.
+RECORD_KEYS = ("number", "id", "serial", "portId", "type")
+
+# Device fields kept in the brownfield devices section.
+DEVICE_FIELDS = ("networkId", "productType", "model", "mac", "serial", "firmware", "address")
+
+
+def fetch_rules(dashboard, net_id):
+    rules = dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(net_id)
+    return rules.get("rules", []) if isinstance(rules, dict) else rules
+
+
+# Per-network services: exported key -> live fetch.
+BROWNFIELD_SERVICES = {
+    "vlans": lambda d, net_id: d.appliance.getNetworkApplianceVlans(net_id),
+    "ssids": lambda d, net_id: d.wireless.getNetworkWirelessSsids(net_id),
+    "firewallRules": fetch_rules,
+    "wirelessSettings": lambda d, net_id: d.wireless.getNetworkWirelessSettings(net_id),
+    "webhook_receivers": lambda d, net_id: d.networks.getNetworkWebhooksHttpServers(net_id),
+    "alert_settings": lambda d, net_id: d.networks.getNetworkAlertsSettings(net_id),
+}
+
+WORKSPACE_SERVICES = {
+    "ssids": BROWNFIELD_SERVICES["ssids"],
+    "firewall_rules": fetch_rules,
+    "webhook_servers": BROWNFIELD_SERVICES["webhook_receivers"],
+    "alerts": BROWNFIELD_SERVICES["alert_settings"],
+    "vlans_mx": BROWNFIELD_SERVICES["vlans"],
+}
+
+
+# ----------------------------- Structural diff ----------------------------- #
+
+def record_key(*lists):
+    """
+    Identity field present and unique in every record of each list, or None to
+    compare by position.
+    """
+    if not any(lists) or not all(isinstance(item, dict) for items in lists for item in items):
+        return None
+
+    def identifies(key, items):
+        values = [item.get(key) for item in items]
+        return None not in values and len(set(map(str, values))) == len(values)
+
+    for key in RECORD_KEYS:
+        if all(identifies(key, items) for items in lists):
+            return key
+    return None
+
+
+def ignored(path, key, ignore) -> bool:
+    """
+    True if the field at path (named key) is to be skipped: its path, with every list
+    record written as [], or its bare name is in ignore.
+    """
+    return key in ignore or re.sub(r"\[[^\]]*\]", "[]", path) in ignore
+
+
+def diff(exported, live, ignore, path=""):
+    """
+    List the differences between two parsed documents.
+    """
+    if isinstance(exported, dict) and isinstance(live, dict):
+        changes = []
+        for key in list(exported) + [k for k in live if k not in exported]:
+            child = f"{path}.{key}" if path else str(key)
+            if ignored(child, key, ignore):
+                continue
+            if key not in live:
+                changes.append({"path": child, "change": "removed", "exported": exported[key], "live": None})
+            elif key not in exported:
+                changes.append({"path": child, "change": "added", "exported": None, "live": live[key]})
+            else:
+                changes.extend(diff(exported[key], live[key], ignore, child))
+        return changes
+
+    if isinstance(exported, list) and isinstance(live, list):
+        key = record_key(exported, live)
+        if key is None:
+            changes = [c for i, (a, b) in enumerate(zip(exported, live)) for c in diff(a, b, ignore, f"{path}[{i}]")]
+            changes += [{"path": f"{path}[{i}]", "change": "removed", "exported": item, "live": None}
+                        for i, item in enumerate(exported[len(live):], len(live))]
+            changes += [{"path": f"{path}[{i}]", "change": "added", "exported": None, "live": item}
+                        for i, item in enumerate(live[len(exported):], len(exported))]
+            return changes
+        old = {str(item[key]): item for item in exported}
+        new = {str(item[key]): item for item in live}
+        changes = []
+        for ident in list(old) + [i for i in new if i not in old]:
+            child = f"{path}[{key}={ident}]"
+            if ident not in new:
+                changes.append({"path": child, "change": "removed", "exported": old[ident], "live": None})
+            elif ident not in old:
+                changes.append({"path": child, "change": "added", "exported": None, "live": new[ident]})
+            else:
+                changes.extend(diff(old[ident], new[ident], ignore, child))
+        return changes
+
+    if exported != live:
+        return [{"path": path, "change": "changed", "exported": exported, "live": live}]
+    return []
+
+
+def empty_like(value):
+    return {} if isinstance(value, dict) else []
+
+
+def live_or_empty(fetch, exported):
+    """
+    Fetch a live value. A refused request (4xx other than 429) counts as the empty
+    value the exporters write for it; anything else is raised.
+    """
+    try:
+        return fetch()
+    except Exception as e:
+        if dashboard_scheduler.refused(e):
+            return empty_like(exported)
+        raise
+
+
+# ----------------------------- Exported trees ----------------------------- #
+
+def find_brownfield_documents(path: Path):
+    """
+    network ID -> combined document path, for a brownfield tree.
+    """
+    documents = {}
+    for data_format in serialization.DATA_FORMATS:
+        for doc in (path / "data" / data_format).glob(f"*/*_*.{data_format}"):
+            match = re.search(r"_([A-Z]_\d+)$", doc.stem)
+            if match:
+                documents[match.group(1)] = doc
+    return documents
+
+
+def find_workspace_directories(path: Path):
+    """
+    network ID -> data directory, for a workspace tree.
+    """
+    directories = {}
+    tfvars = [path / "terraform.tfvars"] + sorted((path / "stacks").glob("*/terraform.tfvars"))
+    for tfvars_path in tfvars:
+        if not tfvars_path.is_file():
+            continue
+        for name, net_id in re.findall(r'^\s*"([^"]+)"\s*=\s*"([^"]+)"', tfvars_path.read_text(), re.M):
+            if (path / "data" / name).is_dir():
+                directories[net_id] = path / "data" / name
+    return directories
+
+
+def detect_layout(path: Path):
+    documents = find_brownfield_documents(path)
+    if documents:
+        return "brownfield", documents
+    directories = find_workspace_directories(path)
+    if directories:
+        return "workspace", directories
+    return None, {}
+
+
+# ----------------------------- Per network ----------------------------- #
+
+def check_brownfield_network(dashboard, net, doc_path, inventory, ignore):
+    net_id = net["id"]
+    doc = serialization.load_file(doc_path) or {}
+    services, errors = {}, {}
+
+    def compare(service, exported, fetch):
+        try:
+            live = live_or_empty(fetch, exported)
+        except Exception as e:
+            errors[service] = str(e)
+            return
+        changes = diff(exported, live, ignore, service)
+        if changes:
+            services[service] = changes
+
+    compare("network", doc.get("network") or {}, lambda: net)
+
+    devices = inventory.devices(net_id)
+    compare("devices", doc.get("devices") or [],
+            lambda: [{field: device.get(field) for field in DEVICE_FIELDS} for device in devices])
+
+    for service, fetch in BROWNFIELD_SERVICES.items():
+        compare(service, doc.get(service) or [], lambda fetch=fetch: fetch(dashboard, net_id))
+
+    switches = [device["serial"] for device in devices if "switch" in (device.get("productType") or "").lower()]
+    compare("switchPorts", doc.get("switchPorts") or [],
+            lambda: [{"serial": serial, "ports": dashboard.switch.getDeviceSwitchPorts(serial)} for serial in switches])
+    return services, errors
+
+
+def check_workspace_network(dashboard, net, data_dir, ignore):
+    net_id = net["id"]
+    services, errors = {}, {}
+    for service, fetch in WORKSPACE_SERVICES.items():
+        path = serialization.find_data_file(str(data_dir), service)
+        if path is None:
+            continue
+        exported = serialization.load_file(path)
+        if exported is None:
+            exported = []
+        try:
+            live = live_or_empty(lambda: fetch(dashboard, net_id), exported)
+        except Exception as e:
+            errors[service] = str(e)
+            continue
+        changes = diff(exported, live, ignore, service)
+        if changes:
+            services[service] = changes
+    return services, errors
+
+
+# ----------------------------- Main ----------------------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare live Meraki configuration with an exported data tree")
+    parser.add_argument("--api_key", "-k", required=True, help="Your Meraki API Key")
+    parser.add_argument("--org_name", "-n", required=True, help="Meraki Organization Name")
+    parser.add_argument("--path", "-p", default=".",
+                        help="Exported project: the brownfield directory or the workspace --output_dir (default: .)")
+    parser.add_argument("--workers", "-w", type=int, default=8,
+                        help="Networks checked concurrently (default: 8)")
+    parser.add_argument("--rate_limit", "-r", type=float, default=dashboard_scheduler.DEFAULT_RATE,
+                        help="Dashboard requests per second for this organization (default: 10)")
+    parser.add_argument("--ignore", type=lambda v: [f.strip() for f in v.split(",") if f.strip()], default=[],
+                        help="Comma-separated extra fields to ignore: paths such as ssids[].radiusServers, "
+                             "or bare field names ignored at any depth")
+    parser.add_argument("--report", default="drift_report.json",
+                        help="Where the JSON drift report is written (default: drift_report.json)")
+    network_filter.add_arguments(parser)
+    args = parser.parse_args()
+    selection = network_filter.from_args(args)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.rate_limit <= 0:
+        parser.error("--rate_limit must be positive")
+
+    path = Path(args.path)
+    layout, exported = detect_layout(path)
+    if layout is None:
+        print(f"No brownfield or workspace export found under {path}", file=sys.stderr)
+        sys.exit(1)
+    ignore = VOLATILE_FIELDS | set(args.ignore)
+
+    scheduler = dashboard_scheduler.RequestScheduler(default_rate=args.rate_limit)
+    dashboard = dashboard_scheduler.ScheduledDashboard(
+        meraki.DashboardAPI(args.api_key, output_log=False, print_console=False, wait_on_rate_limit=False),
+        scheduler,
+    )
+    try:
+        orgs = dashboard.organizations.getOrganizations()
+    except Exception as e:
+        print(f"Error fetching organizations: {e}", file=sys.stderr)
+        sys.exit(1)
+    org_id = next((o["id"] for o in orgs if o.get("name", "").lower() == args.org_name.lower()), None)
+    if not org_id:
+        print(f"Organization '{args.org_name}' not found.", file=sys.stderr)
+        sys.exit(1)
+    dashboard = dashboard.for_org(org_id)
+
+    inventory = org_inventory.DeviceInventory(dashboard, org_id).start() if layout == "brownfield" else None
+    print(f"Checking {layout} export under {path} ({len(exported)} networks) against organization {org_id}...")
+
+    report = {
+        "org_id": org_id,
+        "layout": layout,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "networks": {},
+        "not_exported": [],
+        "not_in_dashboard": [],
+    }
+
+    def check(net):
+        if layout == "brownfield":
+            return check_brownfield_network(dashboard, net, exported[net["id"]], inventory, ignore)
+        return check_workspace_network(dashboard, net, exported[net["id"]], ignore)
+
+    listed = set()
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {}
+            for net in org_inventory.iter_networks(dashboard, org_id):
+                listed.add(net["id"])
+                if not selection.matches(net):
+                    continue
+                if net["id"] not in exported:
+                    report["not_exported"].append({"id": net["id"], "name": net.get("name")})
+                    continue
+                futures[net["id"]] = (net, executor.submit(check, net))
+            for net_id, (net, future) in futures.items():
+                try:
+                    services, errors = future.result()
+                except Exception as e:
+                    services, errors = {}, {"network": str(e)}
+                report["networks"][net_id] = {
+                    "name": net.get("name"),
+                    "drifted": bool(services),
+                    "services": services,
+                    "errors": errors,
+                }
+                if services:
+                    print(f"  ⚠️ {net.get('name')} ({net_id}): drift in {', '.join(services)}")
+                for service, error in errors.items():
+                    print(f"  ❌ {net.get('name')} ({net_id}) {service}: {error}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error fetching networks: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not selection.active:
+        report["not_in_dashboard"] = sorted(net_id for net_id in exported if net_id not in listed)
+
+    drifted = [net_id for net_id, entry in report["networks"].items() if entry["drifted"]]
+    report["summary"] = {
+        "checked": len(report["networks"]),
+        "drifted": len(drifted),
+        "differences": sum(len(c) for entry in report["networks"].values() for c in entry["services"].values()),
+        "errors": sum(len(entry["errors"]) for entry in report["networks"].values()),
+        "not_exported": len(report["not_exported"]),
+        "not_in_dashboard": len(report["not_in_dashboard"]),
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    summary = report["summary"]
+    print(f"{summary['drifted']} of {summary['checked']} networks drifted ({summary['differences']} differences, "
+          f"{summary['errors']} errors); {summary['not_exported']} not exported, "
+          f"{summary['not_in_dashboard']} no longer in the Dashboard. Report: {args.report}")
+    sys.exit(2 if drifted or report["not_exported"] or report["not_in_dashboard"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,494 @@
 import sys, subprocess
 import os
+import queue
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 import import_meraki_vars
 
 
-def ensure_package(package):
+def ensure_package(package, module=None):
+    # module: the import name, when it differs from the pip package name
     try:
-        __import__(package)
+        __import__(module or package)
     except ImportError:
         print(f"📦 Installing missing package: {package}")
         subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
 ensure_package("meraki")
 ensure_package("argparse")
-ensure_package("pyyaml")
+ensure_package("pyyaml", "yaml")
 
 import meraki
 import argparse
-import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+import checkpoint_journal
+import dashboard_scheduler
+import export_manifest
+import export_sinks
+import instrumentation
+import multi_org
+import network_filter
+import org_inventory
+import response_cache
+import serialization
+from serialization import DataFile
 
 ###### End Module Imports ######
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Meraki API Script")
     parser.add_argument("--api_key", "-k", required=True, help="Your Meraki API Key")
-    #parser.add_argument("--org_id", "-o", required=True, help="Meraki Organization ID")
+    parser.add_argument("--org_id", "-o", required=False, help="Meraki Organization ID (instead of --org_name)")
     parser.add_argument("--org_name", "-n", required=False, help="Meraki Organization Name")
-    return parser.parse_args()
+    parser.add_argument("--workers", "-w", type=int, default=8,
+                        help="Number of networks to export concurrently (default: 8)")
+    parser.add_argument("--rate_limit", "-r", type=float, default=dashboard_scheduler.DEFAULT_RATE,
+                        help="Dashboard requests per second for this organization (default: 10)")
+    parser.add_argument("--bulk", "-b", action="store_true",
+                        help="Prefer organization-wide endpoints over per-network/per-device calls")
+    parser.add_argument("--incremental", "-i", action="store_true",
+                        help="Only refetch networks changed since the last run and only rewrite changed files")
+    parser.add_argument("--cache_dir", default=response_cache.DEFAULT_CACHE_DIR,
+                        help=f"Directory of the on-disk response cache (default: {response_cache.DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache_ttl", type=int, default=response_cache.DEFAULT_TTL,
+                        help=f"Seconds a cached response stays fresh (default: {response_cache.DEFAULT_TTL})")
+    parser.add_argument("--no_cache", action="store_true", help="Always call the Dashboard, bypassing the cache")
+    parser.add_argument("--data_format", "-f", choices=serialization.DATA_FORMATS, default=serialization.DEFAULT_FORMAT,
+                        help="Format of the exported data files; json is read with jsondecode (default: yaml)")
+    parser.add_argument("--shared_module", "-s", action="store_true",
+                        help="Emit one shared network module instantiated per network from the root main.tf "
+                             "instead of a full module copy per network")
+    parser.add_argument("--metrics_file", default=os.path.join("data", "metrics.jsonl"),
+                        help="JSON-lines record of every Dashboard call and file write (default: data/metrics.jsonl)")
+    network_filter.add_arguments(parser)
+    export_sinks.add_arguments(parser)
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run: skip networks and services the checkpoint journal "
+                             "records as done, retry failed or missing ones")
+    multi_org.add_arguments(parser)
+    parser.add_argument("--orgs_dir", default="orgs",
+                        help="With --all_orgs/--org, each organization is exported into <orgs_dir>/<organization> "
+                             "(default: orgs)")
+    args = parser.parse_args()
+    multi_org.validate(parser, args)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.rate_limit <= 0:
+        parser.error("--rate_limit must be positive")
+    return args
+
+
+def write_chunks(chunks, path, net_id=None):
+    """
+    Stream text chunks to path through a temporary file, so a failed fetch never leaves
+    a partial file behind; in incremental mode only replace path if the content changed.
+    The write (size, and time spent writing: producing the streamed chunks, with their
+    Dashboard calls and waits for other workers, is left out) is recorded in metrics.
+    """
+    start = time.monotonic()
+    nbytes = 0
+    producing = 0.0
+
+    def counted():
+        nonlocal nbytes, producing
+        chunk_iter = iter(chunks)
+        while True:
+            produce_start = time.monotonic()
+            chunk = next(chunk_iter, None)
+            producing += time.monotonic() - produce_start
+            if chunk is None:
+                return
+            nbytes += len(chunk.encode("utf-8"))
+            yield chunk
+
+    written = True
+    if manifest is not None:
+        written = manifest.write_chunks(path, counted(), net_id)
+    else:
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                for chunk in counted():
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+    metrics.record_write(path, net_id, time.monotonic() - start - producing, nbytes, written)
+
+
+def write_text(text, path, net_id=None):
+    """Write text to path; in incremental mode only if the content changed."""
+    write_chunks([text], path, net_id)
+
+
+def write_data(data, path, net_id=None):
+    """Dump data to path in the export format; in incremental mode only if the content changed."""
+    write_chunks([serialization.dump_data(data, DATA_FORMAT)], path, net_id)
+
+
+def write_data_list(items, path, net_id=None):
+    """Stream records to path as a list in the export format, serializing one record at a time."""
+    write_chunks(serialization.list_chunks(items, DATA_FORMAT), path, net_id)
+
+
+def fetch_switch_ports_by_serial(org_id, ports, network_ids=None):
+    """
+    Bulk mode: fetch every switch's ports in one paginated organization-wide sweep
+    into ports, keyed by serial so each network can pick out its own switches. Each
+    page is its own scheduled request; if the sweep fails, ports keeps the switches
+    of the pages that arrived.
+    """
+    kwargs = {"networkIds": list(network_ids)} if network_ids is not None else {}
+    pages = org_inventory.iter_pages(dashboard, "switch", "getOrganizationSwitchPortsBySwitch", org_id,
+                                     perPage=50, **kwargs)
+    for page in pages:
+        for switch in page:
+            ports[switch["serial"]] = switch.get("ports", [])
+
+
+def has_product(net, product_type):
+    """True if the network contains the given product type (appliance, switch, wireless...)."""
+    return product_type in net.get("productTypes", [])
+
+
+def export_service(net, unit, path, fetch, write=write_data):
+    """
+    Fetch one service of a network with fetch() and write it to path, recording the
+    (network, service) unit in the checkpoint journal and passing the record to the
+    extra output sinks. When resuming, a unit already done is taken from disk without
+    calling the Dashboard. Returns the DataFile to splice into the combined document,
+    or None if the fetch failed.
+    """
+    net_id = net["id"]
+    if journal.resumed and journal.done(net_id, unit) and os.path.isfile(path):
+        if sinks.active:
+            sinks.record(net, unit, serialization.load_file(path))
+        return DataFile(path)
+    try:
+        write(sinks.capture(net, unit, fetch()), path, net_id)
+    except Exception:
+        journal.record(net_id, unit, "failed")
+        return None
+    journal.record(net_id, unit)
+    return DataFile(path)
+
+
+def network_file(org_safe_name, net):
+    """
+    Path of a network's combined data file, <net>_<id>.<format>.
+    """
+    net_safe_name = net["name"].replace(" ", "_").replace("/", "_")
+    return f"{YAML_DIR}/{org_safe_name}/{net_safe_name}_{net['id']}.{DATA_FORMAT}"
+
+
+def module_label(name):
+    """
+    Turn a network name into a valid Terraform module label.
+    """
+    label = re.sub(r"[^A-Za-z0-9_-]", "_", name)
+    return label if re.match(r"[A-Za-z_]", label) else f"net_{label}"
+
+
+def write_shared_module():
+    """
+    Write the parametrized network module used with --shared_module: the same resources
+    as the per-network modules, reading the data file passed in var.network_file.
+    """
+    os.makedirs(SHARED_MODULE_DIR, exist_ok=True)
+    write_text(
+        f'locals {{ \n network = {serialization.decode_function(DATA_FORMAT)}(file(var.network_file))\n'
+        f' ssid = {{for ssid in local.network["ssids"] : ssid.number => ssid}}\n'
+        f' mxvlan = {{for vlan in local.network["vlans"] : vlan.vlan_id => vlan}}\n}}'
+        f'{import_meraki_vars.shared_module} \n ',
+        f"{SHARED_MODULE_DIR}/main.tf")
+    write_text(import_meraki_vars.shared_module_variables, f"{SHARED_MODULE_DIR}/variables.tf")
+    write_text(import_meraki_vars.shared_module_versions, f"{SHARED_MODULE_DIR}/versions.tf")
+
+
+def shared_module_calls(networks, org_safe_name):
+    """
+    Root main.tf module blocks instantiating the shared module once per network whose
+    data file exists.
+    """
+    blocks = []
+    labels = set()
+    for net in networks:
+        path = network_file(org_safe_name, net)
+        if not os.path.isfile(path):
+            continue
+        label = module_label(net["name"].replace(" ", "_").replace("/", "_"))
+        if label in labels:
+            label = f"{label}_{module_label(net['id'])}"
+        labels.add(label)
+        blocks.append(
+            f'module "{label}" {{\n'
+            f'  source       = "./{os.path.relpath(SHARED_MODULE_DIR, BASE_DIR)}"\n'
+            f'  network_file = "${{path.root}}/{os.path.relpath(path, BASE_DIR)}"\n'
+            f'}}\n'
+        )
+    return "\n".join(blocks)
+
+
+def export_network(net, inventory, org_safe_name, bulk=False, switch_ports=None, shared=False):
+    """
+    Fetch one network's settings, write its YAML files and Terraform module.
+    inventory is the organization's DeviceInventory, still being listed while the
+    first networks are exported: the services that need the network's devices are
+    fetched last, after everything else. With shared=True only the data files are
+    written; the network is instantiated from the shared module in the root main.tf
+    instead.
+
+    In bulk mode, services for product types the network does not contain are skipped
+    instead of being requested and failing, and switch ports are taken from
+    switch_ports (a Future of (serial -> ports, complete)) rather than fetched per
+    device. If the sweep did not complete, switches missing from it are fetched per
+    device.
+
+    Returns (net_safe_name, net_id, failed), failed listing the services whose fetch
+    failed.
+    """
+    net_id = net["id"]
+    net_name = net["name"]
+    net_safe_name = net_name.replace(" ", "_").replace("/", "_")
+
+    if manifest is not None and cache is not None:
+        # Incremental runs only export changed networks; read them from the Dashboard.
+        cache.invalidate(net_id)
+
+    os.makedirs(YAML_DIR + '/' + org_safe_name + '/' + net_safe_name, exist_ok=True)
+
+    # Sections of the combined <net>_<id> document. Each fetched service is written
+    # straight to its own file and replaced here by that file's path; the combined
+    # document is then spliced together from disk instead of being held in memory.
+    network_data = {
+        "network": net,
+        "devices": [],
+        "vlans": [],
+        "ssids": [],
+        "firewallRules": [],
+        "switchPorts": [],
+        "wirelessSettings": [],
+        "webhook_receivers": [],
+        "alert_settings": []
+    }
+
+    yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_net_settings.{DATA_FORMAT}"
+    write_data(net, yaml_file, net_id)
+    sinks.record(net, "network", net)
+    network_data["network"] = DataFile(yaml_file)
+
+    file_prefix = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}"
+
+    failed = []
+
+    def export_section(key, suffix, fetch, write=write_data):
+        section = export_service(net, key, f"{file_prefix}_{suffix}.{DATA_FORMAT}", fetch, write)
+        if section is not None:
+            network_data[key] = section
+        else:
+            failed.append(key)
+
+    appliance = not bulk or has_product(net, "appliance")
+    wireless = not bulk or has_product(net, "wireless")
+
+    if appliance:
+        export_section("vlans", "mx_vlans", lambda: dashboard.appliance.getNetworkApplianceVlans(net_id))
+
+    export_section("webhook_receivers", "webhook_receivers",
+                   lambda: dashboard.networks.getNetworkWebhooksHttpServers(net_id))
+
+    export_section("alert_settings", "alert_settings", lambda: dashboard.networks.getNetworkAlertsSettings(net_id))
+
+    if wireless:
+        export_section("ssids", "ssids", lambda: dashboard.wireless.getNetworkWirelessSsids(net_id))
+
+    if appliance:
+        export_section("firewallRules", "firewallrules",
+                       lambda: dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(net_id).get("rules", []))
+
+    if wireless:
+        export_section("wirelessSettings", "wireless_settings",
+                       lambda: dashboard.wireless.getNetworkWirelessSettings(net_id))
+
+    # Everything below waits for the device inventory.
+    def network_devices():
+        for device in inventory.devices(net_id):
+            yield {
+                "networkId": device["networkId"],
+                "productType": device["productType"],
+                "model": device["model"],
+                "mac": device["mac"],
+                "serial": device["serial"],
+                "firmware": device["firmware"],
+                "address": device["address"]
+            }
+
+    export_section("devices", "devices", network_devices, write_data_list)
+
+    def network_switch_ports():
+        switch_serials = [
+            device["serial"] for device in inventory.devices(net_id)
+            if "switch" in device.get("productType", "").lower()
+        ]
+        ports_by_serial, complete = switch_ports.result() if switch_ports is not None else ({}, False)
+        for serial in switch_serials:
+            if serial in ports_by_serial:
+                ports = ports_by_serial[serial]
+            elif complete:
+                ports = []
+            else:
+                if manifest is not None and cache is not None:
+                    cache.invalidate(serial)
+                ports = dashboard.switch.getDeviceSwitchPorts(serial)
+            yield {
+                "serial": serial,
+                "ports": ports
+            }
+
+    export_section("switchPorts", "switchPorts", network_switch_ports, write_data_list)
+
+    yaml_file = network_file(org_safe_name, net)
+    write_chunks(serialization.mapping_chunks(network_data, DATA_FORMAT), yaml_file, net_id)
+
+    if shared:
+        return net_safe_name, net_id, failed
+
+    module_dir = os.path.join(MODULES_DIR, net_safe_name)
+    os.makedirs(module_dir, exist_ok=True)
+
+    write_text(
+        f'#module "{net_safe_name}" \n '
+        f'locals {{ \n network = {serialization.decode_function(DATA_FORMAT)}(file("../.{YAML_DIR}/{org_safe_name}/{net_safe_name}_{net_id}.{DATA_FORMAT}"))\n'
+        f' ssid = {{for ssid in local.network["ssids"] : ssid.number => ssid}}\n'
+        f' mxvlan = {{for vlan in local.network["vlans"] : vlan.vlan_id => vlan}}\n}}'
+        f'{import_meraki_vars.shared_module} \n ',
+        f"{module_dir}/main.tf", net_id)
+
+    write_text(import_meraki_vars.tf_provider, f"{module_dir}/provider.tf", net_id)
+
+    write_text(import_meraki_vars.tf_variables, f"{module_dir}/variables.tf", net_id)
+
+    write_text(f'''locals {{ \n #network = yamldecode(file("{YAML_DIR}/{net_safe_name}_{net_id}.yaml"))
+                    }}
+            ''', f"{module_dir}/locals.tf", net_id)
+
+    write_text(
+        f'#api_key = "<insert API Key if needed>"\n'
+        f'org_id = "{ORG_ID}"\n',
+        f"{module_dir}/terraform.tfvars", net_id)
+
+    #main_tf.write(f'''module "{safe_name}" {{
+  #source      = "./modules/{safe_name}"
+  #api_key     = var.api_key
+#}}
+
+#''')
+
+    return net_safe_name, net_id, failed
+
+
+def record_network_result(net, future):
+    """
+    Report a finished export_network() and record the network in the manifest and
+    checkpoint journal. A network with failed services is not recorded as done, so
+    the next run (--resume, --incremental) exports it again.
+    """
+    try:
+        net_safe_name, net_id, failed = future.result()
+    except Exception as e:
+        print(f"❌ Failed: {net['name']} ({net['id']}): {e}")
+        if manifest is not None:
+            manifest.forget(net["id"])
+        return
+    if failed:
+        print(f"⚠️ Generated with failed services ({', '.join(failed)}): {net_safe_name} ({net_id})")
+        if manifest is not None:
+            manifest.forget(net_id)
+        return
+    if manifest is not None:
+        manifest.mark_fetched(net_id)
+    journal.record(net_id, checkpoint_journal.NETWORK_UNIT)
+    print(f"✅ Generated: {net_safe_name} ({net_id})")
 
 
 args = parse_args()
+selection = network_filter.from_args(args)
 
-dashboard = meraki.DashboardAPI(args.api_key, print_console=False, suppress_logging=True)
+scheduler = dashboard_scheduler.RequestScheduler(default_rate=args.rate_limit)
+dashboard = dashboard_scheduler.ScheduledDashboard(
+    meraki.DashboardAPI(args.api_key, print_console=False, suppress_logging=True, wait_on_rate_limit=False),
+    scheduler,
+)
 
-orgs = dashboard.organizations.getOrganizations()
+if multi_org.active(args):
+    # One export per organization, each in its own directory and process.
+    def launch_org(org, root):
+        cmd = [sys.executable, os.path.abspath(__file__)] + multi_org.child_argv(valued=("--orgs_dir", "-o"))
+        return {"cmd": cmd + ["--org_id", str(org["id"])], "metrics": args.metrics_file}
+
+    sys.exit(multi_org.export_organizations(args, dashboard, launch_org, args.orgs_dir))
 
-for org in orgs:
-    if org.get("name", "").lower() == args.org_name.lower():
-        org_id = org.get("id")
-        break
+os.makedirs(os.path.dirname(args.metrics_file) or ".", exist_ok=True)
+metrics = instrumentation.MetricsRecorder(args.metrics_file)
+dashboard = instrumentation.InstrumentedDashboard(dashboard, metrics, scheduler)
 
-org = next((o for o in orgs if o['name'] == args.org_name), None)
+cache = None
+if not args.no_cache:
+    cache = response_cache.ResponseCache(args.cache_dir, namespace=args.api_key, default_ttl=args.cache_ttl)
+    dashboard = response_cache.CachedDashboard(dashboard, cache)
+
+orgs = dashboard.organizations.getOrganizations()
+
+if args.org_id:
+    org = next((o for o in orgs if str(o['id']) == str(args.org_id)), None)
+else:
+    org = next((o for o in orgs if o['name'] == args.org_name), None)
 if not org:
-    print(f"Organization {args.org_name} not found.")
+    print(f"Organization {args.org_id or args.org_name} not found.")
 
 
 
 API_KEY = args.api_key
 ORG_ID = org['id']
-ORG_NAME = args.org_name
+ORG_NAME = org['name']
 BASE_DIR = "./"
 MODULES_DIR = os.path.join(BASE_DIR, "modules")
+SHARED_MODULE_DIR = os.path.join(MODULES_DIR, "shared_network")
 OUTPUT_DIR = os.path.join(BASE_DIR, "data")
-YAML_DIR = os.path.join(OUTPUT_DIR, "yaml")
+DATA_FORMAT = args.data_format
+YAML_DIR = os.path.join(OUTPUT_DIR, DATA_FORMAT)
 
 
-dashboard = meraki.DashboardAPI(API_KEY, print_console=False, suppress_logging=True)
+dashboard = dashboard.for_org(ORG_ID)
 
 os.makedirs(BASE_DIR, exist_ok=True)
 os.makedirs(MODULES_DIR, exist_ok=True)
 os.makedirs(YAML_DIR, exist_ok=True)
 
+manifest = export_manifest.ExportManifest(os.path.join(OUTPUT_DIR, "manifest.json"), ORG_ID) if args.incremental else None
+if manifest is not None and cache is not None:
+    # Organization-wide listings (networks, devices, switch ports) must show the changes
+    # the change log reports, so they are read from the Dashboard too.
+    cache.invalidate(ORG_ID)
+
+sinks = export_sinks.from_args(args, ORG_ID, "brownfield", org["name"])
+
+journal = checkpoint_journal.CheckpointJournal(
+    os.path.join(OUTPUT_DIR, "checkpoint.jsonl"), ORG_ID, DATA_FORMAT, resume=args.resume
+)
+if args.resume:
+    if journal.resumed:
+        counts = journal.counts()
+        print(f"⏯️ Resuming: {counts['networks']} networks and {counts['done']} services already done, "
+              f"{counts['failed']} failed services to retry")
+    else:
+        print("⏯️ No checkpoint journal for this organization and format, starting a full run")
+
 
 #with open(f"{MODULES_DIR}/network/main.tf", "w") as f:
     #f.write(shared_module)
@@ -103,156 +531,114 @@ with open(main_tf_path, "w") as main_tf:
     os.makedirs(YAML_DIR + '/' + org_data_path, exist_ok=True)
 
 
-    org_devices = dashboard.organizations.getOrganizationDevices(ORG_ID)
-
-    yaml_file = f"{YAML_DIR}/{org_data_path}/Organization.yaml"
-    with open(yaml_file, "w") as f:
-        yaml.dump(org_devices, f, sort_keys=False)
-
-    networks = dashboard.organizations.getOrganizationNetworks(ORG_ID)
-    print(f"🔍 Found {len(networks)} networks...")
-
-    for net in networks:
-        net_id = net["id"]
-        net_name = net["name"]
-        net_safe_name = net_name.replace(" ", "_").replace("/", "_")
-
-        os.makedirs(YAML_DIR + '/' + org_safe_name + '/' + net_safe_name, exist_ok=True)
-
-        network_data = {
-            "network": net,
-            "devices": [],
-            "vlans": [],
-            "ssids": [],
-            "firewallRules": [],
-            "switchPorts": [],
-            "wirelessSettings": [],
-            "webhook_receivers": [],
-            "alert_settings": []
-        }
-
-        yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_net_settings.yaml"
-        with open(yaml_file, "w") as f:
-            yaml.dump(net, f, sort_keys=False)
+    # The device inventory is listed in the background while networks stream in page
+    # by page; each network is exported as soon as it is listed.
+    inventory = org_inventory.DeviceInventory(
+        dashboard, ORG_ID,
+        on_page=lambda page: metrics.set_networks({d["serial"]: d["networkId"] for d in page if d.get("networkId")}),
+    ).start()
 
+    changed = None
+    if manifest is not None:
         try:
-            for device in org_devices:
-                if device["networkId"] == net["id"]:
-                    network_data["devices"].append({
-                        "networkId": device["networkId"],
-                        "productType": device["productType"],
-                        "model": device["model"],
-                        "mac": device["mac"],
-                        "serial": device["serial"],
-                        "firmware": device["firmware"],
-                        "address": device["address"]
-                    })
-
-            yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_devices.yaml"
-            with open(yaml_file, "w") as f:
-                yaml.dump(network_data["devices"], f, sort_keys=False)
-
-        except: pass
-
-
-
-
-        try:
-            network_data["vlans"] = dashboard.appliance.getNetworkApplianceVlans(net_id)
-
-            yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_mx_vlans.yaml"
-            with open(yaml_file, "w") as f:
-                yaml.dump(network_data["vlans"], f, sort_keys=False)
-        except: pass
-
-        try:
-            network_data["webhook_receivers"] = dashboard.networks.getNetworkWebhooksHttpServers(net_id)
-
-            yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_webhook_receivers.yaml"
-            with open(yaml_file, "w") as f:
-                yaml.dump(network_data["webhook_receivers"], f, sort_keys=False)
-        except: pass
-
-        try:
-            network_data["alert_settings"] = dashboard.networks.getNetworkAlertsSettings(net_id)
-
-            yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_alert_settings.yaml"
-            with open(yaml_file, "w") as f:
-                yaml.dump(network_data["alert_settings"], f, sort_keys=False)
-        except: pass
-
-        try:
-            network_data["ssids"] = dashboard.wireless.getNetworkWirelessSsids(net_id)
-
-            yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_ssids.yaml"
-            with open(yaml_file, "w") as f:
-                yaml.dump(network_data["ssids"], f, sort_keys=False)
-        except: pass
-
-        try:
-            fw = dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(net_id)
-            network_data["firewallRules"] = fw.get("rules", [])
-
-            yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_firewallrules.yaml"
-            with open(yaml_file, "w") as f:
-                yaml.dump(network_data["firewallRules"], f, sort_keys=False)
-        except: pass
-
+            changed = manifest.changed_networks(dashboard, ORG_ID)
+        except Exception as e:
+            print(f"⚠️ Could not read the configuration change log, refreshing all networks: {e}")
+
+    # The bulk switch port sweep is narrowed to the exported networks, which are only
+    # known once the listing is complete; exports wait for it before their switch ports.
+    switch_ports = Future() if args.bulk else None
+    # Without a pending sweep to wait for, keep a few networks per worker queued so the
+    # listing does not run far ahead of the exports.
+    max_pending = None if args.bulk else args.workers * 4
+
+    all_networks = []
+    listed = selected = refreshed = exported = 0
+    exported_ids = []
+    pending = {}
+    completed = queue.SimpleQueue()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
         try:
-            for device in network_data["devices"]:
-                if "switch" in device.get("productType", "").lower():
-                    ports = dashboard.switch.getDeviceSwitchPorts(device["serial"])
-                    network_data["switchPorts"].append({
-                        "serial": device["serial"],
-                        "ports": ports
-                    })
-
-            yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}/{net_safe_name}_{net_id}_switchPorts.yaml"
-            with open(yaml_file, "w") as f:
-                yaml.dump(network_data["switchPorts"], f, sort_keys=False)
-        except: pass
-
-        try:
-            network_data["wirelessSettings"] = dashboard.wireless.getNetworkWirelessSettings(net_id)
-        except: pass
-
-        yaml_file = f"{YAML_DIR}/{org_safe_name}/{net_safe_name}_{net_id}.yaml"
-        with open(yaml_file, "w") as f:
-            yaml.dump(network_data, f,  sort_keys=False)
-
-        module_dir = os.path.join(MODULES_DIR, net_safe_name)
-        os.makedirs(module_dir, exist_ok=True)
-
-        with open(f"{module_dir}/main.tf", "w") as f:
-            f.write(f'#module "{net_safe_name}" \n ')
-            f.write(f'locals {{ \n network = yamldecode(file("../.{YAML_DIR}/{org_safe_name}/{net_safe_name}_{net_id}.yaml"))\n')
-            f.write(f' ssid = {{for ssid in local.network["ssids"] : ssid.number => ssid}}\n')
-            f.write(f' mxvlan = {{for vlan in local.network["vlans"] : vlan.vlan_id => vlan}}\n}}')
-            f.write(f'{import_meraki_vars.shared_module} \n ')
-
-        with open(f"{module_dir}/provider.tf", "w") as f:
-            f.write(import_meraki_vars.tf_provider)
-
-        with open(f"{module_dir}/variables.tf", "w") as f:
-            f.write(import_meraki_vars.tf_variables)
-
-        with open(f"{module_dir}/locals.tf", "w") as f:
-                    f.write(f'''locals {{ \n #network = yamldecode(file("{YAML_DIR}/{net_safe_name}_{net_id}.yaml"))
-                    }}
-            ''')
-
-        with open(f"{module_dir}/terraform.tfvars", "w") as f:
-            f.write(f'#api_key = "<insert API Key if needed>"\n')
-            f.write(f'org_id = "{ORG_ID}"\n')
-
-        #main_tf.write(f'''module "{safe_name}" {{
-  #source      = "./modules/{safe_name}"
-  #api_key     = var.api_key
-#}}
-
-#''')
-
-        print(f"✅ Generated: {net_safe_name} ({net_id})")
+            for net in org_inventory.iter_networks(dashboard, ORG_ID):
+                listed += 1
+                all_networks.append({"id": net["id"], "name": net["name"]})
+                if not selection.matches(net):
+                    continue
+                selected += 1
+                if manifest is not None and not manifest.needs_refresh(net["id"], changed):
+                    continue
+                refreshed += 1
+                if journal.resumed and journal.network_done(net["id"]) and os.path.isfile(network_file(org_safe_name, net)):
+                    continue
+                exported += 1
+                if len(exported_ids) <= 100:
+                    exported_ids.append(net["id"])
+                future = executor.submit(
+                    export_network, net, inventory, org_safe_name, args.bulk, switch_ports, args.shared_module
+                )
+                pending[future] = net
+                future.add_done_callback(completed.put)
+                while not completed.empty():
+                    done = completed.get()
+                    record_network_result(pending.pop(done), done)
+                if max_pending is not None and len(pending) >= max_pending:
+                    done = completed.get()
+                    record_network_result(pending.pop(done), done)
+
+            print(f"🔍 Found {listed} networks...")
+            if selection.active:
+                print(f"🎯 Filter ({selection.describe()}): {selected} of {listed} networks selected")
+            if manifest is not None:
+                print(f"♻️ Incremental: {refreshed} of {selected} networks changed since the last run")
+            if journal.resumed:
+                print(f"⏯️ {exported} networks left to export")
+
+            if switch_ports is not None and exported:
+                # Narrow the sweep to the exported networks while the filter stays URL-sized.
+                network_ids = exported_ids if exported < listed and exported <= 100 else None
+                ports = {}
+                try:
+                    fetch_switch_ports_by_serial(ORG_ID, ports, network_ids)
+                    print(f"📦 Bulk: fetched switch ports for {len(ports)} switches")
+                    switch_ports.set_result((ports, True))
+                except Exception as e:
+                    print(f"⚠️ Bulk switch port sweep failed after {len(ports)} switches, "
+                          f"fetching the others per device: {e}")
+                    switch_ports.set_result((ports, False))
+        finally:
+            if switch_ports is not None and not switch_ports.done():
+                switch_ports.set_result(({}, False))
+
+        while pending:
+            done = completed.get()
+            record_network_result(pending.pop(done), done)
+
+    yaml_file = f"{YAML_DIR}/{org_data_path}/Organization.{DATA_FORMAT}"
+    write_data_list(inventory.all(), yaml_file)
+
+    sinks.close(net["id"] for net in all_networks)
+    if args.inventory_file:
+        print(f"🗂️ Inventory: {args.inventory_file}")
+    if args.ansible_dir:
+        print(f"🗂️ Ansible inventory: {args.ansible_dir}/hosts.yml")
+
+    if args.shared_module:
+        write_shared_module()
+        main_tf.write(shared_module_calls(all_networks, org_safe_name))
+        print(f"🧩 Shared module: {SHARED_MODULE_DIR} instantiated from {main_tf_path}")
+
+    if manifest is not None:
+        manifest.save(advance=not selection.active)
+
+    journal.close()
+
+    if cache is not None:
+        print(f"🗄️ Response cache: {cache.hits} hits, {cache.misses} misses")
+
+    metrics.close()
+    print(f"\n📊 Metrics ({args.metrics_file}):")
+    for line in metrics.summary_lines():
+        print(line)
 
 try:
     print("\n🔧 Running terraform init...")
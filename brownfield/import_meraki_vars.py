@@ -79,3 +79,19 @@ tf_variables = '''variable "api_key" {
                           sensitive = true
                         }
             '''
+
+shared_module_variables = '''variable "network_file" {
+  type        = string
+  description = "Path of the network's exported data file (YAML or JSON)"
+}
+'''
+
+shared_module_versions = '''terraform {
+  required_providers {
+    meraki = {
+      source  = "cisco-open/meraki"
+      version = "1.1.2-beta"
+    }
+  }
+}
+'''
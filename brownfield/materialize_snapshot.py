@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+materialize_snapshot.py
+
+Render data files from a snapshot database (--snapshot_db of the importers) on
+demand, and query its history.
+
+Only the selected networks (network filters) of one run (--run, default: the
+organization's latest) are written, in the layout of the importer that recorded the
+run, byte for byte as that importer would have written them:
+
+  brownfield  data/<format>/<org>/<network>/<network>_<id>_<service>.<format> and the
+              combined data/<format>/<org>/<network>_<id>.<format>
+  workspace   data/<network>/<service>.<format>
+
+Files that already hold the same content are left alone. Terraform modules, root
+files and organization-level files are not part of the store; they come from the
+importer.
+
+Usage:
+    python3 materialize_snapshot.py --db snapshots.db --path . [--run 12] [--network_regex '^Branch']
+    python3 materialize_snapshot.py --db snapshots.db --list_runs
+    python3 materialize_snapshot.py --db snapshots.db --changes 11 [12]
+    python3 materialize_snapshot.py --db snapshots.db --history L_123 --service vlans
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+import network_filter
+import serialization
+import snapshot_store
+from export_layout import LIST_SECTIONS, SECTION_FILES, SECTIONS, sanitize_name
+from serialization import DataFile
+
+
+def write_if_changed(path: Path, chunks) -> bool:
+    """
+    Write chunks to path unless it already holds exactly that content. Returns True
+    if the file was written.
+    """
+    text = "".join(chunks)
+    if path.is_file() and path.read_text() == text:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
+
+
+def networks_of_run(store, run_id, selection):
+    """
+    {network ID: {service: data}} for the run's selected networks, in recorded order.
+    """
+    networks = {}
+    for network_id, _, service, data in store.records(run_id):
+        networks.setdefault(network_id, {})[service] = data
+    return {net_id: services for net_id, services in networks.items()
+            if isinstance(services.get("network"), dict) and selection.matches(services["network"])}
+
+
+def materialize_brownfield(networks, org_name, base: Path, data_format: str):
+    """
+    Write each network's per-service files and combined document. Returns (written,
+    unchanged) file counts.
+    """
+    org_dir = base / "data" / data_format / org_name.replace(" ", "_").replace("/", "_")
+    written = unchanged = 0
+    for net_id, services in networks.items():
+        net_safe_name = services["network"]["name"].replace(" ", "_").replace("/", "_")
+        prefix = org_dir / net_safe_name / f"{net_safe_name}_{net_id}"
+        sections = {}
+        for section in SECTIONS:
+            if section not in services:
+                sections[section] = []
+                continue
+            value = services[section]
+            if section not in SECTION_FILES:
+                sections[section] = value
+                continue
+            path = Path(f"{prefix}_{SECTION_FILES[section]}.{data_format}")
+            if section in LIST_SECTIONS:
+                chunks = serialization.list_chunks(value, data_format)
+            else:
+                chunks = [serialization.dump_data(value, data_format)]
+            if write_if_changed(path, chunks):
+                written += 1
+            else:
+                unchanged += 1
+            sections[section] = DataFile(path)
+        if write_if_changed(org_dir / f"{net_safe_name}_{net_id}.{data_format}",
+                            serialization.mapping_chunks(sections, data_format)):
+            written += 1
+        else:
+            unchanged += 1
+    return written, unchanged
+
+
+def materialize_workspace(networks, base: Path, data_format: str):
+    """
+    Write data/<network>/<service> for each network. Returns (written, unchanged)
+    file counts.
+    """
+    written = unchanged = 0
+    names = set()
+    for net_id, services in networks.items():
+        name = sanitize_name(services["network"]["name"])
+        if name in names:
+            name = f"{name}_{net_id}"
+        names.add(name)
+        for service, value in services.items():
+            if service == "network":
+                continue
+            path = base / "data" / name / f"{service}.{data_format}"
+            if write_if_changed(path, [serialization.dump_data(value, data_format)]):
+                written += 1
+            else:
+                unchanged += 1
+    return written, unchanged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render data files from a snapshot database, or query its history")
+    parser.add_argument("--db", required=True, help="Snapshot database written with --snapshot_db")
+    parser.add_argument("--org_id", default=None, help="Organization of the run (needed if the database holds several)")
+    parser.add_argument("--run", type=int, default=None, help="Run to materialize (default: the latest finished run)")
+    parser.add_argument("--path", "-p", default=".",
+                        help="Project to write into: the brownfield directory or the workspace --output_dir (default: .)")
+    parser.add_argument("--data_format", "-f", choices=serialization.DATA_FORMATS, default=None,
+                        help="Format of the written files (default: the run's)")
+    parser.add_argument("--list_runs", action="store_true", help="List the finished runs and exit")
+    parser.add_argument("--changes", type=int, nargs="+", metavar="RUN",
+                        help="List the records that differ between two runs (default second run: the latest)")
+    parser.add_argument("--history", metavar="NETWORK_ID", help="List the runs in which a network's --service changed")
+    parser.add_argument("--service", default="network", help="Service for --history (default: network)")
+    network_filter.add_arguments(parser)
+    args = parser.parse_args()
+    selection = network_filter.from_args(args)
+
+    if not os.path.isfile(args.db):
+        print(f"Snapshot database {args.db} not found.", file=sys.stderr)
+        sys.exit(1)
+    store = snapshot_store.SnapshotStore(args.db)
+
+    if args.list_runs:
+        for run in store.runs(args.org_id):
+            print(f"{run['id']:>5}  {run['started_at']}  org {run['org_id']} ({run['org_name']})  "
+                  f"{run['layout']}/{run['data_format']}  {run['networks']} networks")
+        return
+
+    if args.history:
+        previous = None
+        for run_id, started_at, digest in store.history(args.history, args.service):
+            if digest != previous:
+                print(f"{run_id:>5}  {started_at}  {'recorded' if previous is None else 'changed'}")
+            previous = digest
+        return
+
+    if args.changes:
+        if len(args.changes) > 2:
+            parser.error("--changes takes one or two runs")
+        old = store.run(args.changes[0])
+        new = store.run(args.changes[1]) if len(args.changes) == 2 else store.latest_run(old and old["org_id"])
+        if old is None or new is None:
+            print("Run not found.", file=sys.stderr)
+            sys.exit(1)
+        changes = store.changes(old["id"], new["id"])
+        for network_id, network, service, change in changes:
+            print(f"{change:<8} {network} ({network_id}) {service}")
+        print(f"{len(changes)} records differ between runs {old['id']} and {new['id']}.")
+        return
+
+    orgs = {run["org_id"] for run in store.runs()}
+    if args.org_id is None and len(orgs) > 1:
+        parser.error(f"the database holds several organizations ({', '.join(sorted(orgs))}); pass --org_id")
+    run = store.run(args.run) if args.run is not None else store.latest_run(args.org_id)
+    if run is None or run["finished_at"] is None:
+        print("No finished run to materialize.", file=sys.stderr)
+        sys.exit(1)
+
+    data_format = args.data_format or run["data_format"]
+    networks = networks_of_run(store, run["id"], selection)
+    base = Path(args.path)
+    if run["layout"] == "brownfield":
+        written, unchanged = materialize_brownfield(networks, run["org_name"] or run["org_id"], base, data_format)
+    else:
+        written, unchanged = materialize_workspace(networks, base, data_format)
+    print(f"Materialized {len(networks)} networks of run {run['id']} ({run['layout']}, {run['started_at']}) "
+          f"into {base}: {written} files written, {unchanged} unchanged.")
+
+
+if __name__ == "__main__":
+    main()
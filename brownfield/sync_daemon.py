@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+"""
+sync_daemon.py
+
+Keep an exported data tree in sync with the Dashboard in near real time, driven by
+configuration-change webhooks instead of periodic full exports.
+
+The daemon listens for Dashboard webhooks (alert type "Settings changed") on a local
+HTTP port. Each event names a network and, through the page that was edited, the
+services that changed. Events are coalesced per network: a network is re-exported
+--debounce seconds after its last event (at most --max_delay after the first), so a
+burst of edits costs one sync. Only the affected services are fetched again and
+written into the existing layout, detected from --path as in drift.py:
+
+  brownfield  the per-service files under data/<format>/<org>/<network>/ and the
+              combined <network>_<id> document, spliced together again from disk
+  workspace   data/<network>/<service>.<format>
+
+Files are only rewritten when their content changed (and recorded in
+data/manifest.json when the export kept one), so an event that changed nothing that
+is exported leaves the tree untouched. Events for networks that are not exported yet
+are ignored; a full export picks them up.
+
+With --plan, every network whose files changed schedules a `terraform plan` for its
+Terraform root (brownfield: the network's module directory or the root with a
+-target; workspace: the network's workspace, or its stack with --shard_by). Plans are
+debounced per root with --plan_debounce and run one at a time per directory; the
+output is kept under <state_dir>/plans/.
+
+Every sync is appended to <state_dir>/events.jsonl. GET /healthz reports the
+pending and completed syncs.
+
+Usage:
+    python3 sync_daemon.py --api_key <KEY> --org_name "<ORG>" --path . [--port 8188] [--shared_secret ...] [--plan]
+
+    # Local test sender: post a "Settings changed" event for a network
+    python3 sync_daemon.py --send L_123 [--page "Addressing & VLANs"] [--url http://127.0.0.1:8188/]
+"""
+
+import argparse
+import hmac
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import meraki
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+import dashboard_scheduler
+import drift
+import export_manifest
+import org_inventory
+import serialization
+from export_layout import LIST_SECTIONS, SECTION_FILES, SECTIONS, WORKSPACE_FILES
+from serialization import DataFile
+
+DEFAULT_PORT = 8188
+MAX_BODY_BYTES = 1024 * 1024
+
+# Webhook alert types that mean the configuration changed.
+CONFIG_ALERT_TYPES = {"settings_changed"}
+
+# Dashboard pages (as named in the event's alertData) -> affected sections. An event
+# matching none of them re-exports every section of the network.
+SERVICE_HINTS = (
+    (r"vlan|addressing|subnet|dhcp", {"vlans"}),
+    (r"ssid|wireless|splash|access control|radio|rf profile", {"ssids", "wirelessSettings"}),
+    (r"firewall", {"firewallRules"}),
+    (r"switch|\bports?\b", {"switchPorts"}),
+    (r"webhook|http server", {"webhook_receivers"}),
+    (r"alert", {"alert_settings", "webhook_receivers"}),
+    (r"\bdevices?\b|claim|inventory", {"devices", "switchPorts"}),
+    (r"general|network name|time ?zone|\btags?\b", {"network"}),
+)
+
+
+def services_for_event(payload):
+    """
+    Sections affected by a webhook event, or None for all of them.
+    """
+    alert_data = payload.get("alertData") or {}
+    text = json.dumps(alert_data).lower() if alert_data else ""
+    services = set()
+    for pattern, hinted in SERVICE_HINTS:
+        if text and re.search(pattern, text):
+            services |= hinted
+    return services or None
+
+
+def merge(values, more):
+    """
+    Union of two section sets, where None stands for every section.
+    """
+    if values is None or more is None:
+        return None
+    return set(values) | set(more)
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+# ----------------------------- Debouncing ----------------------------- #
+
+class Debouncer:
+    """
+    Coalesces events per key. The callback runs `delay` seconds after the last event
+    for a key, and at most `max_delay` after the first, with the merged values of every
+    event. Callbacks for one key never overlap: events that come due while the key's
+    callback runs are handled right after it.
+    """
+
+    def __init__(self, callback, delay: float, max_delay: float, workers: int, log=print):
+        self._callback = callback
+        self.delay = delay
+        self.max_delay = max(max_delay, delay)
+        self.log = log
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._pending = {}   # key -> [values, first event time, timer]
+        self._ready = {}     # key -> values that came due while the key was running
+        self._running = set()
+
+    def add(self, key, values=None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = [None if values is None else set(values), now, None]
+            else:
+                entry[2].cancel()
+                entry[0] = merge(entry[0], values)
+            wait = max(0.0, min(self.delay, entry[1] + self.max_delay - now))
+            entry[2] = threading.Timer(wait, self._due, (key,))
+            entry[2].daemon = True
+            entry[2].start()
+
+    def _due(self, key, now=False) -> None:
+        with self._lock:
+            entry = self._pending.get(key)
+            # A timer cancelled after it fired must not take a newer entry early.
+            if entry is None or (not now and entry[2] is not threading.current_thread()):
+                return
+            del self._pending[key]
+            if key in self._running:
+                self._ready[key] = merge(self._ready[key], entry[0]) if key in self._ready else entry[0]
+                return
+            self._running.add(key)
+        self._executor.submit(self._run, key, entry[0])
+
+    def _run(self, key, values) -> None:
+        while True:
+            try:
+                self._callback(key, values)
+            except Exception as e:
+                self.log(f"❌ {key}: {e}")
+            with self._lock:
+                if key not in self._ready:
+                    self._running.discard(key)
+                    return
+                values = self._ready.pop(key)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"pending": len(self._pending) + len(self._ready), "running": len(self._running)}
+
+    def close(self) -> None:
+        """
+        Run everything still pending now and wait for it.
+        """
+        with self._lock:
+            keys = list(self._pending)
+            for key in keys:
+                self._pending[key][2].cancel()
+        for key in keys:
+            self._due(key, now=True)
+        self._executor.shutdown(wait=True)
+
+
+# ----------------------------- Exported trees ----------------------------- #
+
+def load_manifest(path: Path, org_id):
+    """
+    The export's manifest, if it kept one for this organization.
+    """
+    manifest_path = path / "data" / "manifest.json"
+    try:
+        with open(manifest_path) as f:
+            if str(json.load(f).get("org_id")) != str(org_id):
+                return None
+    except (OSError, ValueError):
+        return None
+    return export_manifest.ExportManifest(manifest_path, org_id)
+
+
+class ExportTarget:
+    def __init__(self, dashboard, org_id, path: Path, manifest=None):
+        self.dashboard = dashboard
+        self.org_id = org_id
+        self.path = path
+        self.manifest = manifest
+        self.refresh()
+
+    def write(self, path: Path, chunks, net_id) -> bool:
+        """
+        Replace path with the chunks unless it already holds exactly that content.
+        Returns True if the file was written.
+        """
+        text = "".join(chunks)
+        if self.manifest is not None:
+            return self.manifest.write_text(path, text, net_id)
+        if path.is_file() and path.read_text() == text:
+            return False
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        return True
+
+
+class BrownfieldTarget(ExportTarget):
+    """
+    A brownfield export: refreshed sections are written to their per-service files,
+    then the combined <network>_<id> document is spliced together again from disk.
+    """
+
+    layout = "brownfield"
+
+    def refresh(self) -> None:
+        self.locations = drift.find_brownfield_documents(self.path)
+
+    def fetches(self, net_id):
+        dashboard = self.dashboard
+        devices = {}
+
+        def network_devices():
+            if "list" not in devices:
+                pages = org_inventory.iter_pages(dashboard, "organizations", "getOrganizationDevices", self.org_id,
+                                                 networkIds=[net_id])
+                devices["list"] = [
+                    {field: device.get(field) for field in drift.DEVICE_FIELDS}
+                    for page in pages for device in page if device.get("networkId") == net_id
+                ]
+            return devices["list"]
+
+        def switch_ports():
+            switches = [d["serial"] for d in network_devices() if "switch" in (d.get("productType") or "").lower()]
+            return [{"serial": serial, "ports": dashboard.switch.getDeviceSwitchPorts(serial)} for serial in switches]
+
+        fetches = {section: (lambda fetch=fetch: fetch(dashboard, net_id))
+                   for section, fetch in drift.BROWNFIELD_SERVICES.items()}
+        fetches.update({
+            "network": lambda: dashboard.networks.getNetwork(net_id),
+            "devices": network_devices,
+            "switchPorts": switch_ports,
+        })
+        return fetches
+
+    def export(self, net_id, services):
+        """
+        Fetch the given sections (None: all) of a network and rewrite its files.
+        Returns (written paths, {section: error}).
+        """
+        doc_path = self.locations[net_id]
+        data_format = serialization.format_for_path(doc_path)
+        prefix = doc_path.parent / doc_path.stem[:-len(net_id) - 1] / doc_path.stem
+        previous = serialization.load_file(doc_path) or {}
+        fetches = self.fetches(net_id)
+        written, errors = [], {}
+
+        sections = {}
+        for section in SECTIONS:
+            file_path = Path(f"{prefix}_{SECTION_FILES[section]}.{data_format}") if section in SECTION_FILES else None
+            old = previous.get(section)
+            if old is None:
+                old = []
+            if services is None or section in services:
+                try:
+                    value = fetches[section]()
+                except Exception as e:
+                    if dashboard_scheduler.refused(e):
+                        sections[section] = []
+                        continue
+                    errors[section] = str(e)
+                else:
+                    if file_path is None:
+                        sections[section] = value
+                        continue
+                    if section in LIST_SECTIONS:
+                        chunks = serialization.list_chunks(value, data_format)
+                    else:
+                        chunks = [serialization.dump_data(value, data_format)]
+                    file_path.parent.mkdir(parents=True, exist_ok=True)
+                    if self.write(file_path, chunks, net_id):
+                        written.append(file_path)
+                    sections[section] = DataFile(file_path)
+                    continue
+            # Not refreshed: splice the section's file if it still holds what the
+            # document does, otherwise keep the document's value.
+            if file_path is not None and file_path.is_file() and serialization.load_file(file_path) == old:
+                sections[section] = DataFile(file_path)
+            else:
+                sections[section] = old
+
+        if self.write(doc_path, serialization.mapping_chunks(sections, data_format), net_id):
+            written.append(doc_path)
+        return written, errors
+
+    def plan_unit(self, net_id):
+        """
+        (directory, workspace, -target) of the Terraform root managing a network.
+        """
+        doc_path = self.locations[net_id]
+        module_dir = self.path / "modules" / doc_path.stem[:-len(net_id) - 1]
+        if (module_dir / "main.tf").is_file():
+            return module_dir, None, None
+        main_tf = self.path / "main.tf"
+        if main_tf.is_file():
+            network_file = os.path.relpath(doc_path, self.path)
+            match = re.search(r'module "([^"]+)" \{[^}]*network_file\s*=\s*"\$\{path\.root\}/' + re.escape(network_file) + '"',
+                              main_tf.read_text())
+            if match:
+                return self.path, None, f"module.{match.group(1)}"
+        return self.path, None, None
+
+
+class WorkspaceTarget(ExportTarget):
+    """
+    A workspace export: refreshed sections are rewritten under data/<network>/.
+    Sections the workspace layout does not export (devices, switch ports, network
+    and wireless settings) are skipped.
+    """
+
+    layout = "workspace"
+
+    def refresh(self) -> None:
+        self.locations = drift.find_workspace_directories(self.path)
+        try:
+            with open(self.path / "stacks" / "index.json") as f:
+                self.stacks = json.load(f).get("networks", {})
+        except (OSError, ValueError):
+            self.stacks = {}
+
+    def export(self, net_id, services):
+        data_dir = self.locations[net_id]
+        data_format = "json" if any(data_dir.glob("*.json")) else "yaml"
+        written, errors = [], {}
+        for section, name in WORKSPACE_FILES.items():
+            if services is not None and section not in services:
+                continue
+            try:
+                value = drift.WORKSPACE_SERVICES[name](self.dashboard, net_id)
+            except Exception as e:
+                if not dashboard_scheduler.refused(e):
+                    errors[section] = str(e)
+                    continue
+                value = {} if name == "alerts" else []
+            path = data_dir / f"{name}.{data_format}"
+            if self.write(path, [serialization.dump_data(value, data_format)], net_id):
+                written.append(path)
+        return written, errors
+
+    def plan_unit(self, net_id):
+        name = self.locations[net_id].name
+        stack = (self.stacks.get(name) or {}).get("stack")
+        if stack and (self.path / "stacks" / stack).is_dir():
+            return self.path / "stacks" / stack, None, f"module.{name}"
+        return self.path, name, f"module.{name}"
+
+
+# ----------------------------- Daemon ----------------------------- #
+
+class SyncDaemon:
+    """
+    Accepts webhook events, debounces them per network and re-exports the affected
+    sections; optionally schedules debounced terraform plans for what changed.
+    """
+
+    def __init__(self, target, org_id, state_dir: Path, shared_secret=None, debounce=10.0, max_delay=60.0,
+                 workers=4, plan=False, plan_debounce=60.0, terraform="terraform"):
+        self.target = target
+        self.org_id = str(org_id)
+        self.state_dir = state_dir
+        self.shared_secret = shared_secret
+        self.terraform = terraform
+        self.stats = {"received": 0, "ignored": 0, "synced": 0, "files_written": 0, "errors": 0, "plans": 0}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self._events = open(state_dir / "events.jsonl", "a")
+        self.exports = Debouncer(self.sync, debounce, max_delay, workers)
+        self.plans = Debouncer(self.run_plans, plan_debounce, max(plan_debounce, max_delay), 2) if plan else None
+
+    def _count(self, key, n=1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def _journal(self, entry: dict) -> None:
+        with self._lock:
+            self._events.write(json.dumps(dict(entry, at=utc_now()), default=str) + "\n")
+            self._events.flush()
+
+    def receive(self, payload):
+        """
+        Handle one webhook payload. Returns (HTTP status, message).
+        """
+        self._count("received")
+        if not isinstance(payload, dict):
+            return 400, "expected a JSON object"
+        if self.shared_secret is not None and not hmac.compare_digest(
+                str(payload.get("sharedSecret") or ""), self.shared_secret):
+            return 403, "bad shared secret"
+
+        reason = None
+        net_id = payload.get("networkId")
+        if payload.get("organizationId") and str(payload["organizationId"]) != self.org_id:
+            reason = "other organization"
+        elif payload.get("alertTypeId") not in CONFIG_ALERT_TYPES:
+            reason = f"alert type {payload.get('alertTypeId')!r} is not a configuration change"
+        elif not net_id:
+            reason = "no networkId"
+        elif net_id not in self.target.locations:
+            with self._refresh_lock:
+                self.target.refresh()
+            if net_id not in self.target.locations:
+                reason = "network not exported"
+        if reason:
+            self._count("ignored")
+            return 202, f"ignored: {reason}"
+
+        services = services_for_event(payload)
+        self.exports.add(net_id, services)
+        return 202, f"queued {net_id}: {', '.join(sorted(services)) if services else 'all services'}"
+
+    def sync(self, net_id, services) -> None:
+        start = time.monotonic()
+        written, errors = self.target.export(net_id, services)
+        if self.target.manifest is not None and written:
+            self.target.manifest.save(advance=False)
+        seconds = round(time.monotonic() - start, 2)
+        self._count("synced")
+        self._count("files_written", len(written))
+        self._count("errors", len(errors))
+        self._journal({
+            "network_id": net_id,
+            "services": sorted(services) if services is not None else None,
+            "written": [str(p) for p in written],
+            "errors": errors,
+            "seconds": seconds,
+        })
+        label = ", ".join(sorted(services)) if services else "all services"
+        print(f"{'✅' if not errors else '⚠️'} {net_id} ({label}): {len(written)} files changed in {seconds}s"
+              + "".join(f"\n  ❌ {section}: {error}" for section, error in errors.items()))
+        if written and self.plans is not None:
+            cwd, workspace, target = self.target.plan_unit(net_id)
+            self.plans.add(str(cwd), {(workspace, target)})
+
+    def run_plans(self, cwd, units) -> None:
+        """
+        Plan every (workspace, target) of one Terraform root, one after the other.
+        """
+        by_workspace = {}
+        for workspace, target in units:
+            by_workspace.setdefault(workspace, set()).add(target)
+        for workspace, targets in sorted(by_workspace.items(), key=lambda item: item[0] or ""):
+            self.plan(Path(cwd), workspace, targets)
+
+    def plan(self, cwd: Path, workspace, targets) -> None:
+        cmd = [self.terraform, "plan", "-input=false", "-no-color", "-lock=false", "-detailed-exitcode"]
+        cmd += [f"-target={target}" for target in sorted(t for t in targets if t)]
+        env = dict(os.environ)
+        if workspace:
+            env["TF_WORKSPACE"] = workspace
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.relpath(cwd, self.target.path)).strip("_.") or "root"
+        log_path = self.state_dir / "plans" / f"{name}{'__' + workspace if workspace else ''}.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        start = time.monotonic()
+        try:
+            result = subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            returncode, output = result.returncode, result.stdout
+        except OSError as e:
+            returncode, output = 1, str(e)
+        log_path.write_text(output)
+        self._count("plans")
+        outcome = {0: "no changes", 2: "changes pending"}.get(returncode, f"failed (exit {returncode})")
+        summary = re.search(r"^Plan: .*$", output, re.M)
+        self._journal({"plan": str(cwd), "workspace": workspace, "targets": sorted(t for t in targets if t),
+                       "outcome": outcome, "seconds": round(time.monotonic() - start, 2), "log": str(log_path)})
+        print(f"{'📋' if returncode in (0, 2) else '❌'} terraform plan in {cwd}"
+              f"{' (workspace ' + workspace + ')' if workspace else ''}: {outcome}"
+              f"{' - ' + summary.group(0) if summary else ''} ({log_path})")
+
+    def status(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["exports"] = self.exports.status()
+        if self.plans is not None:
+            stats["plans_queue"] = self.plans.status()
+        return stats
+
+    def close(self) -> None:
+        self.exports.close()
+        if self.plans is not None:
+            self.plans.close()
+        self._events.close()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server_version = "meraki-sync"
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._reply(413, {"result": "payload too large"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self._reply(400, {"result": "invalid JSON"})
+            return
+        status, message = self.server.sync_daemon.receive(payload)
+        self._reply(status, {"result": message})
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/healthz":
+            self._reply(200, self.server.sync_daemon.status())
+        else:
+            self._reply(404, {"result": "not found"})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# ----------------------------- Test sender ----------------------------- #
+
+def sample_event(org_id, net_id, page, shared_secret=None) -> dict:
+    """
+    A "Settings changed" webhook payload as the Dashboard sends it.
+    """
+    return {
+        "version": "0.1",
+        "sharedSecret": shared_secret or "",
+        "sentAt": utc_now(),
+        "organizationId": org_id or "",
+        "networkId": net_id,
+        "alertId": f"local-{time.time_ns()}",
+        "alertType": "Settings changed",
+        "alertTypeId": "settings_changed",
+        "alertLevel": "informational",
+        "occurredAt": utc_now(),
+        "alertData": {"name": page, "changes": {}},
+    }
+
+
+def send_events(args) -> None:
+    for _ in range(args.repeat):
+        for net_id in args.send:
+            payload = sample_event(args.org_id, net_id, args.page, args.shared_secret)
+            request = urllib.request.Request(args.url, data=json.dumps(payload).encode("utf-8"),
+                                             headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    print(f"{net_id}: {response.status} {response.read().decode()}")
+            except urllib.error.HTTPError as e:
+                print(f"{net_id}: {e.code} {e.read().decode()}", file=sys.stderr)
+            except urllib.error.URLError as e:
+                print(f"Error sending to {args.url}: {e.reason}", file=sys.stderr)
+                sys.exit(1)
+
+
+# ----------------------------- Main ----------------------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-export networks from Dashboard configuration-change webhooks")
+    parser.add_argument("--api_key", "-k", help="Your Meraki API Key")
+    parser.add_argument("--org_name", "-n", help="Meraki Organization Name")
+    parser.add_argument("--path", "-p", default=".",
+                        help="Exported project: the brownfield directory or the workspace --output_dir (default: .)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--shared_secret", default=os.environ.get("MERAKI_WEBHOOK_SECRET"),
+                        help="Reject events without this shared secret (default: $MERAKI_WEBHOOK_SECRET)")
+    parser.add_argument("--debounce", type=float, default=10.0,
+                        help="Seconds without events before a network is re-exported (default: 10)")
+    parser.add_argument("--max_delay", type=float, default=60.0,
+                        help="Re-export a network at most this many seconds after its first event (default: 60)")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Networks re-exported concurrently (default: 4)")
+    parser.add_argument("--rate_limit", "-r", type=float, default=dashboard_scheduler.DEFAULT_RATE,
+                        help="Dashboard requests per second for this organization (default: 10)")
+    parser.add_argument("--plan", action="store_true", help="Run terraform plan for the roots of changed networks")
+    parser.add_argument("--plan_debounce", type=float, default=60.0,
+                        help="Seconds without changes before a root is planned (default: 60)")
+    parser.add_argument("--state_dir", default=None,
+                        help="Where events.jsonl and plan logs are kept (default: <path>/.sync)")
+    parser.add_argument("--verbose", action="store_true", help="Log every HTTP request")
+    sender = parser.add_argument_group("local test sender")
+    sender.add_argument("--send", action="append", metavar="NETWORK_ID",
+                        help="Post a sample Settings changed event for this network to --url and exit (repeatable)")
+    sender.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}/", help="Daemon URL for --send")
+    sender.add_argument("--page", default="", help="Dashboard page named in the sample event, e.g. 'Addressing & VLANs'")
+    sender.add_argument("--org_id", default=None, help="organizationId of the sample event")
+    sender.add_argument("--repeat", type=int, default=1, help="Send each event this many times (default: 1)")
+    args = parser.parse_args()
+
+    if args.send:
+        send_events(args)
+        return
+    if not args.api_key or not args.org_name:
+        parser.error("--api_key and --org_name are required unless --send is used")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.rate_limit <= 0:
+        parser.error("--rate_limit must be positive")
+    if args.debounce < 0 or args.plan_debounce < 0:
+        parser.error("debounce delays must not be negative")
+
+    path = Path(args.path)
+    layout, _ = drift.detect_layout(path)
+    if layout is None:
+        print(f"No brownfield or workspace export found under {path}", file=sys.stderr)
+        sys.exit(1)
+
+    scheduler = dashboard_scheduler.RequestScheduler(default_rate=args.rate_limit)
+    dashboard = dashboard_scheduler.ScheduledDashboard(
+        meraki.DashboardAPI(args.api_key, output_log=False, print_console=False, wait_on_rate_limit=False),
+        scheduler,
+    )
+    try:
+        orgs = dashboard.organizations.getOrganizations()
+    except Exception as e:
+        print(f"Error fetching organizations: {e}", file=sys.stderr)
+        sys.exit(1)
+    org_id = next((o["id"] for o in orgs if o.get("name", "").lower() == args.org_name.lower()), None)
+    if not org_id:
+        print(f"Organization '{args.org_name}' not found.", file=sys.stderr)
+        sys.exit(1)
+    dashboard = dashboard.for_org(org_id)
+
+    target_class = BrownfieldTarget if layout == "brownfield" else WorkspaceTarget
+    target = target_class(dashboard, org_id, path, load_manifest(path, org_id))
+    daemon = SyncDaemon(
+        target, org_id, Path(args.state_dir) if args.state_dir else path / ".sync",
+        shared_secret=args.shared_secret, debounce=args.debounce, max_delay=args.max_delay,
+        workers=args.workers, plan=args.plan, plan_debounce=args.plan_debounce,
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), WebhookHandler)
+    server.daemon_threads = True
+    server.sync_daemon = daemon
+    server.verbose = args.verbose
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Listening on http://{args.host}:{server.server_port}/ for {layout} export under {path} "
+          f"({len(target.locations)} networks, organization {org_id}); debounce {args.debounce}s"
+          f"{f', terraform plan after {args.plan_debounce}s' if args.plan else ''}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping; finishing pending syncs...")
+    finally:
+        server.server_close()
+        daemon.close()
+    stats = daemon.stats
+    print(f"{stats['received']} events received ({stats['ignored']} ignored), {stats['synced']} syncs, "
+          f"{stats['files_written']} files changed, {stats['errors']} errors, {stats['plans']} plans.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+action_batches.py
+
+Dashboard action batch engine.
+
+Configuration changes are expressed as actions ({"resource", "operation", "body"}) and
+sent as asynchronous action batches instead of one API call per resource:
+
+  - Actions are grouped per network. The Dashboard runs the actions of a batch in
+    order, so a group whose steps depend on each other (enable VLANs, then create
+    them) works without waiting between the steps.
+  - A batch is atomic (one failed action rolls back the whole batch), so every group
+    gets batches of its own, up to MAX_ACTIONS_PER_BATCH actions each: a network's
+    failure never undoes another network's changes. A group larger than one batch
+    becomes a chain of batches that run one after the other.
+  - Up to MAX_RUNNING_BATCHES batches (the Dashboard limit of running asynchronous
+    batches per organization) are in flight at once. Each is polled until it completes
+    or fails, polling quickly at first and backing off to poll_interval.
+
+Usage:
+    groups = [[action("/networks/L_1/appliance/vlans", "create", {...}), ...], ...]
+    runner = ActionBatchRunner(dashboard, org_id)
+    results = runner.run(pack_batches(groups))
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_ACTIONS_PER_BATCH = 100
+MAX_RUNNING_BATCHES = 5
+DEFAULT_POLL_INTERVAL = 5.0
+FIRST_POLL_INTERVAL = 0.5
+DEFAULT_TIMEOUT = 900.0
+
+
+def action(resource: str, operation: str, body: dict = None) -> dict:
+    entry = {"resource": resource, "operation": operation}
+    if body is not None:
+        entry["body"] = body
+    return entry
+
+
+def pack_batches(groups, batch_size: int = MAX_ACTIONS_PER_BATCH):
+    """
+    Pack ordered action groups into chains of batches, one chain per non-empty group.
+    Returns a list of chains; each chain is a list of batches (lists of actions) that
+    must run in sequence. Groups never share a batch, since a batch is rolled back as
+    a whole.
+    """
+    return [[group[i:i + batch_size] for i in range(0, len(group), batch_size)] for group in groups if group]
+
+
+class ActionBatchRunner:
+    """
+    Submits chains of action batches to one organization and waits for them, keeping
+    at most `concurrency` batches running.
+    """
+
+    def __init__(self, dashboard, org_id, concurrency: int = MAX_RUNNING_BATCHES,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, timeout: float = DEFAULT_TIMEOUT, log=print):
+        self.dashboard = dashboard
+        self.org_id = org_id
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.log = log
+
+    def submit(self, actions) -> dict:
+        return self.dashboard.organizations.createOrganizationActionBatch(
+            self.org_id, actions, confirmed=True, synchronous=False
+        )
+
+    def wait(self, batch_id) -> dict:
+        """
+        Poll a batch until it completes or fails; returns its last state.
+        """
+        deadline = time.monotonic() + self.timeout
+        delay = min(FIRST_POLL_INTERVAL, self.poll_interval)
+        while True:
+            batch = self.dashboard.organizations.getOrganizationActionBatch(self.org_id, batch_id)
+            status = batch.get("status") or {}
+            if status.get("completed") or status.get("failed"):
+                return batch
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"action batch {batch_id} still running after {self.timeout:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, self.poll_interval)
+
+    def run_batch(self, actions) -> dict:
+        """
+        Submit one batch and wait for it. Returns a result record; never raises.
+        """
+        start = time.monotonic()
+        result = {"id": None, "actions": len(actions), "status": "failed", "errors": []}
+        try:
+            batch = self.submit(actions)
+            result["id"] = batch.get("id")
+            status = batch.get("status") or {}
+            if not (status.get("completed") or status.get("failed")):
+                batch = self.wait(result["id"])
+                status = batch.get("status") or {}
+            result["status"] = "completed" if status.get("completed") and not status.get("failed") else "failed"
+            result["errors"] = list(status.get("errors") or [])
+        except Exception as e:
+            result["errors"].append(str(e))
+        result["seconds"] = round(time.monotonic() - start, 2)
+        return result
+
+    def run_chain(self, chain):
+        results = []
+        for i, actions in enumerate(chain):
+            if results and results[-1]["status"] != "completed":
+                results.append({"id": None, "actions": len(actions), "status": "skipped",
+                                "errors": ["an earlier batch of this chain failed"], "seconds": 0})
+                continue
+            result = self.run_batch(actions)
+            results.append(result)
+            mark = "✅" if result["status"] == "completed" else "❌"
+            self.log(f"{mark} Batch {result['id'] or '-'}: {len(actions)} actions {result['status']} "
+                     f"in {result['seconds']}s{'; ' + '; '.join(result['errors']) if result['errors'] else ''}")
+        return results
+
+    def run(self, chains):
+        """
+        Run every chain, at most `concurrency` batches at a time. Returns the batch
+        results, chain by chain.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return [result for results in executor.map(self.run_chain, chains) for result in results]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+checkpoint_journal.py
+
+Checkpoint journal for resumable exports.
+
+Every completed unit of work, a (network, service) pair such as ("L_123", "ssids"), is
+appended to a JSON-lines journal as soon as its file is on disk, and flushed before
+the next unit starts. The journal is synced to disk (fsync) once per network, with the
+record that completes it, and on close rather than after every unit. If a run dies
+part way (network blip, expired key, Ctrl-C), the next run with resume enabled reads
+the journal and skips every unit recorded as done, so only failed or missing units are
+fetched again.
+
+Each line is one JSON object, appended in a single write; a line torn by a crash is
+ignored when the journal is read back. The first line identifies the organization and
+data format, and a journal written for a different one is not resumed from.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+JOURNAL_VERSION = 1
+
+# Unit recorded once everything for a network (combined file, modules) was written.
+NETWORK_UNIT = "network"
+
+
+class CheckpointJournal:
+    """
+    Append-only record of completed (network, unit) pairs. Safe to use from several
+    export workers at once.
+    """
+
+    def __init__(self, path, org_id, data_format, resume=False):
+        self.path = str(path)
+        self.header = {"version": JOURNAL_VERSION, "org_id": str(org_id), "data_format": data_format}
+        self._lock = threading.Lock()
+        self._status = {}
+        self.resumed = False
+        if resume and os.path.isfile(self.path):
+            self._load()
+        if not self.resumed:
+            with open(self.path, "w") as f:
+                f.write(json.dumps(self.header) + "\n")
+        self._file = open(self.path, "a")
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            text = f.read()
+        lines = text.splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if header != self.header:
+            return
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                self._status[(entry["network"], entry["unit"])] = entry["status"]
+            except (ValueError, KeyError, TypeError):
+                continue
+        self.resumed = True
+        # Start the appended records on a fresh line after a torn write.
+        if not text.endswith("\n"):
+            with open(self.path, "a") as f:
+                f.write("\n")
+
+    def done(self, network, unit) -> bool:
+        with self._lock:
+            return self._status.get((str(network), unit)) == "done"
+
+    def network_done(self, network) -> bool:
+        """
+        True if the network was completed and none of its units is recorded as failed.
+        """
+        network = str(network)
+        with self._lock:
+            if self._status.get((network, NETWORK_UNIT)) != "done":
+                return False
+            return not any(n == network and s == "failed" for (n, _), s in self._status.items())
+
+    def record(self, network, unit, status="done") -> None:
+        """
+        Append a unit's outcome ("done" or "failed") and flush it; a network's
+        NETWORK_UNIT record also syncs the journal to disk.
+        """
+        entry = {
+            "network": str(network),
+            "unit": unit,
+            "status": status,
+            "at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+        }
+        with self._lock:
+            self._status[(entry["network"], unit)] = status
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            if unit == NETWORK_UNIT:
+                os.fsync(self._file.fileno())
+
+    def counts(self) -> dict:
+        """
+        Number of completed networks, and of done/failed units.
+        """
+        with self._lock:
+            statuses = dict(self._status)
+        return {
+            "networks": sum(1 for (_, unit), s in statuses.items() if unit == NETWORK_UNIT and s == "done"),
+            "done": sum(1 for (_, unit), s in statuses.items() if unit != NETWORK_UNIT and s == "done"),
+            "failed": sum(1 for s in statuses.values() if s == "failed"),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
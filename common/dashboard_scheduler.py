@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+dashboard_scheduler.py
+
+Rate-limit-aware request scheduler shared by the Meraki importers.
+
+The Dashboard API allows roughly 10 requests per second per organization. Instead of
+firing calls as fast as possible and recovering from 429 storms one call at a time,
+every call is routed through a token bucket per organization:
+
+  - Each organization gets its own bucket (default 10 req/s, configurable per org).
+  - Waiting callers are served by priority class, so organization-level inventory
+    (getOrganization* endpoints) is fetched before per-network detail.
+  - A 429 response pauses the whole bucket for the Retry-After period and the call
+    is retried, so every worker backs off together instead of hammering the API.
+  - Paginated listings (pages()) are sent one page at a time, following each page's
+    Link header: every page takes its own token, and a 429 retries that page only.
+
+Usage:
+    scheduler = RequestScheduler(default_rate=10)
+    dashboard = ScheduledDashboard(meraki.DashboardAPI(api_key, wait_on_rate_limit=False), scheduler)
+    orgs = dashboard.organizations.getOrganizations()
+    dashboard = dashboard.for_org(org_id)
+    vlans = dashboard.appliance.getNetworkApplianceVlans(net_id)
+    for page in dashboard.pages("organizations", "getOrganizationNetworks", org_id, perPage=100):
+        ...
+"""
+
+import copy
+import functools
+import heapq
+import itertools
+import threading
+import time
+
+DEFAULT_RATE = 10.0
+DEFAULT_RETRY_AFTER = 1.0
+MAX_RETRIES = 5
+
+# Priority classes: lower values are served first.
+PRIORITY_ORG = 0
+PRIORITY_NETWORK = 1
+
+
+def endpoint_priority(endpoint: str) -> int:
+    """
+    Map an SDK method name to its priority class.
+    """
+    return PRIORITY_ORG if endpoint.startswith("getOrganization") else PRIORITY_NETWORK
+
+
+def error_status(error):
+    """
+    Return the HTTP status carried by a Meraki SDK exception, if any.
+    """
+    return getattr(error, "status", None)
+
+
+def refused(error) -> bool:
+    """
+    True for a request the Dashboard refuses (4xx other than 429), e.g. VLANs on a
+    network without them. The exporters write such a service empty; any other error
+    is transient and leaves the previous data in place.
+    """
+    status = error_status(error)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def retry_after(error, default=DEFAULT_RETRY_AFTER) -> float:
+    """
+    Read the Retry-After header (seconds) from a Meraki SDK exception.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(float(headers.get("Retry-After")), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Callers block in acquire() until a token is available
+    and no caller with a higher priority (lower value) is waiting ahead of them.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self, priority: int = PRIORITY_NETWORK) -> None:
+        """
+        Block until a token has been taken for this caller.
+        """
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self._paused_until:
+                        timeout = self._paused_until - now
+                    elif self._waiters[0] != ticket:
+                        timeout = None
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    else:
+                        timeout = (1 - self._tokens) / self.rate
+                    self._cond.wait(timeout)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for the given number of seconds (e.g. after a 429).
+        The bucket restarts empty so the first second after the pause is not a burst.
+        """
+        with self._cond:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = 0.0
+                self._updated = until
+            self._cond.notify_all()
+
+
+class RequestScheduler:
+    """
+    Per-organization token buckets plus 429 handling. Calls made before an
+    organization is known (e.g. getOrganizations) share the bucket for org_id=None.
+    """
+
+    def __init__(self, default_rate: float = DEFAULT_RATE, rates: dict = None,
+                 max_retries: int = MAX_RETRIES, default_retry_after: float = DEFAULT_RETRY_AFTER):
+        self.default_rate = default_rate
+        self.rates = dict(rates or {})
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def bucket(self, org_id) -> TokenBucket:
+        with self._lock:
+            if org_id not in self._buckets:
+                self._buckets[org_id] = TokenBucket(self.rates.get(org_id, self.default_rate))
+            return self._buckets[org_id]
+
+    def call(self, org_id, func, *args, priority: int = PRIORITY_NETWORK, **kwargs):
+        """
+        Run func(*args, **kwargs) once a token is available for org_id, retrying
+        after the Retry-After period whenever the Dashboard answers 429.
+        """
+        bucket = self.bucket(org_id)
+        attempt = 0
+        self._local.retries = 0
+        self._local.waited = 0.0
+        while True:
+            start = time.monotonic()
+            bucket.acquire(priority)
+            self._local.waited += time.monotonic() - start
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if error_status(e) != 429 or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self._local.retries = attempt
+                bucket.pause(retry_after(e, self.default_retry_after))
+
+    def last_call_stats(self):
+        """
+        (retries after 429, seconds spent waiting for tokens) of the last call made
+        through the scheduler on the current thread.
+        """
+        return getattr(self._local, "retries", 0), getattr(self._local, "waited", 0.0)
+
+
+class _FirstPageRequest:
+    """
+    Stand-in for the SDK session of a section: records the request a paginated list
+    call would start with (metadata, URL, query parameters and paging direction)
+    instead of sending it. Everything else is read from the real session.
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def get_pages(self, metadata, url, params=None, total_pages=-1, direction="next", *args, **kwargs):
+        self.first_request = (metadata, url, params, direction)
+        return []
+
+
+def page_items(results):
+    """
+    The items of one page of a listing: the page itself, or its "items".
+    """
+    if isinstance(results, dict):
+        return results.get("items", [])
+    return results or []
+
+
+class ScheduledDashboard:
+    """
+    Drop-in proxy for meraki.DashboardAPI: dashboard.<section>.<method>(...) calls
+    are routed through the scheduler under this proxy's organization.
+    """
+
+    def __init__(self, dashboard, scheduler: RequestScheduler, org_id=None):
+        self._dashboard = dashboard
+        self._scheduler = scheduler
+        self.org_id = org_id
+
+    def for_org(self, org_id) -> "ScheduledDashboard":
+        """
+        Return a proxy sharing the same client and scheduler, charged to org_id.
+        """
+        return ScheduledDashboard(self._dashboard, self._scheduler, org_id)
+
+    def pages(self, section: str, endpoint: str, *args, **kwargs):
+        """
+        Yield the pages of a paginated list call, e.g. pages("organizations",
+        "getOrganizationNetworks", org_id, perPage=100), one request per page. The SDK
+        builds the first request; each following page is the next (or, for listings
+        paged backwards, prev) link of the previous page's Link header, whose cursor is
+        opaque to the client. Every page is a separate scheduled call, so it takes its
+        own token and a 429 retries that page rather than the whole listing.
+        """
+        sdk_section = getattr(self._dashboard, section)
+        session = sdk_section._session
+        probe = copy.copy(sdk_section)
+        probe._session = _FirstPageRequest(session)
+        getattr(probe, endpoint)(*args, **kwargs)
+        metadata, url, params, direction = probe._session.first_request
+        priority = endpoint_priority(endpoint)
+        while url:
+            response = self._scheduler.call(self.org_id, session.request, dict(metadata), "GET", url,
+                                            params=params, priority=priority)
+            if response is None or response.status_code == 204:
+                return
+            url, params = response.links.get(direction, {}).get("url"), None
+            items = page_items(response.json())
+            response.close()
+            yield items
+
+    def __getattr__(self, name):
+        return _ScheduledSection(getattr(self._dashboard, name), self._scheduler, self.org_id)
+
+
+class _ScheduledSection:
+    def __init__(self, section, scheduler, org_id):
+        self._section = section
+        self._scheduler = scheduler
+        self._org_id = org_id
+
+    def __getattr__(self, name):
+        method = getattr(self._section, name)
+        if not callable(method):
+            return method
+        priority = endpoint_priority(name)
+
+        @functools.wraps(method)
+        def scheduled(*args, **kwargs):
+            return self._scheduler.call(self._org_id, method, *args, priority=priority, **kwargs)
+
+        return scheduled
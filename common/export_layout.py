@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+export_layout.py
+
+File layout of the importers' data trees, shared by the tools that rewrite or render
+them (brownfield/sync_daemon.py, brownfield/materialize_snapshot.py).
+
+  brownfield  data/<format>/<org>/<network>/<network>_<id>_<suffix>.<format>, one file
+              per section (SECTION_FILES), spliced into the combined
+              data/<format>/<org>/<network>_<id>.<format> in SECTIONS order
+  workspace   data/<sanitize_name(network)>/<file>.<format> (WORKSPACE_FILES)
+
+Usage:
+    from export_layout import LIST_SECTIONS, SECTION_FILES, SECTIONS
+"""
+
+import re
+
+# Sections of a brownfield combined document, in document order, and the suffix of
+# each section's own file.
+SECTIONS = ("network", "devices", "vlans", "ssids", "firewallRules", "switchPorts", "wirelessSettings",
+            "webhook_receivers", "alert_settings")
+SECTION_FILES = {
+    "network": "net_settings",
+    "devices": "devices",
+    "vlans": "mx_vlans",
+    "ssids": "ssids",
+    "firewallRules": "firewallrules",
+    "switchPorts": "switchPorts",
+    "wirelessSettings": "wireless_settings",
+    "webhook_receivers": "webhook_receivers",
+    "alert_settings": "alert_settings",
+}
+# Sections written as a list, one record at a time.
+LIST_SECTIONS = {"devices", "switchPorts"}
+
+# Workspace data file of each section.
+WORKSPACE_FILES = {
+    "ssids": "ssids",
+    "firewallRules": "firewall_rules",
+    "webhook_receivers": "webhook_servers",
+    "alert_settings": "alerts",
+    "vlans": "vlans_mx",
+}
+
+
+def sanitize_name(name: str) -> str:
+    """
+    Sanitize network names into safe Terraform workspace/module identifiers:
+    lowercase, alphanumeric and underscores only, no leading digits.
+    """
+    sanitized = re.sub(r"[^A-Za-z0-9_]+", "_", name).lower()
+    if re.match(r"^\d", sanitized):
+        sanitized = f"net_{sanitized}"
+    return sanitized
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+export_manifest.py
+
+Incremental export support shared by the Meraki importers.
+
+A manifest (JSON) is kept next to the exported data and records, per network, when it
+was last fetched and the SHA-256 of every file written for it. On the next run:
+
+  - The organization change log (getOrganizationConfigurationChanges) since the last
+    run tells which networks were touched; only those, plus networks not yet in the
+    manifest or with missing files, are fetched again.
+  - Files are only rewritten when their content hash differs from the recorded one,
+    so unchanged YAML keeps its mtime and Terraform/git see no churn.
+
+The Dashboard API does not expose ETags on the configuration endpoints used here, so
+the change log is the change signal.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import org_inventory
+
+MANIFEST_VERSION = 1
+
+# Overlap applied to the change-log window to absorb clock skew between runs.
+CHANGE_LOG_OVERLAP = timedelta(minutes=5)
+
+# The change log only goes back this far; older manifests trigger a full export.
+CHANGE_LOG_RETENTION = timedelta(days=365)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class ExportManifest:
+    """
+    Per-network/per-file content hashes plus the time of the last completed run.
+    Safe to use from several export workers at once.
+    """
+
+    def __init__(self, path, org_id):
+        self.path = str(path)
+        self.base_dir = os.path.dirname(os.path.abspath(self.path))
+        self.org_id = str(org_id)
+        self.started_at = utc_now()
+        self._lock = threading.Lock()
+        self._data = {"version": MANIFEST_VERSION, "org_id": self.org_id, "last_run": None, "networks": {}}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if data and data.get("version") == MANIFEST_VERSION and data.get("org_id") == self.org_id:
+                self._data = data
+
+    @property
+    def last_run(self):
+        value = self._data.get("last_run")
+        return datetime.fromisoformat(value) if value else None
+
+    def _key(self, path) -> str:
+        return os.path.relpath(os.path.abspath(str(path)), self.base_dir)
+
+    def _files_present(self, net_id) -> bool:
+        files = self._data["networks"].get(net_id, {}).get("files", {})
+        return bool(files) and all(os.path.isfile(os.path.join(self.base_dir, p)) for p in files)
+
+    def changed_networks(self, dashboard, org_id):
+        """
+        IDs of the networks in the organization change log since the last run, or None
+        when everything must be fetched again (first run, or the change log no longer
+        covers the last run).
+        """
+        last_run = self.last_run
+        if last_run is None or utc_now() - last_run > CHANGE_LOG_RETENTION - CHANGE_LOG_OVERLAP:
+            return None
+
+        since = (last_run - CHANGE_LOG_OVERLAP).isoformat().replace("+00:00", "Z")
+        pages = org_inventory.iter_pages(dashboard, "organizations", "getOrganizationConfigurationChanges",
+                                         org_id, t0=since)
+        return {c.get("networkId") for page in pages for c in page if c.get("networkId")}
+
+    def needs_refresh(self, net_id, changed) -> bool:
+        """
+        True if a network must be fetched again, given changed_networks(): it changed,
+        is new, or some of its files are missing.
+        """
+        return (
+            changed is None or net_id in changed
+            or net_id not in self._data["networks"] or not self._files_present(net_id)
+        )
+
+    def networks_to_refresh(self, dashboard, org_id, network_ids):
+        """
+        Return the subset of network_ids that must be fetched again: everything on the
+        first run (or when the change log no longer covers the last run), otherwise
+        networks changed since the last run, new networks and networks with missing files.
+        """
+        changed = self.changed_networks(dashboard, org_id)
+        return {net_id for net_id in network_ids if self.needs_refresh(net_id, changed)}
+
+    def write_text(self, path, text: str, net_id=None) -> bool:
+        """
+        Write text to path unless the file already holds exactly this content (per the
+        recorded hash). Returns True if the file was written.
+        """
+        return self.write_chunks(path, [text], net_id)
+
+    def write_chunks(self, path, chunks, net_id=None) -> bool:
+        """
+        Stream text chunks to a temporary file while hashing them, then move it over
+        path only if the content differs from the recorded hash. The document is never
+        held in memory as a whole. Returns True if the file was written.
+        """
+        key = self._key(path)
+        tmp_path = f"{path}.tmp"
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, "w") as f:
+                for chunk in chunks:
+                    digest.update(chunk.encode("utf-8"))
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        digest = digest.hexdigest()
+        with self._lock:
+            entry = self._data["networks"].setdefault(net_id or "_org", {"files": {}})
+            unchanged = entry["files"].get(key) == digest and os.path.isfile(path)
+        if unchanged:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+        with self._lock:
+            entry["files"][key] = digest
+        return True
+
+    def mark_fetched(self, net_id) -> None:
+        with self._lock:
+            entry = self._data["networks"].setdefault(net_id, {"files": {}})
+            entry["fetched_at"] = utc_now().isoformat()
+
+    def forget(self, net_id) -> None:
+        """
+        Drop a network (e.g. after a failed fetch) so the next run fetches it again.
+        """
+        with self._lock:
+            self._data["networks"].pop(net_id, None)
+
+    def save(self, advance: bool = True) -> None:
+        """
+        Record this run's start time as the new change-log watermark and write the
+        manifest atomically. A run that only covered some networks (e.g. a filtered
+        export) passes advance=False, so changes to the other networks since the
+        previous watermark are still picked up next time.
+        """
+        with self._lock:
+            if advance:
+                self._data["last_run"] = self.started_at.isoformat()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
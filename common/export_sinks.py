@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+export_sinks.py
+
+Extra outputs written by the Meraki importers in the same fetch pass as the Terraform
+data tree, from the same records, so other tools never need the organization to be
+downloaded again or the Terraform state to be converted (tfstate_to_yaml.py):
+
+  --inventory_file   consolidated inventory, one record per (network, service):
+                     {"network_id": ..., "network": ..., "service": ..., "data": ...}
+                     as NDJSON (.ndjson/.jsonl), or as a JSON list (.json)
+  --ansible_dir      Ansible inventory: hosts.yml with one group per network and its
+                     devices as hosts (by serial), group_vars/<network>/meraki_<service>.yml
+                     and host_vars/<serial>/meraki_device.yml / meraki_switch_ports.yml
+  --snapshot_db      SQLite snapshot store keeping every run's records (snapshot_store.py)
+
+Records are passed on as each service is fetched and written immediately; nothing is
+buffered per network. Both outputs are complete after partial runs (--incremental,
+--resume, network filters): entries of listed networks that were not exported in this
+run are carried over from the previous output.
+
+Usage:
+    export_sinks.add_arguments(parser)
+    sinks = export_sinks.from_args(args, org_id, "brownfield", org_name)
+    sinks.record(net, "vlans", vlans)
+    devices = sinks.capture(net, "devices", device_generator)   # records once exhausted
+    sinks.close(listed_network_ids)
+"""
+
+import json
+import os
+import re
+import threading
+
+import serialization
+import snapshot_store
+
+# Services whose records are lists of devices, written as Ansible host_vars.
+DEVICE_SERVICES = {"devices": "meraki_device", "switchPorts": "meraki_switch_ports"}
+
+
+def add_arguments(parser) -> None:
+    parser.add_argument("--inventory_file", default=None,
+                        help="Also write a consolidated inventory of every fetched record "
+                             "(.ndjson/.jsonl: one JSON object per line, .json: a JSON list)")
+    parser.add_argument("--ansible_dir", default=None,
+                        help="Also write an Ansible inventory (hosts.yml, group_vars, host_vars) to this directory")
+    parser.add_argument("--snapshot_db", default=None,
+                        help="Also record every fetched record as a run in this SQLite snapshot database "
+                             "(history is kept; see materialize_snapshot.py)")
+
+
+def from_args(args, org_id, layout: str, org_name=None) -> "SinkSet":
+    """
+    The sinks selected on the command line. layout (brownfield or workspace) and
+    org_name describe the run in the snapshot store.
+    """
+    sinks = []
+    if args.inventory_file:
+        sinks.append(InventorySink(args.inventory_file, org_id))
+    if args.ansible_dir:
+        sinks.append(AnsibleSink(args.ansible_dir))
+    if args.snapshot_db:
+        sinks.append(snapshot_store.SnapshotSink(args.snapshot_db, org_id, org_name, layout, args.data_format))
+    return SinkSet(sinks)
+
+
+def _write_atomic(path, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class SinkSet:
+    """
+    Fans records out to the configured sinks. Safe to use from several export workers
+    at once; with no sinks configured every call is a no-op.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.sinks)
+
+    def record(self, net, service: str, data) -> None:
+        for sink in self.sinks:
+            sink.record(net, service, data)
+
+    def capture(self, net, service: str, items):
+        """
+        Pass a streamed list section through unchanged, recording it once the stream is
+        exhausted. Without sinks the stream is returned as is.
+        """
+        if not self.sinks:
+            return items
+        if isinstance(items, (list, dict)):
+            self.record(net, service, items)
+            return items
+
+        def passthrough():
+            collected = []
+            for item in items:
+                collected.append(item)
+                yield item
+            self.record(net, service, collected)
+
+        return passthrough()
+
+    def close(self, listed_network_ids=None) -> None:
+        """
+        Finish every sink. Entries from the previous output of networks in
+        listed_network_ids that were not recorded in this run are kept.
+        """
+        listed_network_ids = set(listed_network_ids or ())
+        for sink in self.sinks:
+            sink.close(listed_network_ids)
+
+
+class InventorySink:
+    """
+    Consolidated inventory file. NDJSON records are appended to a temporary file as
+    they arrive; the JSON list form is written from the same lines at close.
+    """
+
+    def __init__(self, path, org_id):
+        self.path = str(path)
+        self.org_id = str(org_id)
+        self.as_list = self.path.endswith(".json")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lines_path = f"{self.path}.lines.tmp"
+        self._file = open(self._lines_path, "w")
+        self._lock = threading.Lock()
+        self._networks = set()
+
+    def record(self, net, service: str, data) -> None:
+        line = json.dumps({
+            "org_id": self.org_id,
+            "network_id": net["id"],
+            "network": net.get("name"),
+            "service": service,
+            "data": data,
+        }, default=str)
+        with self._lock:
+            self._networks.add(net["id"])
+            self._file.write(line + "\n")
+
+    def _previous_records(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path) as f:
+            if self.as_list:
+                try:
+                    yield from json.load(f)
+                except ValueError:
+                    return
+            else:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def close(self, listed_network_ids) -> None:
+        with self._lock:
+            for record in self._previous_records():
+                net_id = record.get("network_id")
+                if net_id in listed_network_ids and net_id not in self._networks and record.get("org_id") == self.org_id:
+                    self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.close()
+
+            if not self.as_list:
+                os.replace(self._lines_path, self.path)
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(self._lines_path) as lines, open(tmp_path, "w") as f:
+                f.write("[")
+                for i, line in enumerate(lines):
+                    f.write(("," if i else "") + "\n  " + line.rstrip("\n"))
+                f.write("\n]\n")
+            os.replace(tmp_path, self.path)
+            os.remove(self._lines_path)
+
+
+def ansible_name(name: str) -> str:
+    """
+    Turn a network name into a valid Ansible group name.
+    """
+    name = re.sub(r"[^A-Za-z0-9_]+", "_", name).strip("_").lower() or "network"
+    return name if re.match(r"[a-z_]", name) else f"net_{name}"
+
+
+def ansible_var(service: str) -> str:
+    """
+    Variable holding a service in group_vars: vlans -> meraki_vlans,
+    firewallRules -> meraki_firewall_rules.
+    """
+    return "meraki_" + re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", service).lower()
+
+
+class AnsibleSink:
+    """
+    Ansible inventory directory. Variable files are written as each record arrives;
+    hosts.yml, which needs every network's group and hosts, is written at close.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self._lock = threading.Lock()
+        self._groups = {}    # network ID -> group name
+        self._hosts = {}     # group name -> set of serials
+        os.makedirs(os.path.join(self.directory, "group_vars"), exist_ok=True)
+        os.makedirs(os.path.join(self.directory, "host_vars"), exist_ok=True)
+
+    def _group(self, net) -> str:
+        with self._lock:
+            group = self._groups.get(net["id"])
+            if group is None:
+                group = ansible_name(net.get("name") or net["id"])
+                if group in self._hosts:
+                    group = f"{group}_{ansible_name(net['id'])}"
+                self._groups[net["id"]] = group
+                self._hosts[group] = set()
+            return group
+
+    def _write_vars(self, kind: str, name: str, variable: str, data) -> None:
+        directory = os.path.join(self.directory, kind, name)
+        os.makedirs(directory, exist_ok=True)
+        _write_atomic(os.path.join(directory, f"{variable}.yml"), serialization.dump_yaml({variable: data}))
+
+    def record(self, net, service: str, data) -> None:
+        group = self._group(net)
+        if service not in DEVICE_SERVICES:
+            self._write_vars("group_vars", group, ansible_var(service), data)
+            return
+        for item in data or []:
+            serial = item.get("serial")
+            if not serial:
+                continue
+            with self._lock:
+                self._hosts[group].add(serial)
+            value = item.get("ports", []) if service == "switchPorts" else item
+            self._write_vars("host_vars", serial, DEVICE_SERVICES[service], value)
+
+    def close(self, listed_network_ids) -> None:
+        path = os.path.join(self.directory, "hosts.yml")
+        groups = {}
+        if os.path.isfile(path):
+            try:
+                previous = serialization.load_file(path) or {}
+            except Exception:
+                previous = {}
+            for group, entry in (previous.get("all", {}).get("children") or {}).items():
+                net_id = ((entry or {}).get("vars") or {}).get("meraki_network_id")
+                if net_id in listed_network_ids and net_id not in self._groups:
+                    groups[group] = entry
+        for net_id, group in self._groups.items():
+            groups[group] = {
+                "hosts": {serial: None for serial in sorted(self._hosts[group])},
+                "vars": {"meraki_network_id": net_id},
+            }
+        _write_atomic(path, serialization.dump_yaml({"all": {"children": dict(sorted(groups.items()))}}))
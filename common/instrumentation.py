@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+instrumentation.py
+
+Per-call and per-file metrics for the Meraki importers.
+
+Every Dashboard call that reaches the API (cache hits are not calls) and every data
+file written is recorded as one JSON line:
+
+  {"kind": "call", "endpoint": "getNetworkApplianceVlans", "scope": "L_123", "network": "L_123",
+   "seconds": 0.412, "wait_seconds": 0.1, "latency_seconds": 0.312, "retries": 0, "bytes": 5321}
+  {"kind": "write", "path": "data/yaml/...", "network": "L_123", "seconds": 0.003, "bytes": 5120}
+
+Failed calls add the HTTP status from the SDK exception (or null) and an "error"
+message; successful calls have no status, since the SDK only returns the response
+body. "seconds" is the whole call, "wait_seconds" the part spent waiting for a
+rate-limiter token and "latency_seconds" the rest: the time the Dashboard took,
+including 429 retries. At the end of a run, summary_lines() reports p50/p95 latency
+(latency_seconds) per endpoint, retries, errors per endpoint and the slowest networks
+(latency_seconds of their calls plus the seconds of their writes, so time spent queued
+or waiting for tokens does not count), which is what worker counts and rate limits are
+tuned against.
+
+Usage:
+    metrics = MetricsRecorder("metrics.jsonl")
+    dashboard = CachedDashboard(InstrumentedDashboard(ScheduledDashboard(api, scheduler), metrics, scheduler), cache)
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+
+from dashboard_scheduler import error_status
+
+
+def percentile(values, pct: float) -> float:
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class MetricsRecorder:
+    """
+    Collects call and write records, appends them to a JSON-lines file (if a path is
+    given) and keeps them in memory for the end-of-run summary. Thread-safe.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path) if path else None
+        self._lock = threading.Lock()
+        self._file = open(self.path, "w") if self.path else None
+        self._networks = {}
+        self.calls = []
+        self.writes = []
+
+    def set_networks(self, scope_to_network: dict) -> None:
+        """
+        Map call scopes that are not network IDs (device serials) to their network.
+        """
+        with self._lock:
+            self._networks.update(scope_to_network)
+
+    def network_for(self, scope):
+        if scope is None:
+            return None
+        scope = str(scope)
+        with self._lock:
+            network = self._networks.get(scope)
+        if network is not None:
+            return network
+        # Network IDs look like L_..., N_... and are their own network.
+        return scope if scope[:2] in ("L_", "N_") else None
+
+    def _emit(self, record: dict) -> None:
+        with self._lock:
+            (self.calls if record["kind"] == "call" else self.writes).append(record)
+            if self._file is not None:
+                self._file.write(json.dumps(record) + "\n")
+
+    def record_call(self, endpoint, scope, seconds, wait_seconds=0.0, retries=0, nbytes=0, error=None,
+                    status=None) -> None:
+        """
+        Record one call; status and error are given for failed calls only.
+        """
+        record = {
+            "kind": "call",
+            "endpoint": endpoint,
+            "scope": None if scope is None else str(scope),
+            "network": self.network_for(scope),
+            "seconds": round(seconds, 4),
+            "wait_seconds": round(wait_seconds, 4),
+            "latency_seconds": round(max(seconds - wait_seconds, 0.0), 4),
+            "retries": retries,
+            "bytes": nbytes,
+        }
+        if error is not None:
+            record["status"] = status
+            record["error"] = error
+        self._emit(record)
+
+    def record_write(self, path, network, seconds, nbytes, written=True) -> None:
+        self._emit({
+            "kind": "write",
+            "path": str(path),
+            "network": network,
+            "seconds": round(seconds, 4),
+            "bytes": nbytes,
+            "written": written,
+        })
+
+    def summary_lines(self, top: int = 5):
+        """
+        Human-readable end-of-run report.
+        """
+        with self._lock:
+            calls = list(self.calls)
+            writes = list(self.writes)
+
+        lines = [f"{len(calls)} Dashboard calls, {sum(c['bytes'] for c in calls)} bytes received; "
+                 f"{len(writes)} files, {sum(w['bytes'] for w in writes)} bytes written"]
+        by_endpoint = {}
+        for c in calls:
+            by_endpoint.setdefault(c["endpoint"], []).append(c)
+        if by_endpoint:
+            lines.append(f"  {'endpoint':<48} {'calls':>6} {'p50 s':>7} {'p95 s':>7} {'retries':>7} {'errors':>6}")
+        for endpoint, records in sorted(by_endpoint.items(), key=lambda kv: -sum(c["seconds"] for c in kv[1])):
+            latencies = [c["latency_seconds"] for c in records]
+            lines.append(
+                f"  {endpoint:<48} {len(records):>6} {percentile(latencies, 50):>7.3f} "
+                f"{percentile(latencies, 95):>7.3f} {sum(c['retries'] for c in records):>7} "
+                f"{sum(1 for c in records if 'error' in c):>6}"
+            )
+
+        errors = {}
+        for c in calls:
+            if "error" in c:
+                key = (c["endpoint"], c["status"])
+                errors[key] = errors.get(key, 0) + 1
+        if errors:
+            lines.append("  Errors:")
+            for (endpoint, status), count in sorted(errors.items(), key=lambda kv: -kv[1]):
+                lines.append(f"    {endpoint} (status {status}): {count}")
+
+        per_network = {}
+        for record in calls + writes:
+            if record["network"]:
+                seconds = record["latency_seconds"] if record["kind"] == "call" else record["seconds"]
+                per_network[record["network"]] = per_network.get(record["network"], 0.0) + seconds
+        if per_network:
+            lines.append("  Slowest networks (call latency + write seconds):")
+            for network, seconds in sorted(per_network.items(), key=lambda kv: -kv[1])[:top]:
+                lines.append(f"    {network}: {seconds:.2f}s")
+        return lines
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def response_size(value) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class InstrumentedDashboard:
+    """
+    Proxy for a DashboardAPI or ScheduledDashboard that records every call. With the
+    scheduler that routes the calls, retries after 429 and the time spent waiting for
+    a token are recorded too.
+    """
+
+    def __init__(self, dashboard, recorder: MetricsRecorder, scheduler=None):
+        self._dashboard = dashboard
+        self._recorder = recorder
+        self._scheduler = scheduler
+
+    def for_org(self, org_id) -> "InstrumentedDashboard":
+        return InstrumentedDashboard(self._dashboard.for_org(org_id), self._recorder, self._scheduler)
+
+    def pages(self, section: str, endpoint: str, *args, **kwargs):
+        """
+        The wrapped dashboard's pages(), recording every page as one call.
+        """
+        pages = self._dashboard.pages(section, endpoint, *args, **kwargs)
+        scope = args[0] if args else None
+        while True:
+            start = time.monotonic()
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            except Exception as e:
+                retries, waited = self._scheduler.last_call_stats() if self._scheduler else (0, 0.0)
+                self._recorder.record_call(endpoint, scope, time.monotonic() - start, waited, retries,
+                                           error=str(e)[:200], status=error_status(e))
+                raise
+            retries, waited = self._scheduler.last_call_stats() if self._scheduler else (0, 0.0)
+            self._recorder.record_call(endpoint, scope, time.monotonic() - start, waited, retries,
+                                       response_size(page))
+            yield page
+
+    def __getattr__(self, name):
+        return _InstrumentedSection(getattr(self._dashboard, name), self._recorder, self._scheduler)
+
+
+class _InstrumentedSection:
+    def __init__(self, section, recorder, scheduler):
+        self._section = section
+        self._recorder = recorder
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        method = getattr(self._section, name)
+        if not callable(method):
+            return method
+        recorder = self._recorder
+        scheduler = self._scheduler
+
+        @functools.wraps(method)
+        def instrumented(*args, **kwargs):
+            scope = args[0] if args else None
+            start = time.monotonic()
+            try:
+                value = method(*args, **kwargs)
+            except Exception as e:
+                retries, waited = scheduler.last_call_stats() if scheduler else (0, 0.0)
+                recorder.record_call(name, scope, time.monotonic() - start, waited, retries,
+                                     error=str(e)[:200], status=error_status(e))
+                raise
+            retries, waited = scheduler.last_call_stats() if scheduler else (0, 0.0)
+            recorder.record_call(name, scope, time.monotonic() - start, waited, retries, response_size(value))
+            return value
+
+        return instrumented
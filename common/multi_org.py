@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+multi_org.py
+
+Export several organizations in one run with one API key.
+
+--all_orgs, or one or more --org NAME|ID, runs the importer once per selected
+organization. Each run is a separate process with its own output root and its own
+request scheduler. Every organization therefore keeps the full per-organization
+budget (--rate_limit), and with --org_workers organizations exported at a time the
+total time approaches that of the slowest organization rather than the sum. The
+Dashboard also limits requests per source IP (PER_IP_LIMIT), so --org_workers ×
+--rate_limit should stay under it.
+
+Each organization's output goes to its root's export.log. A combined summary is
+printed and written as JSON: per organization, the status, wall time, Dashboard calls,
+retries (mostly 429s), failed calls and files written, read from the run's metrics file.
+
+Usage:
+    multi_org.add_arguments(parser)
+    if multi_org.active(args):
+        sys.exit(multi_org.export_organizations(args, dashboard, launch, parent_dir))
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+PER_IP_LIMIT = 100
+
+# Options of the parent run that are not passed on to the per-organization runs.
+MULTI_ORG_FLAGS = {"--all_orgs"}
+MULTI_ORG_VALUED = {"--org", "--org_workers", "--orgs_summary", "--org_name", "-n", "--org_id"}
+
+
+def add_arguments(parser) -> None:
+    parser.add_argument("--all_orgs", action="store_true",
+                        help="Export every organization the API key can access, each into its own directory")
+    parser.add_argument("--org", action="append", default=[], metavar="NAME_OR_ID",
+                        help="Export this organization into its own directory (repeatable)")
+    parser.add_argument("--org_workers", type=int, default=4,
+                        help="Organizations exported concurrently with --all_orgs/--org (default: 4)")
+    parser.add_argument("--orgs_summary", default=None,
+                        help="Where the combined JSON summary of a multi-organization run is written "
+                             "(default: orgs_summary.json next to the organization directories)")
+
+
+def active(args) -> bool:
+    return bool(args.all_orgs or args.org)
+
+
+def validate(parser, args) -> None:
+    if active(args) and (args.org_name or args.org_id):
+        parser.error("--org_name/--org_id cannot be combined with --all_orgs/--org")
+    if not active(args) and not (args.org_name or args.org_id):
+        parser.error("one of --org_name, --org_id, --org or --all_orgs is required")
+    if args.org_workers < 1:
+        parser.error("--org_workers must be at least 1")
+
+
+def select(orgs, args):
+    """
+    The organizations chosen by --all_orgs or --org (matched by ID, or by name
+    without regard to case), in the order given. Raises ValueError for an --org that
+    matches nothing.
+    """
+    if args.all_orgs:
+        return list(orgs)
+    selected, missing = {}, []
+    for wanted in args.org:
+        match = next((o for o in orgs if str(o.get("id")) == wanted), None)
+        if match is None:
+            match = next((o for o in orgs if o.get("name", "").lower() == wanted.lower()), None)
+        if match is None:
+            missing.append(wanted)
+        else:
+            selected.setdefault(match["id"], match)
+    if missing:
+        raise ValueError(f"organization(s) not found: {', '.join(missing)}")
+    return list(selected.values())
+
+
+def root_names(orgs) -> dict:
+    """
+    Organization ID -> directory name: the sanitized organization name, with the ID
+    appended when two organizations would share it.
+    """
+    names = {}
+    counts = {}
+    for org in orgs:
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", org.get("name") or "").strip("_.") or str(org["id"])
+        names[org["id"]] = name
+        counts[name.lower()] = counts.get(name.lower(), 0) + 1
+    return {org_id: name if counts[name.lower()] == 1 else f"{name}_{org_id}" for org_id, name in names.items()}
+
+
+def strip_options(argv, flags=(), valued=()):
+    """
+    Remove options (and the values of valued options, as "--opt value" or
+    "--opt=value") from an argument list.
+    """
+    flags, valued = set(flags), set(valued)
+    kept = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split("=", 1)[0]
+        if name in flags:
+            continue
+        if name in valued:
+            skip = "=" not in arg
+            continue
+        kept.append(arg)
+    return kept
+
+
+def child_argv(argv=None, valued=()):
+    """
+    The parent's arguments without the multi-organization options (and any other
+    valued options given), to which each run adds its own --org_id. Organizations are
+    passed on by ID, since several can share a name.
+    """
+    return strip_options(sys.argv[1:] if argv is None else argv, MULTI_ORG_FLAGS, MULTI_ORG_VALUED | set(valued))
+
+
+def metrics_totals(path) -> dict:
+    """
+    Dashboard calls, retries (mostly 429s), failed calls and files written, from a metrics file.
+    """
+    totals = {"calls": 0, "retries": 0, "failed_calls": 0, "files_written": 0, "bytes_written": 0}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("kind") == "call":
+                    totals["calls"] += 1
+                    totals["retries"] += record.get("retries") or 0
+                    totals["failed_calls"] += "error" in record
+                elif record.get("kind") == "write" and record.get("written", True):
+                    totals["files_written"] += 1
+                    totals["bytes_written"] += record.get("bytes") or 0
+    except OSError:
+        pass
+    return totals
+
+
+def run_organization(org, root, launch) -> dict:
+    """
+    Run one organization's export to completion in its root directory.
+    launch(org, root) returns {"cmd": [...], "metrics": metrics file, relative to root}.
+    """
+    run = launch(org, root)
+    os.makedirs(root, exist_ok=True)
+    log_path = os.path.join(root, "export.log")
+    start = time.monotonic()
+    with open(log_path, "w") as log:
+        try:
+            returncode = subprocess.run(run["cmd"], cwd=root, stdout=log, stderr=subprocess.STDOUT).returncode
+        except OSError as e:
+            log.write(f"{e}\n")
+            returncode = 1
+    entry = {
+        "id": org["id"],
+        "name": org.get("name"),
+        "root": root,
+        "status": "ok" if returncode == 0 else "failed",
+        "exit_code": returncode,
+        "seconds": round(time.monotonic() - start, 2),
+        "log": log_path,
+    }
+    entry.update(metrics_totals(os.path.join(root, run["metrics"])))
+    return entry
+
+
+def export_organizations(args, dashboard, launch, parent_dir) -> int:
+    """
+    Export the selected organizations concurrently and write the combined summary.
+    Returns the exit code: 0 if every organization was exported, 1 otherwise.
+    """
+    try:
+        orgs = select(dashboard.organizations.getOrganizations(), args)
+    except Exception as e:
+        print(f"Error selecting organizations: {e}", file=sys.stderr)
+        return 1
+    if not orgs:
+        print("No organizations to export.", file=sys.stderr)
+        return 1
+    if args.org_workers * args.rate_limit > PER_IP_LIMIT:
+        print(f"Warning: {args.org_workers} organizations at {args.rate_limit:g} requests/s each exceed the "
+              f"Dashboard's {PER_IP_LIMIT} requests/s per source IP; expect 429s.", file=sys.stderr)
+
+    roots = root_names(orgs)
+    os.makedirs(parent_dir, exist_ok=True)
+    print(f"Exporting {len(orgs)} organizations, {min(args.org_workers, len(orgs))} at a time, "
+          f"into {parent_dir}/<organization>...")
+
+    start = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=args.org_workers) as executor:
+        futures = [executor.submit(run_organization, org, os.path.join(parent_dir, roots[org["id"]]), launch)
+                   for org in orgs]
+        for future in as_completed(futures):
+            entry = future.result()
+            results.append(entry)
+            mark = "✅" if entry["status"] == "ok" else "❌"
+            print(f"{mark} {entry['name']} ({entry['id']}): {entry['seconds']}s, {entry['calls']} calls "
+                  f"({entry['retries']} retries, {entry['failed_calls']} failed), "
+                  f"{entry['files_written']} files -> {entry['root']}"
+                  f"{'' if entry['status'] == 'ok' else ' (exit ' + str(entry['exit_code']) + ', see ' + entry['log'] + ')'}")
+    wall = round(time.monotonic() - start, 2)
+
+    order = {org["id"]: i for i, org in enumerate(orgs)}
+    results.sort(key=lambda entry: order[entry["id"]])
+    slowest = max(results, key=lambda entry: entry["seconds"])
+    failed = [entry for entry in results if entry["status"] != "ok"]
+    summary = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "organizations": results,
+        "totals": {
+            "organizations": len(results),
+            "failed": len(failed),
+            "wall_seconds": wall,
+            "sum_of_org_seconds": round(sum(entry["seconds"] for entry in results), 2),
+            "slowest": {"id": slowest["id"], "name": slowest["name"], "seconds": slowest["seconds"]},
+            "calls": sum(entry["calls"] for entry in results),
+            "retries": sum(entry["retries"] for entry in results),
+            "files_written": sum(entry["files_written"] for entry in results),
+        },
+    }
+    summary_path = args.orgs_summary or os.path.join(parent_dir, "orgs_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    totals = summary["totals"]
+    print(f"Exported {len(results) - len(failed)} of {len(results)} organizations in {wall}s "
+          f"(sum of organization times {totals['sum_of_org_seconds']}s, slowest {slowest['name']} "
+          f"{slowest['seconds']}s); {totals['calls']} calls, {totals['retries']} retries. Summary: {summary_path}")
+    return 1 if failed else 0
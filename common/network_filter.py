@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+network_filter.py
+
+Network selection shared by the Meraki importers.
+
+Both importers list every network of the organization once, then keep only the
+networks matching the filter options below before any per-network data is fetched.
+Criteria are combined with AND; list options match if any listed value matches:
+
+  --network_regex   regular expression searched in the network name
+  --network_tags    comma-separated tags; networks with any of them
+  --product_types   comma-separated product types (appliance, switch, wireless, ...);
+                    networks containing any of them
+  --network_ids     comma-separated network IDs
+
+Usage:
+    network_filter.add_arguments(parser)
+    selection = network_filter.from_args(args)
+    networks = selection.apply(networks)
+"""
+
+import re
+
+
+def _csv(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def add_arguments(parser) -> None:
+    parser.add_argument("--network_regex", default=None,
+                        help="Only process networks whose name matches this regular expression")
+    parser.add_argument("--network_tags", type=_csv, default=None,
+                        help="Only process networks with any of these comma-separated tags")
+    parser.add_argument("--product_types", type=_csv, default=None,
+                        help="Only process networks containing any of these comma-separated product types")
+    parser.add_argument("--network_ids", type=_csv, default=None,
+                        help="Only process these comma-separated network IDs")
+
+
+def from_args(args) -> "NetworkFilter":
+    try:
+        return NetworkFilter(args.network_regex, args.network_tags, args.product_types, args.network_ids)
+    except re.error as e:
+        raise SystemExit(f"Invalid --network_regex: {e}")
+
+
+class NetworkFilter:
+    def __init__(self, name_regex=None, tags=None, product_types=None, network_ids=None):
+        self.name_regex = re.compile(name_regex) if name_regex else None
+        self.tags = set(tags or [])
+        self.product_types = {p.lower() for p in product_types or []}
+        self.network_ids = set(network_ids or [])
+
+    @property
+    def active(self) -> bool:
+        return bool(self.name_regex or self.tags or self.product_types or self.network_ids)
+
+    def matches(self, net: dict) -> bool:
+        if self.network_ids and net.get("id") not in self.network_ids:
+            return False
+        if self.name_regex and not self.name_regex.search(net.get("name", "")):
+            return False
+        if self.tags and not self.tags.intersection(net.get("tags") or []):
+            return False
+        if self.product_types and not self.product_types.intersection(p.lower() for p in net.get("productTypes") or []):
+            return False
+        return True
+
+    def apply(self, networks):
+        return [net for net in networks if self.matches(net)] if self.active else list(networks)
+
+    def describe(self) -> str:
+        parts = []
+        if self.name_regex:
+            parts.append(f"name ~ /{self.name_regex.pattern}/")
+        if self.tags:
+            parts.append(f"tags: {', '.join(sorted(self.tags))}")
+        if self.product_types:
+            parts.append(f"product types: {', '.join(sorted(self.product_types))}")
+        if self.network_ids:
+            parts.append(f"{len(self.network_ids)} network IDs")
+        return "; ".join(parts) or "all networks"
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+org_inventory.py
+
+Page-streaming organization listings for the Meraki importers.
+
+getOrganizationNetworks and getOrganizationDevices are read one page at a time
+(perPage items per request, each page following the previous page's Link header)
+instead of as a single list, so the importers start working on the first networks
+while later pages are still downloading. The SDK's default of one page also silently
+stopped at the first 1000 items; paging reads the whole organization.
+
+Usage:
+    for net in org_inventory.iter_networks(dashboard, org_id):
+        ...
+    inventory = org_inventory.DeviceInventory(dashboard, org_id).start()
+    devices = inventory.devices(net_id)    # waits for the last page
+"""
+
+import threading
+
+# Small network pages get the first networks to the workers after one request; device
+# pages are only needed once complete, so they use the largest page the API allows.
+NETWORKS_PER_PAGE = 100
+DEVICES_PER_PAGE = 1000
+
+
+def iter_pages(dashboard, section: str, endpoint: str, org_id, **kwargs):
+    """
+    Yield the pages of a paginated organization listing, e.g. iter_pages(dashboard,
+    "organizations", "getOrganizationNetworks", org_id, perPage=100). Through the
+    request scheduler (ScheduledDashboard.pages) every page is one scheduled request
+    that follows the Link header of the previous one; a plain SDK client lists every
+    page in one call.
+    """
+    pages = getattr(dashboard, "pages", None)
+    if pages is None:
+        yield getattr(getattr(dashboard, section), endpoint)(org_id, total_pages=-1, **kwargs)
+        return
+    for page in pages(section, endpoint, org_id, **kwargs):
+        if page:
+            yield page
+
+
+def iter_networks(dashboard, org_id, per_page: int = NETWORKS_PER_PAGE):
+    """
+    Yield the organization's networks as their pages arrive.
+    """
+    for page in iter_pages(dashboard, "organizations", "getOrganizationNetworks", org_id, perPage=per_page):
+        yield from page
+
+
+class DeviceInventory:
+    """
+    The organization's device inventory, listed page by page on a background thread
+    and indexed by networkId. The listing is not ordered by network, so a network's
+    devices are only known once the last page has arrived: devices() waits for it, and
+    callers fetch everything that does not need devices first.
+    """
+
+    def __init__(self, dashboard, org_id, per_page: int = DEVICES_PER_PAGE, on_page=None):
+        self._dashboard = dashboard
+        self._org_id = org_id
+        self._per_page = per_page
+        self._on_page = on_page
+        self._devices = []
+        self._by_network = {}
+        self._error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="device-inventory", daemon=True)
+
+    def start(self) -> "DeviceInventory":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            pages = iter_pages(self._dashboard, "organizations", "getOrganizationDevices", self._org_id,
+                               perPage=self._per_page)
+            for page in pages:
+                for device in page:
+                    self._by_network.setdefault(device.get("networkId"), []).append(device)
+                self._devices.extend(page)
+                if self._on_page is not None:
+                    self._on_page(page)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def wait(self) -> None:
+        """
+        Block until the last page has arrived; re-raise the error if the listing failed.
+        """
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+
+    def devices(self, net_id):
+        self.wait()
+        return self._by_network.get(net_id, [])
+
+    def all(self):
+        """
+        Every device, in the order the Dashboard listed them.
+        """
+        self.wait()
+        return self._devices
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+response_cache.py
+
+Persistent read-through cache for Dashboard GET calls, shared by the Meraki importers.
+
+Responses are stored in a local SQLite file keyed by endpoint plus arguments, so
+re-running an importer against the same organization (development, repeated dry runs)
+is answered from disk instead of the API:
+
+  - Each endpoint has a TTL (DEFAULT_TTLS, falling back to the default TTL); a TTL of 0
+    means the endpoint is never cached (e.g. the configuration change log).
+  - The cache is capped in size; least recently used entries are evicted first.
+  - Entries can be invalidated per scope (the first positional argument of the call,
+    usually a network ID, serial or organization ID).
+
+Usage:
+    cache = ResponseCache(".meraki_cache", namespace=api_key)
+    dashboard = CachedDashboard(ScheduledDashboard(meraki.DashboardAPI(api_key), scheduler), cache)
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = ".meraki_cache"
+DEFAULT_TTL = 900
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Per-endpoint TTLs in seconds. 0 disables caching for that endpoint.
+DEFAULT_TTLS = {
+    "getOrganizations": 86400,
+    "getOrganizationConfigurationChanges": 0,
+}
+
+
+class ResponseCache:
+    """
+    SQLite-backed response store with per-endpoint TTLs and LRU eviction.
+    Safe to share between export workers.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, namespace="", default_ttl=DEFAULT_TTL,
+                 ttls=None, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(str(cache_dir), "responses.sqlite")
+        # Keep entries fetched with different API keys apart without storing the key.
+        self.namespace = hashlib.sha256(str(namespace).encode("utf-8")).hexdigest()[:16]
+        self.default_ttl = default_ttl
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, endpoint TEXT, scope TEXT, value TEXT,"
+            " size INTEGER, stored_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)")
+
+    def ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def key(self, endpoint: str, args, kwargs) -> str:
+        payload = json.dumps([self.namespace, endpoint, list(args), kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, endpoint: str, key: str):
+        """
+        Return (True, value) for a fresh entry, (False, None) otherwise.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl(endpoint):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return False, None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return True, json.loads(row[0])
+
+    def put(self, endpoint: str, key: str, scope, value) -> None:
+        try:
+            text = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, None if scope is None else str(scope), text, len(text), now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def invalidate(self, scope) -> None:
+        """
+        Drop every entry fetched for the given network ID, serial or organization ID.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE scope = ?", (str(scope),))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedDashboard:
+    """
+    Proxy for a DashboardAPI (or ScheduledDashboard) that answers get* calls from the
+    cache when possible and stores fresh responses on a miss.
+    """
+
+    def __init__(self, dashboard, cache: ResponseCache):
+        self._dashboard = dashboard
+        self._cache = cache
+
+    def for_org(self, org_id) -> "CachedDashboard":
+        return CachedDashboard(self._dashboard.for_org(org_id), self._cache)
+
+    def pages(self, section: str, endpoint: str, *args, **kwargs):
+        """
+        The wrapped dashboard's pages(), answered from the cache when the whole listing
+        is cached; a listing read from the Dashboard is stored once its last page arrived.
+        """
+        cache = self._cache
+        if cache.ttl(endpoint) <= 0:
+            yield from self._dashboard.pages(section, endpoint, *args, **kwargs)
+            return
+        key = cache.key(f"{endpoint}/pages", args, kwargs)
+        hit, pages = cache.get(endpoint, key)
+        if hit:
+            yield from pages
+            return
+        pages = []
+        for page in self._dashboard.pages(section, endpoint, *args, **kwargs):
+            pages.append(page)
+            yield page
+        cache.put(endpoint, key, args[0] if args else None, pages)
+
+    def __getattr__(self, name):
+        return _CachedSection(getattr(self._dashboard, name), self._cache)
+
+
+class _CachedSection:
+    def __init__(self, section, cache):
+        self._section = section
+        self._cache = cache
+
+    def __getattr__(self, name):
+        method = getattr(self._section, name)
+        if not callable(method) or not name.startswith("get") or self._cache.ttl(name) <= 0:
+            return method
+        cache = self._cache
+
+        @functools.wraps(method)
+        def cached(*args, **kwargs):
+            key = cache.key(name, args, kwargs)
+            hit, value = cache.get(name, key)
+            if hit:
+                return value
+            value = method(*args, **kwargs)
+            cache.put(name, key, args[0] if args else None, value)
+            return value
+
+        return cached
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+serialization.py
+
+Serialization layer shared by the Meraki importers and generate_imports.py.
+
+  - YAML goes through libyaml (CSafeDumper/CSafeLoader) when PyYAML was built with it,
+    falling back to the pure-Python SafeDumper/SafeLoader otherwise. Output is the same.
+  - JSON is available as an alternative data format ("json"); the generated Terraform
+    reads it with jsondecode() instead of yamldecode(), which is much faster on both
+    the Python and the Terraform side.
+
+Exports are written as a stream of small chunks instead of building whole documents
+in memory:
+
+  - list_chunks() emits a sequence one record at a time, so a fetched page can be
+    written to its per-service file as soon as it arrives.
+  - mapping_chunks() assembles a combined document (e.g. <net>_<id>.yaml) by splicing
+    per-service files already on disk under their top-level keys, rather than loading
+    and re-dumping the Python objects.
+"""
+
+import itertools
+import json
+import os
+import re
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+DATA_FORMATS = ("yaml", "json")
+DEFAULT_FORMAT = "yaml"
+
+# A top-level block mapping entry: "key: value", "key:" or an explicit "? key".
+_MAPPING_LINE = re.compile(r"^(\? |[^\s#].*?:( |$))")
+
+
+class DataFile(str):
+    """
+    Path of a data file on disk (YAML or JSON, matching the document being assembled),
+    used as a section value in mapping_chunks() to splice the file in place of an
+    in-memory object.
+    """
+
+
+def decode_function(data_format: str) -> str:
+    """
+    Terraform function that parses files of the given data format.
+    """
+    return "jsondecode" if data_format == "json" else "yamldecode"
+
+
+def format_for_path(path) -> str:
+    return "json" if str(path).endswith(".json") else "yaml"
+
+
+# ----------------------------- Whole documents ----------------------------- #
+
+def dump_yaml(data) -> str:
+    """
+    Serialize data to a YAML string, keeping key order.
+    """
+    return yaml.dump(data, Dumper=SafeDumper, sort_keys=False)
+
+
+def dump_json(data) -> str:
+    return json.dumps(data, indent=2) + "\n"
+
+
+def dump_data(data, data_format: str = DEFAULT_FORMAT) -> str:
+    return dump_json(data) if data_format == "json" else dump_yaml(data)
+
+
+def load_yaml(stream):
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_file(path):
+    """
+    Parse a YAML or JSON data file, choosing the parser from the file extension.
+    """
+    with open(path) as f:
+        return json.load(f) if format_for_path(path) == "json" else load_yaml(f)
+
+
+def find_data_file(directory, name: str):
+    """
+    Return the path of <name>.yaml or <name>.json in directory, or None.
+    """
+    for data_format in DATA_FORMATS:
+        path = os.path.join(directory, f"{name}.{data_format}")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+# ----------------------------- Streaming ----------------------------- #
+
+def yaml_list_chunks(items):
+    """
+    Yield a YAML block sequence one item at a time. Concatenated, the chunks are
+    identical to dump_yaml(list(items)), but only one item is serialized at once.
+    """
+    empty = True
+    for item in items:
+        empty = False
+        yield dump_yaml([item])
+    if empty:
+        yield dump_yaml([])
+
+
+def json_list_chunks(items):
+    """
+    Yield a JSON array one item at a time.
+    """
+    empty = True
+    for item in items:
+        yield ("[\n" if empty else ",\n") + _indent(json.dumps(item, indent=2))
+        empty = False
+    yield "[]\n" if empty else "\n]\n"
+
+
+def list_chunks(items, data_format: str = DEFAULT_FORMAT):
+    return json_list_chunks(items) if data_format == "json" else yaml_list_chunks(items)
+
+
+def yaml_section_chunks(key, path):
+    """
+    Yield "key:" followed by the YAML document stored at path, re-indented so that it
+    becomes the value of key in an enclosing top-level mapping.
+    """
+    with open(path) as f:
+        first = f.readline()
+        if first.startswith("- ") or first == "-\n":
+            # Block sequences are emitted indentless under a mapping key.
+            yield f"{key}:\n"
+            yield first
+            for line in f:
+                yield line
+        elif first.strip() in ("[]", "{}", ""):
+            yield f"{key}: {first.strip() or 'null'}\n"
+        elif _MAPPING_LINE.match(first):
+            yield f"{key}:\n"
+            for line in itertools.chain([first], f):
+                yield line if line == "\n" else "  " + line
+        else:
+            # Scalars and anything unusual: small enough to round-trip.
+            f.seek(0)
+            yield dump_yaml({key: load_yaml(f)})
+
+
+def yaml_mapping_chunks(sections):
+    """
+    Yield a top-level YAML mapping from an ordered dict of sections. Values that are
+    DataFile paths are spliced from disk; anything else is serialized in place.
+    """
+    for key, value in sections.items():
+        if isinstance(value, DataFile):
+            yield from yaml_section_chunks(key, value)
+        else:
+            yield dump_yaml({key: value})
+
+
+def json_mapping_chunks(sections):
+    """
+    Yield a top-level JSON object from an ordered dict of sections. Values that are
+    DataFile paths (holding JSON) are copied from disk verbatim.
+    """
+    first = True
+    for key, value in sections.items():
+        yield ("{\n" if first else ",\n") + f"  {json.dumps(key)}: "
+        first = False
+        if isinstance(value, DataFile):
+            yield from _json_file_chunks(value)
+        else:
+            yield _indent(json.dumps(value, indent=2), first_line=False)
+    yield "{}\n" if first else "\n}\n"
+
+
+def _json_file_chunks(path):
+    """
+    Yield the JSON document at path line by line, indented one level for nesting.
+    """
+    empty = True
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line:
+                yield line if empty else "\n  " + line
+                empty = False
+    if empty:
+        yield "null"
+
+
+def mapping_chunks(sections, data_format: str = DEFAULT_FORMAT):
+    return json_mapping_chunks(sections) if data_format == "json" else yaml_mapping_chunks(sections)
+
+
+def _indent(text: str, first_line: bool = True) -> str:
+    lines = text.split("\n")
+    head = "  " + lines[0] if first_line else lines[0]
+    return "\n".join([head] + ["  " + line for line in lines[1:]])
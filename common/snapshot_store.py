@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+snapshot_store.py
+
+Snapshot store: every record fetched by an export, in one indexed SQLite database that
+keeps the history of runs.
+
+  runs     one row per export: organization, layout (brownfield/workspace), data format,
+           start/finish time, number of networks
+  records  (run, network, service) -> content hash, plus the network name
+  blobs    content hash -> the record as JSON, stored once however many runs share it
+
+Records are buffered and written in batches of BATCH_SIZE rows in one transaction, so
+an export costs a few bulk inserts; an unchanged record only adds a row to records.
+Like the other sinks, a run that did not fetch every listed network (--incremental,
+--resume, network filters) carries the previous run's records of the others over, so
+each finished run is a complete snapshot of the organization.
+
+Finished runs can be compared with indexed queries (changes()), read back (records())
+and rendered to the exporters' data files by brownfield/materialize_snapshot.py.
+
+Usage:
+    sink = SnapshotSink("snapshots.db", org_id, org_name, "brownfield", "yaml")
+    sink.record(net, "vlans", vlans)
+    sink.close(listed_network_ids)
+
+    store = SnapshotStore("snapshots.db")
+    run = store.latest_run(org_id)
+    for network_id, network, service, data in store.records(run["id"]):
+        ...
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    org_id TEXT NOT NULL,
+    org_name TEXT,
+    layout TEXT NOT NULL,
+    data_format TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    networks INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_by_org ON runs (org_id, layout, finished_at);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    seq INTEGER NOT NULL,
+    network_id TEXT NOT NULL,
+    network TEXT,
+    service TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs (hash),
+    PRIMARY KEY (run_id, network_id, service)
+);
+CREATE INDEX IF NOT EXISTS records_by_network ON records (network_id, service, run_id);
+"""
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def connect(path) -> sqlite3.Connection:
+    connection = sqlite3.connect(str(path), check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class SnapshotStore:
+    """
+    Read access to the runs and records of a snapshot database.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.connection = connect(self.path)
+
+    def runs(self, org_id=None):
+        """
+        Finished runs, oldest first.
+        """
+        query = "SELECT * FROM runs WHERE finished_at IS NOT NULL"
+        params = ()
+        if org_id is not None:
+            query += " AND org_id = ?"
+            params = (str(org_id),)
+        return [dict(row) for row in self.connection.execute(query + " ORDER BY id", params)]
+
+    def run(self, run_id):
+        row = self.connection.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_run(self, org_id=None, layout=None, before=None):
+        """
+        The last finished run of an organization (and layout), optionally before a run ID.
+        """
+        query = "SELECT * FROM runs WHERE finished_at IS NOT NULL"
+        params = []
+        for column, value in (("org_id", org_id), ("layout", layout)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(str(value))
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        row = self.connection.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def records(self, run_id, network_ids=None, services=None):
+        """
+        Yield (network_id, network, service, data) of a run, in the order they were
+        recorded. network_ids and services restrict the result.
+        """
+        query = ("SELECT r.network_id, r.network, r.service, b.data FROM records r "
+                 "JOIN blobs b ON b.hash = r.hash WHERE r.run_id = ?")
+        params = [run_id]
+        for column, values in (("r.network_id", network_ids), ("r.service", services)):
+            if values is not None:
+                values = list(values)
+                query += f" AND {column} IN ({','.join('?' * len(values))})"
+                params.extend(values)
+        for row in self.connection.execute(query + " ORDER BY r.seq", params):
+            yield row["network_id"], row["network"], row["service"], json.loads(row["data"])
+
+    def changes(self, old_run_id, new_run_id):
+        """
+        (network_id, network, service, change) for every record that differs between two
+        runs: "added", "removed" or "changed".
+        """
+        rows = self.connection.execute(
+            """
+            SELECT n.network_id, n.network, n.service, CASE WHEN o.hash IS NULL THEN 'added' ELSE 'changed' END
+            FROM records n LEFT JOIN records o
+              ON o.run_id = ? AND o.network_id = n.network_id AND o.service = n.service
+            WHERE n.run_id = ? AND (o.hash IS NULL OR o.hash != n.hash)
+            UNION ALL
+            SELECT o.network_id, o.network, o.service, 'removed'
+            FROM records o LEFT JOIN records n
+              ON n.run_id = ? AND n.network_id = o.network_id AND n.service = o.service
+            WHERE o.run_id = ? AND n.hash IS NULL
+            ORDER BY 1, 3
+            """,
+            (old_run_id, new_run_id, new_run_id, old_run_id),
+        )
+        return [tuple(row) for row in rows]
+
+    def history(self, network_id, service):
+        """
+        (run_id, started_at, hash) of every finished run holding a network's service,
+        oldest first.
+        """
+        rows = self.connection.execute(
+            "SELECT r.run_id, runs.started_at, r.hash FROM records r JOIN runs ON runs.id = r.run_id "
+            "WHERE r.network_id = ? AND r.service = ? AND runs.finished_at IS NOT NULL ORDER BY r.run_id",
+            (network_id, service),
+        )
+        return [tuple(row) for row in rows]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class SnapshotSink:
+    """
+    Export sink recording one run into a snapshot database. Safe to use from several
+    export workers at once.
+    """
+
+    def __init__(self, path, org_id, org_name, layout: str, data_format: str):
+        self.connection = connect(path)
+        self.org_id = str(org_id)
+        self.layout = layout
+        self._lock = threading.Lock()
+        self._pending = []
+        self._blobs = {}
+        self._networks = set()
+        self._seq = 0
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (org_id, org_name, layout, data_format, started_at) VALUES (?, ?, ?, ?, ?)",
+                (self.org_id, org_name, layout, data_format, utc_now()),
+            )
+        self.run_id = cursor.lastrowid
+
+    def record(self, net, service: str, data) -> None:
+        text = json.dumps(data, default=str)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._networks.add(net["id"])
+            self._seq += 1
+            self._blobs[digest] = text
+            self._pending.append((self.run_id, self._seq, net["id"], net.get("name"), service, digest))
+            if len(self._pending) >= BATCH_SIZE:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", self._blobs.items())
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO records (run_id, seq, network_id, network, service, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+        self._blobs = {}
+
+    def close(self, listed_network_ids) -> None:
+        with self._lock:
+            self._flush()
+            previous = self.connection.execute(
+                "SELECT id FROM runs WHERE org_id = ? AND layout = ? AND finished_at IS NOT NULL AND id < ? "
+                "ORDER BY id DESC LIMIT 1",
+                (self.org_id, self.layout, self.run_id),
+            ).fetchone()
+            carried = sorted(set(listed_network_ids) - self._networks)
+            with self.connection:
+                if previous is not None and carried:
+                    self.connection.executemany(
+                        "INSERT OR IGNORE INTO records (run_id, seq, network_id, network, service, hash) "
+                        "SELECT ?, ? + seq, network_id, network, service, hash FROM records "
+                        "WHERE run_id = ? AND network_id = ?",
+                        [(self.run_id, self._seq, previous["id"], net_id) for net_id in carried],
+                    )
+                count = self.connection.execute(
+                    "SELECT COUNT(DISTINCT network_id) FROM records WHERE run_id = ?", (self.run_id,)
+                ).fetchone()[0]
+                self.connection.execute(
+                    "UPDATE runs SET finished_at = ?, networks = ? WHERE id = ?", (utc_now(), count, self.run_id)
+                )
+            self.connection.close()
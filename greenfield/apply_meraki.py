@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+apply_meraki.py
+
+Apply network definitions with Dashboard action batches instead of Terraform.
+
+Terraform applies one resource per API call, and the mx_vlans module waits 30s
+(time_sleep) between enabling VLANs and creating them. This script compiles the same
+YAML into action batches: each network's actions run in order inside batches of its own
+(VLANs are enabled, then created, with no wait), up to 100 actions per batch, with as
+many batches in flight as the organization allows, polled until done.
+
+Inputs, in any mix:
+  - greenfield site directories laid out like network_ironman/ (network.yaml,
+    devices.yaml, ssids.yaml, appliance_settings.yaml). The network is created unless
+    the organization already has one of that name; devices are claimed, VLANs enabled
+    and created (updated if they exist), SSIDs configured: what the networks, ssid and
+    mx_vlans modules do.
+  - brownfield network files written by import_meraki.py (data/yaml/<org>/<network>_<id>.yaml
+    or .json). The VLANs, SSIDs, L3 firewall rules, switch ports and wireless settings
+    of that existing network are updated to the exported values.
+
+Usage:
+    python3 apply_meraki.py --api_key <KEY> --org_name "<ORG>" network_ironman [more sites or files...]
+    python3 apply_meraki.py --api_key <KEY> --org_name "<ORG>" ../brownfield/data/yaml/Org/*.yaml --dry_run
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import meraki
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+import action_batches
+import dashboard_scheduler
+import org_inventory
+import serialization
+from action_batches import action
+
+SITE_FILES = ("network.yaml", "devices.yaml", "ssids.yaml", "appliance_settings.yaml")
+
+# Fields the Dashboard returns but does not accept in updates.
+VLAN_READ_ONLY = {"id", "networkId", "interfaceId"}
+SSID_READ_ONLY = {"number", "ssidAdminAccessible", "adminSplashUrl", "localAuth"}
+SWITCH_PORT_READ_ONLY = {"portId", "linkNegotiationCapabilities"}
+WIRELESS_SETTINGS_READ_ONLY = {"regulatoryDomain"}
+
+
+def without(data: dict, keys) -> dict:
+    return {k: v for k, v in data.items() if k not in keys}
+
+
+def load_yaml_file(path: Path) -> dict:
+    if not path.is_file():
+        return {}
+    with open(path) as f:
+        return serialization.load_yaml(f) or {}
+
+
+def load_site(site_dir: Path) -> dict:
+    """
+    Read a greenfield site directory; missing files count as empty.
+    """
+    return {name.split(".")[0]: load_yaml_file(site_dir / name) for name in SITE_FILES}
+
+
+def is_site(path: Path) -> bool:
+    return path.is_dir() and (path / "network.yaml").is_file()
+
+
+# ----------------------------- Greenfield ----------------------------- #
+
+def network_create_kwargs(network: dict) -> dict:
+    """
+    createOrganizationNetwork arguments for a site's network.yaml (networks module).
+    """
+    kwargs = {"tags": network.get("tags") or [], "timeZone": network.get("timezone"), "notes": network.get("notes")}
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def greenfield_actions(net_id: str, site: dict, existing_vlans=(), existing_serials=()) -> list:
+    """
+    Ordered actions configuring one greenfield site, the batch equivalent of the
+    networks (claim), mx_vlans and ssid modules. VLANs already present are updated
+    and devices already in the network are not claimed again.
+    """
+    actions = []
+    serials = [
+        str(device["serial"]).strip() for device in site["devices"].get("devices") or []
+        if device.get("serial") and str(device["serial"]).strip() not in existing_serials
+    ]
+    if serials:
+        actions.append(action(f"/networks/{net_id}/devices/claim", "claim", {"serials": serials}))
+
+    vlans = site["appliance_settings"].get("vlans") or []
+    if vlans:
+        actions.append(action(f"/networks/{net_id}/appliance/vlans/settings", "update", {"vlansEnabled": True}))
+    for vlan in vlans:
+        body = {"name": vlan["name"], "subnet": vlan["subnet"], "applianceIp": vlan["appliance_ip"]}
+        if vlan["vlan_id"] in existing_vlans or str(vlan["vlan_id"]) in existing_vlans:
+            actions.append(action(f"/networks/{net_id}/appliance/vlans/{vlan['vlan_id']}", "update", body))
+        else:
+            actions.append(action(f"/networks/{net_id}/appliance/vlans", "create", dict(body, id=str(vlan["vlan_id"]))))
+
+    for ssid in site["ssids"].get("ssids") or []:
+        body = {
+            "name": ssid["name"],
+            "authMode": ssid.get("auth_mode"),
+            "encryptionMode": ssid.get("encryption_mode"),
+            "wpaEncryptionMode": ssid.get("wpa_encryption_mode"),
+            "psk": ssid.get("psk"),
+            "ipAssignmentMode": ssid.get("ip_assignment_mode"),
+            "defaultVlanId": int(ssid["default_vlan_id"]) if ssid.get("default_vlan_id") not in (None, "") else None,
+            "adultContentFilteringEnabled": ssid.get("adult_content_filtering_enabled"),
+            "useVlanTagging": ssid.get("use_vlan_tagging"),
+            "enabled": ssid.get("enabled"),
+            "lanIsolationEnabled": ssid.get("lan_isolation_enabled"),
+        }
+        actions.append(action(f"/networks/{net_id}/wireless/ssids/{ssid['number']}", "update",
+                              {k: v for k, v in body.items() if v is not None}))
+    return actions
+
+
+def existing_state(dashboard, net_id: str):
+    """
+    VLAN IDs and device serials already in an existing network, so re-applying a site
+    updates instead of failing on duplicates.
+    """
+    try:
+        vlans = {str(vlan["id"]) for vlan in dashboard.appliance.getNetworkApplianceVlans(net_id)}
+    except Exception:
+        vlans = set()
+    try:
+        serials = {device["serial"] for device in dashboard.networks.getNetworkDevices(net_id)}
+    except Exception:
+        serials = set()
+    return vlans, serials
+
+
+def create_network(dashboard, org_id, network: dict) -> str:
+    created = dashboard.organizations.createOrganizationNetwork(
+        org_id, network["name"], network.get("product_types") or [], **network_create_kwargs(network)
+    )
+    return created["id"]
+
+
+# ----------------------------- Brownfield ----------------------------- #
+
+def brownfield_actions(doc: dict):
+    """
+    (network ID, ordered actions) restoring an exported network's settings.
+    """
+    net_id = doc["network"]["id"]
+    actions = []
+    for vlan in doc.get("vlans") or []:
+        actions.append(action(f"/networks/{net_id}/appliance/vlans/{vlan['id']}", "update",
+                              without(vlan, VLAN_READ_ONLY)))
+    for ssid in doc.get("ssids") or []:
+        actions.append(action(f"/networks/{net_id}/wireless/ssids/{ssid['number']}", "update",
+                              without(ssid, SSID_READ_ONLY)))
+    rules = [rule for rule in doc.get("firewallRules") or [] if rule.get("comment") != "Default rule"]
+    if doc.get("firewallRules"):
+        actions.append(action(f"/networks/{net_id}/appliance/firewall/l3FirewallRules", "update", {"rules": rules}))
+    for switch in doc.get("switchPorts") or []:
+        for port in switch.get("ports") or []:
+            actions.append(action(f"/devices/{switch['serial']}/switch/ports/{port['portId']}", "update",
+                                  without(port, SWITCH_PORT_READ_ONLY)))
+    if doc.get("wirelessSettings"):
+        actions.append(action(f"/networks/{net_id}/wireless/settings", "update",
+                              without(doc["wirelessSettings"], WIRELESS_SETTINGS_READ_ONLY)))
+    return net_id, actions
+
+
+# ----------------------------- Main ----------------------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply Meraki network definitions with action batches")
+    parser.add_argument("--api_key", "-k", required=True, help="Your Meraki API Key")
+    parser.add_argument("--org_name", "-n", required=True, help="Meraki Organization Name")
+    parser.add_argument("paths", nargs="+",
+                        help="Greenfield site directories and/or brownfield network files (<network>_<id>.yaml/.json)")
+    parser.add_argument("--batch_size", type=int, default=action_batches.MAX_ACTIONS_PER_BATCH,
+                        help=f"Actions per batch (default and maximum: {action_batches.MAX_ACTIONS_PER_BATCH})")
+    parser.add_argument("--concurrency", "-c", type=int, default=action_batches.MAX_RUNNING_BATCHES,
+                        help=f"Batches running at once (default: {action_batches.MAX_RUNNING_BATCHES}, "
+                             "the Dashboard limit per organization)")
+    parser.add_argument("--poll_interval", type=float, default=action_batches.DEFAULT_POLL_INTERVAL,
+                        help=f"Longest wait between batch status polls, in seconds "
+                             f"(default: {action_batches.DEFAULT_POLL_INTERVAL})")
+    parser.add_argument("--rate_limit", "-r", type=float, default=dashboard_scheduler.DEFAULT_RATE,
+                        help="Dashboard requests per second for this organization (default: 10)")
+    parser.add_argument("--workers", "-w", type=int, default=8,
+                        help="Networks created or inspected concurrently (default: 8)")
+    parser.add_argument("--dry_run", action="store_true",
+                        help="Compile and write the plan without creating networks or submitting batches")
+    parser.add_argument("--plan_file", default="apply_plan.json",
+                        help="Where the compiled batches are written (default: apply_plan.json)")
+    parser.add_argument("--report", default="apply_report.json",
+                        help="Where the batch results are written (default: apply_report.json)")
+    args = parser.parse_args()
+    if not 1 <= args.batch_size <= action_batches.MAX_ACTIONS_PER_BATCH:
+        parser.error(f"--batch_size must be between 1 and {action_batches.MAX_ACTIONS_PER_BATCH}")
+    if args.concurrency < 1 or args.workers < 1:
+        parser.error("--concurrency and --workers must be at least 1")
+
+    sites = {}
+    exports = []
+    for raw in args.paths:
+        path = Path(raw)
+        if is_site(path):
+            site = load_site(path)
+            name = site["network"].get("name")
+            if not name:
+                parser.error(f"{path}/network.yaml has no name")
+            sites[name] = site
+        elif path.is_file():
+            exports.append(path)
+        else:
+            parser.error(f"{path} is neither a site directory (with network.yaml) nor a network file")
+
+    scheduler = dashboard_scheduler.RequestScheduler(default_rate=args.rate_limit)
+    dashboard = dashboard_scheduler.ScheduledDashboard(
+        meraki.DashboardAPI(args.api_key, output_log=False, print_console=False, wait_on_rate_limit=False),
+        scheduler,
+    )
+    try:
+        orgs = dashboard.organizations.getOrganizations()
+    except Exception as e:
+        print(f"Error fetching organizations: {e}", file=sys.stderr)
+        sys.exit(1)
+    org_id = next((o["id"] for o in orgs if o.get("name", "").lower() == args.org_name.lower()), None)
+    if not org_id:
+        print(f"Organization '{args.org_name}' not found.", file=sys.stderr)
+        sys.exit(1)
+    dashboard = dashboard.for_org(org_id)
+
+    # Greenfield: find or create each site's network, then compile its actions.
+    groups = []
+    if sites:
+        existing = {net["name"]: net["id"] for net in org_inventory.iter_networks(dashboard, org_id)}
+        to_create = [name for name in sites if name not in existing]
+        print(f"{len(sites)} sites: {len(sites) - len(to_create)} existing networks, {len(to_create)} to create")
+
+        network_ids = {name: existing[name] for name in sites if name in existing}
+        if args.dry_run:
+            network_ids.update({name: f"<new network {name}>" for name in to_create})
+        else:
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                created = executor.map(
+                    lambda name: (name, create_network(dashboard, org_id, sites[name]["network"])), to_create
+                )
+                try:
+                    for name, net_id in created:
+                        network_ids[name] = net_id
+                        print(f"Created network '{name}' ({net_id})")
+                except Exception as e:
+                    print(f"Error creating networks: {e}", file=sys.stderr)
+                    sys.exit(1)
+
+        def compile_site(name):
+            state = existing_state(dashboard, network_ids[name]) if name in existing else ((), ())
+            return greenfield_actions(network_ids[name], sites[name], *state)
+
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            groups.extend(executor.map(compile_site, sites))
+
+    # Brownfield: one group per exported network.
+    for path in exports:
+        _, actions = brownfield_actions(serialization.load_file(path))
+        groups.append(actions)
+
+    chains = action_batches.pack_batches(groups, args.batch_size)
+    total = sum(len(group) for group in groups)
+    batches = sum(len(chain) for chain in chains)
+    with open(args.plan_file, "w") as f:
+        json.dump(chains, f, indent=2)
+    print(f"Compiled {total} actions for {len(groups)} networks into {batches} batches (plan: {args.plan_file})")
+    if args.dry_run:
+        return
+
+    runner = action_batches.ActionBatchRunner(dashboard, org_id, args.concurrency, args.poll_interval)
+    results = runner.run(chains)
+    failed = [r for r in results if r["status"] != "completed"]
+    with open(args.report, "w") as f:
+        json.dump({"org_id": org_id, "batches": results}, f, indent=2)
+    print(f"{len(results) - len(failed)} of {len(results)} batches completed (report: {args.report})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,43 @@
 generate_imports.py
 
 Reads terraform.tfvars to map each sanitized network name to its Meraki network ID,
-then processes data/<network>/*.yaml and writes a separate import script for each network:
+then processes data/<network>/*.yaml (or *.json) and writes a separate import script for each network:
   import_<network_name>.sh
 
 Each script contains `terraform import` commands for SSIDs, firewall rules, webhook servers,
 alerts, MX VLANs, and switch VLANs for that specific network. The generated shell scripts
 are marked executable via os.chmod(..., 0o755).
+
+With --mode blocks, Terraform import {} blocks are written instead (imports.tf for the
+whole organization, or imports_<network_name>.tf per network with --per_network), so one
+plan/apply per workspace imports everything in a single terraform process. The blocks use
+for_each to apply only in the matching workspace, which requires Terraform >= 1.7.
+
+With --run, the per-resource imports are also executed: networks run concurrently in a
+pool of terraform processes (--workers), each against its own workspace (TF_WORKSPACE),
+so no two processes share a state lock. Transient failures (429/5xx from the Dashboard,
+state lock contention) are retried with backoff, completed imports are recorded in
+import_progress.json so an interrupted run resumes where it stopped, and a summary is
+written to import_report.json.
+
+The state of every workspace is read once up front (the local state files, or
+`terraform show -json` for remote backends) and addresses already in state are left
+out of scripts, import blocks and runs, so re-syncing after adding one SSID costs one
+import. --all disables this.
 """
 
+import argparse
+import json
 import os
 import re
-import yaml
+import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+import serialization
 
 def parse_network_id_map(tfvars_path="terraform.tfvars"):
     """
@@ -33,61 +58,75 @@ def parse_network_id_map(tfvars_path="terraform.tfvars"):
         mapping[name] = net_id
     return mapping
 
-def generate_import_commands_for_network(net_name, net_id):
+def collect_imports_for_network(net_name, net_id, existing=None):
     """
-    Generate a list of import commands for a single network:
+    Collect the resources to import for a single network as a list of
+    (resource_address, instance_key, import_id) tuples; instance_key is None for
+    resources that are not created with for_each. Addresses in existing (the
+    workspace's current state) are left out:
       - SSIDs
       - Firewall rules
       - Webhook servers
       - Alerts
       - VLANs (MX)
     """
-    commands = []
+    imports = []
     base_module = f"module.{net_name}"
     data_dir = os.path.join("data", net_name)
 
     # 1. SSIDs
-    ssid_file = os.path.join(data_dir, "ssids.yaml")
-    if os.path.isfile(ssid_file):
-        ssids = yaml.safe_load(open(ssid_file)) or []
+    ssid_file = serialization.find_data_file(data_dir, "ssids")
+    if ssid_file:
+        ssids = serialization.load_file(ssid_file) or []
         for s in ssids:
             number = s.get("number")
             if number is not None:
-                addr = f"{base_module}.module.ssids.meraki_networks_wireless_ssids.this[\"{number}\"]"
-                id_val = f"{net_id},{number}"
-                commands.append(f"terraform import '{addr}' {id_val}")
+                resource = f"{base_module}.module.ssids.meraki_networks_wireless_ssids.this"
+                imports.append((resource, str(number), f"{net_id},{number}"))
 
     # 2. MX Firewall rules (L3)
     #fw_addr = f"{base_module}.module.firewall.meraki_networks_appliance_firewall_l3_firewall_rules.this"
-    #commands.append(f"terraform import '{fw_addr}' {net_id}")
+    #imports.append((fw_addr, None, net_id))
 
     # 3. Webhook servers
-    webhook_file = os.path.join(data_dir, "webhook_servers.yaml")
-    if os.path.isfile(webhook_file):
-        webhooks = yaml.safe_load(open(webhook_file)) or []
+    webhook_file = serialization.find_data_file(data_dir, "webhook_servers")
+    if webhook_file:
+        webhooks = serialization.load_file(webhook_file) or []
         for w in webhooks:
             webhook_id = w.get("id")
             if webhook_id:
-                addr = f"{base_module}.module.webhooks.meraki_networks_webhooks_http_servers.this[\"{webhook_id}\"]"
-                id_val = f"{net_id},{webhook_id}"
-                commands.append(f"terraform import '{addr}' {id_val}")
+                resource = f"{base_module}.module.webhooks.meraki_networks_webhooks_http_servers.this"
+                imports.append((resource, str(webhook_id), f"{net_id},{webhook_id}"))
 
     # 4. Alert settings
     alert_addr = f"{base_module}.module.alerts.meraki_networks_alerts_settings.this"
-    commands.append(f"terraform import '{alert_addr}' {net_id}")
+    imports.append((alert_addr, None, net_id))
 
     # 5. VLANs from MX firewall
-    vlan_mx_file = os.path.join(data_dir, "vlans_mx.yaml")
-    if os.path.isfile(vlan_mx_file):
-        vlans_mx = yaml.safe_load(open(vlan_mx_file)) or []
+    vlan_mx_file = serialization.find_data_file(data_dir, "vlans_mx")
+    if vlan_mx_file:
+        vlans_mx = serialization.load_file(vlan_mx_file) or []
         for v in vlans_mx:
             vid = v.get("id")
             if vid is not None:
-                addr = f"{base_module}.module.vlans_mx.meraki_networks_appliance_vlans.this[\"{vid}\"]"
-                id_val = f"{net_id},{vid}"
-                commands.append(f"terraform import '{addr}' {id_val}")
+                resource = f"{base_module}.module.vlans_mx.meraki_networks_appliance_vlans.this"
+                imports.append((resource, str(vid), f"{net_id},{vid}"))
+
+    if existing:
+        imports = [i for i in imports if import_address(i[0], i[1]) not in existing]
+    return imports
 
-    return commands
+def import_address(resource, key):
+    return resource if key is None else f"{resource}[\"{key}\"]"
+
+def generate_import_commands_for_network(net_name, net_id, existing=None):
+    """
+    Generate a list of `terraform import` commands for a single network.
+    """
+    return [
+        f"terraform import '{import_address(resource, key)}' {import_id}"
+        for resource, key, import_id in collect_imports_for_network(net_name, net_id, existing)
+    ]
 
 def write_import_script(net_name, commands):
     """
@@ -107,18 +146,361 @@ def write_import_script(net_name, commands):
     os.chmod(filename, 0o755)
     print(f"Generated import script: {filename}")
 
+IMPORTS_HEADER = "# Generated by generate_imports.py: Terraform import blocks (Terraform >= 1.7).\n"
+
+def hcl_string(value):
+    """
+    Quote a value as an HCL string literal (JSON escaping plus template sequences).
+    """
+    return json.dumps(str(value)).replace("${", "$${").replace("%{", "%%{")
+
+def render_import_blocks(net_name, imports):
+    """
+    Render import {} blocks for one network, one block per resource. All workspaces
+    share the root module, so each block's for_each is empty unless the current
+    workspace is this network's; `terraform plan/apply` in that workspace then imports
+    every resource of the network in a single run.
+    """
+    grouped = {}
+    for resource, key, import_id in imports:
+        grouped.setdefault(resource, []).append((key, import_id))
+
+    workspace = hcl_string(net_name)
+    blocks = [f"# Network: {net_name}\n"]
+    for resource, items in grouped.items():
+        keyed = items[0][0] is not None
+        entries = "".join(
+            f"    {hcl_string(key if keyed else 'this')} = {hcl_string(import_id)}\n"
+            for key, import_id in items
+        )
+        to = f"{resource}[each.key]" if keyed else resource
+        blocks.append(
+            "import {\n"
+            "  for_each = { for k, v in {\n"
+            f"{entries}"
+            f"  }} : k => v if terraform.workspace == {workspace} }}\n"
+            f"  to       = {to}\n"
+            "  id       = each.value\n"
+            "}\n"
+        )
+    return "\n".join(blocks)
+
+def remove_generated_import_files():
+    """
+    Delete import block files from a previous run (org-wide or per network) so the
+    same resource is never declared twice.
+    """
+    for filename in sorted(os.listdir(".")):
+        if re.fullmatch(r"imports(_.+)?\.tf", filename):
+            with open(filename) as f:
+                generated = f.readline() == IMPORTS_HEADER
+            if generated:
+                os.remove(filename)
+
+def write_import_blocks(blocks_by_network, per_network=False):
+    """
+    Write the rendered import blocks into the root module: a single imports.tf for the
+    whole organization, or imports_<net_name>.tf per network.
+    """
+    remove_generated_import_files()
+    if per_network:
+        for net_name, blocks in blocks_by_network.items():
+            filename = f"imports_{net_name}.tf"
+            with open(filename, "w") as f:
+                f.write(IMPORTS_HEADER + "\n" + blocks)
+            print(f"Generated import blocks: {filename}")
+    else:
+        with open("imports.tf", "w") as f:
+            f.write(IMPORTS_HEADER + "\n" + "\n".join(blocks_by_network.values()))
+        print(f"Generated import blocks: imports.tf ({len(blocks_by_network)} networks)")
+
+# ----------------------------- Import runner ----------------------------- #
+
+PROGRESS_FILE = "import_progress.json"
+REPORT_FILE = "import_report.json"
+DEFAULT_RUN_WORKERS = 4
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 5.0
+
+# terraform output that means the import may succeed if simply tried again.
+TRANSIENT_ERROR = re.compile(
+    r"Error acquiring the state lock|Too Many Requests|\b429\b|\b50[0234]\b|"
+    r"rate limit|timeout|connection reset",
+    re.IGNORECASE,
+)
+ALREADY_MANAGED = re.compile(r"Resource already managed by Terraform")
+WORKSPACE_MISSING = re.compile(r"workspace .* does not exist", re.IGNORECASE)
+
+class ImportProgress:
+    """
+    Addresses already imported, per workspace. Saved after every successful import so
+    that a later --run skips them.
+    """
+
+    def __init__(self, path=PROGRESS_FILE, reset=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = {}
+        if not reset and os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    self._done = {ws: set(addrs) for ws, addrs in json.load(f).items()}
+            except (OSError, ValueError):
+                self._done = {}
+
+    def done(self, workspace, address) -> bool:
+        with self._lock:
+            return address in self._done.get(workspace, ())
+
+    def record(self, workspace, address) -> None:
+        with self._lock:
+            self._done.setdefault(workspace, set()).add(address)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({ws: sorted(addrs) for ws, addrs in self._done.items()}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+def run_terraform_import(workspace, address, import_id, env, attempts=MAX_ATTEMPTS, delay=RETRY_DELAY):
+    """
+    Run `terraform import` for one resource in the given workspace, retrying transient
+    failures with exponential backoff. Returns (status, attempts used, error or None),
+    where status is "imported", "already managed" or "failed".
+    """
+    env = dict(env, TF_WORKSPACE=workspace)
+    cmd = ["terraform", "import", "-input=false", "-lock-timeout=60s", address, import_id]
+    for attempt in range(1, attempts + 1):
+        try:
+            result = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            return "failed", attempt, str(e)
+        if result.returncode == 0:
+            return "imported", attempt, None
+        output = result.stdout.decode() + result.stderr.decode()
+        if ALREADY_MANAGED.search(output):
+            return "already managed", attempt, None
+        error = result.stderr.decode().strip() or f"exit code {result.returncode}"
+        if not TRANSIENT_ERROR.search(output) or attempt == attempts:
+            return "failed", attempt, error
+        time.sleep(delay * 2 ** (attempt - 1))
+
+def run_network_imports(net_name, net_id, progress, env, attempts=MAX_ATTEMPTS, delay=RETRY_DELAY, existing=None):
+    """
+    Import every resource of one network into its workspace, one at a time (they share
+    the workspace state), skipping addresses recorded in progress by an earlier run.
+    Resources terraform reports as already managed are counted as skipped.
+    """
+    start = time.monotonic()
+    summary = {"network_id": net_id, "imported": [], "skipped": [], "failed": []}
+    for resource, key, import_id in collect_imports_for_network(net_name, net_id, existing):
+        address = import_address(resource, key)
+        if progress.done(net_name, address):
+            summary["skipped"].append(address)
+            continue
+        status, used, error = run_terraform_import(net_name, address, import_id, env, attempts, delay)
+        if error:
+            summary["failed"].append({"address": address, "attempts": used, "error": error})
+            if WORKSPACE_MISSING.search(error):
+                break
+            continue
+        progress.record(net_name, address)
+        summary["skipped" if status == "already managed" else "imported"].append(address)
+    summary["seconds"] = round(time.monotonic() - start, 1)
+    return net_name, summary
+
+def run_imports(network_id_map, workers=DEFAULT_RUN_WORKERS, attempts=MAX_ATTEMPTS, reset=False, existing=None):
+    """
+    Run the imports of all networks in a bounded pool of terraform processes, then
+    write REPORT_FILE and print a summary. Returns the number of failed imports.
+    existing ({net_name: addresses}) leaves out resources already in state.
+    """
+    existing = existing or {}
+    progress = ImportProgress(reset=reset)
+    env = os.environ.copy()
+    env.pop("TF_WORKSPACE", None)
+    print(f"Running imports for {len(network_id_map)} networks ({workers} in parallel)")
+
+    start = time.monotonic()
+    networks = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_network_imports, net_name, net_id, progress, env, attempts,
+                            existing=existing.get(net_name))
+            for net_name, net_id in network_id_map.items()
+        ]
+        for future in as_completed(futures):
+            net_name, summary = future.result()
+            networks[net_name] = summary
+            mark = "❌" if summary["failed"] else "✅"
+            print(f"{mark} {net_name}: {len(summary['imported'])} imported, {len(summary['skipped'])} already in state, "
+                  f"{len(summary['failed'])} failed ({summary['seconds']}s)")
+    elapsed = time.monotonic() - start
+
+    totals = {k: sum(len(n[k]) for n in networks.values()) for k in ("imported", "skipped", "failed")}
+    report = {
+        "elapsed_seconds": round(elapsed, 1),
+        "totals": totals,
+        "networks": {name: networks[name] for name in network_id_map if name in networks},
+    }
+    with open(REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Imported {totals['imported']} resources in {elapsed:.1f}s "
+          f"({totals['skipped']} already in state, {totals['failed']} failed). Report: {REPORT_FILE}")
+    for net_name, summary in report["networks"].items():
+        for failure in summary["failed"]:
+            print(f"  {net_name}: {failure['address']} failed after {failure['attempts']} attempt(s):\n"
+                  f"    {failure['error']}", file=sys.stderr)
+    return totals["failed"]
+
+# ----------------------------- Existing state ----------------------------- #
+
+def state_resource_addresses(resources):
+    """
+    Yield the instance addresses of the resources listed in a v4 state file.
+    """
+    for r in resources:
+        prefix = f"{r['module']}." if r.get("module") else ""
+        if r.get("mode") == "data":
+            prefix += "data."
+        base = f"{prefix}{r['type']}.{r['name']}"
+        for instance in r.get("instances", []):
+            key = instance.get("index_key")
+            yield base if key is None else f"{base}[{json.dumps(key)}]"
+
+def show_resource_addresses(module):
+    """
+    Yield the resource addresses in a `terraform show -json` module tree.
+    """
+    for r in module.get("resources", []):
+        yield r["address"]
+    for child in module.get("child_modules", []):
+        yield from show_resource_addresses(child)
+
+def uses_local_backend() -> bool:
+    """
+    True unless `terraform init` configured a non-local backend for this directory.
+    """
+    try:
+        with open(os.path.join(".terraform", "terraform.tfstate")) as f:
+            backend = json.load(f).get("backend") or {}
+    except (OSError, ValueError):
+        return True
+    return backend.get("type", "local") == "local"
+
+def workspace_state_path(workspace) -> str:
+    if workspace == "default":
+        return "terraform.tfstate"
+    return os.path.join("terraform.tfstate.d", workspace, "terraform.tfstate")
+
+def read_state_addresses(workspace, local=True, env=None) -> set:
+    """
+    Return the resource addresses already in a workspace's state: read from the
+    state file for the local backend, otherwise via `terraform show -json`.
+    """
+    if local:
+        path = workspace_state_path(workspace)
+        if not os.path.isfile(path):
+            return set()
+        with open(path) as f:
+            return set(state_resource_addresses(json.load(f).get("resources", [])))
+
+    env = dict(env or os.environ, TF_WORKSPACE=workspace)
+    result = subprocess.run(["terraform", "show", "-json"], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode:
+        print(f"Warning: could not read state of workspace '{workspace}': {result.stderr.decode().strip()}",
+              file=sys.stderr)
+        return set()
+    values = json.loads(result.stdout or b"{}").get("values") or {}
+    return set(show_resource_addresses(values.get("root_module") or {}))
+
+def load_existing_addresses(net_names, workers=DEFAULT_RUN_WORKERS) -> dict:
+    """
+    Read the state of every network's workspace once and return {net_name: addresses}.
+    Remote backends need one `terraform show` per workspace, so those run in parallel.
+    """
+    local = uses_local_backend()
+    with ThreadPoolExecutor(max_workers=1 if local else workers) as executor:
+        results = executor.map(lambda name: read_state_addresses(name, local), net_names)
+        existing = dict(zip(net_names, results))
+    print(f"Read state for {len(existing)} workspaces: {sum(map(len, existing.values()))} resources already managed")
+    return existing
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate Terraform imports for the Meraki workspaces.")
+    parser.add_argument(
+        "--mode", choices=("script", "blocks"), default="script",
+        help="script: one import_<network>.sh with a terraform import per resource (default); "
+             "blocks: Terraform import {} blocks, imported by a single plan/apply per workspace"
+    )
+    parser.add_argument(
+        "--per_network", action="store_true",
+        help="With --mode blocks, write imports_<network>.tf per network instead of one imports.tf"
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="Emit imports for every resource, including those already in the workspace state"
+    )
+    parser.add_argument(
+        "--run", action="store_true",
+        help="Run the per-resource imports after generating the scripts, one workspace per network"
+    )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=DEFAULT_RUN_WORKERS,
+        help=f"Networks imported in parallel with --run (default: {DEFAULT_RUN_WORKERS})"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=MAX_ATTEMPTS,
+        help=f"Attempts per resource on transient errors with --run (default: {MAX_ATTEMPTS})"
+    )
+    parser.add_argument(
+        "--reset", action="store_true",
+        help=f"With --run, ignore {PROGRESS_FILE} and import every resource again"
+    )
+    args = parser.parse_args()
+    if args.run and args.mode == "blocks":
+        parser.error("--run executes the per-resource imports; use --mode script "
+                     "(import blocks are applied with terraform apply in each workspace)")
+    return args
+
 def main():
+    args = parse_args()
     network_id_map = parse_network_id_map()
     if not network_id_map:
         print("No networks found in terraform.tfvars.", file=sys.stderr)
         sys.exit(1)
 
+    net_names = list(network_id_map)
+    existing = {} if args.all else load_existing_addresses(net_names, max(1, args.workers))
+
+    if args.mode == "blocks":
+        imports_by_network = {
+            net_name: collect_imports_for_network(net_name, net_id, existing.get(net_name))
+            for net_name, net_id in network_id_map.items()
+        }
+        blocks_by_network = {
+            net_name: render_import_blocks(net_name, imports)
+            for net_name, imports in imports_by_network.items() if imports
+        }
+        write_import_blocks(blocks_by_network, args.per_network)
+        print("Import with: terraform workspace select <network> && terraform apply -target=module.<network>")
+        return
+
     for net_name, net_id in network_id_map.items():
-        commands = generate_import_commands_for_network(net_name, net_id)
+        commands = generate_import_commands_for_network(net_name, net_id, existing.get(net_name))
         if commands:
             write_import_script(net_name, commands)
+        elif existing.get(net_name):
+            # Nothing left to import; don't leave a stale script that would re-import.
+            if os.path.isfile(f"import_{net_name}.sh"):
+                os.remove(f"import_{net_name}.sh")
+            print(f"All resources of network '{net_name}' are already in state. No import script needed.")
         else:
             print(f"No YAML data found for network '{net_name}'. Skipping import script generation.", file=sys.stderr)
 
+    if args.run:
+        failed = run_imports(network_id_map, max(1, args.workers), max(1, args.retries), args.reset, existing)
+        if failed:
+            sys.exit(1)
+
 if __name__ == "__main__":
     main()
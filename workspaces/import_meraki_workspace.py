@@ -21,7 +21,8 @@ The script will:
     4. For each network:
          - Fetch SSIDs, MX firewall rules, webhook servers, alert settings,
            VLANs from MX firewalls, VLANs from switches.
-         - Write each service’s data as a YAML file under data/<network_sanitized>/.
+         - Write each service’s data as a YAML (or, with --data_format json, JSON) file
+           under data/<network_sanitized>/.
     5. Scaffold a Terraform project under the output directory:
          - Create root files: provider.tf, variables.tf, terraform.tfvars, and a dynamically generated main.tf.
          - Create modules/shared_modules/<service> for each service with Terraform modules
@@ -29,42 +30,122 @@ The script will:
          - Create modules/<network_sanitized> for each network, invoking shared modules, each containing a provider.tf.
     6. Remove any existing Terraform lock file and .terraform directory.
     7. Initialize Terraform (using `terraform init -upgrade` to regenerate lock file).
-    8. Create a Terraform workspace for each network (named after sanitized network name).
+    8. Create a Terraform workspace for each network (named after sanitized network name),
+       running several terraform processes in parallel and skipping existing workspaces.
+       All terraform runs share a provider plugin cache (TF_PLUGIN_CACHE_DIR).
 
 After running:
     cd <output_dir>
     terraform workspace select <sanitized_network_name>
     terraform apply -target=module.<sanitized_network_name>
+
+Sharded mode (--shard_by count|tag|region):
+    Instead of one root main.tf for the whole organization, networks are split into
+    independent root stacks under stacks/<shard>/, each with its own provider
+    configuration, terraform.tfvars and state, so plan/apply time depends on the size of
+    a shard rather than of the organization. stacks/index.json records which stack owns
+    which network; a network keeps its stack across runs unless its tag/region changes.
+        cd <output_dir>/stacks/<shard>
+        terraform plan
+
+Several organizations (--all_orgs, or --org NAME|ID repeated):
+    Each organization gets its own project under <output_dir>/<organization>, generated
+    by its own process with its own --rate_limit budget, --org_workers at a time. A
+    combined summary is written to <output_dir>/orgs_summary.json.
 """
 
 import argparse
-import re
+import json
+import os
 import shutil
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import meraki
-import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import dashboard_scheduler
+import export_manifest
+import export_sinks
+from export_layout import sanitize_name
+import instrumentation
+import multi_org
+import network_filter
+import org_inventory
+import response_cache
+import serialization
 
 # ----------------------------- Helper Functions ----------------------------- #
 
-def sanitize_name(name: str) -> str:
+def write_data(data, path: Path, manifest=None, net_id=None, metrics=None) -> None:
     """
-    Sanitize network names into safe Terraform workspace/module identifiers:
-    lowercase, alphanumeric and underscores only, no leading digits.
+    Write a Python object to a file as YAML or JSON, depending on the file extension.
+    With an export manifest, the file is only rewritten when its content changed.
+    With a metrics recorder, the write is recorded (time, bytes, network).
     """
-    sanitized = re.sub(r"[^A-Za-z0-9_]+", "_", name).lower()
-    if re.match(r"^\d", sanitized):
-        sanitized = f"net_{sanitized}"
-    return sanitized
-
-def write_yaml(data, path: Path) -> None:
+    start = time.monotonic()
+    text = serialization.dump_data(data, serialization.format_for_path(path))
+    written = True
+    if manifest is not None:
+        written = manifest.write_text(path, text, net_id)
+    else:
+        with open(path, "w") as f:
+            f.write(text)
+    if metrics is not None:
+        metrics.record_write(path, net_id, time.monotonic() - start, len(text.encode("utf-8")), written)
+
+def export_network_data(dashboard, net: dict, network_data_dir: Path, data_format: str, manifest=None, metrics=None,
+                        sinks=None) -> list:
     """
-    Write a Python object to a file as YAML.
+    Fetch one network's services and write them under network_data_dir. A service
+    the Dashboard refuses (4xx) is written empty; one that fails otherwise (429,
+    5xx, timeout) keeps its previous file, or is written empty if there is none.
+    Each service is also passed to the extra output sinks, under its file name.
+    Returns the services that failed.
     """
-    with open(path, "w") as f:
-        yaml.safe_dump(data, f, sort_keys=False)
+    net_id = net["id"]
+    ensure_directory(network_data_dir)
+    sinks = sinks or export_sinks.SinkSet([])
+    sinks.record(net, "network", net)
+    failed = []
+
+    def export_service(name, fetch, empty):
+        path = network_data_dir / f"{name}.{data_format}"
+        try:
+            data = fetch()
+        except Exception as e:
+            if not dashboard_scheduler.refused(e):
+                failed.append(name)
+                if path.is_file():
+                    if sinks.active:
+                        sinks.record(net, name, serialization.load_file(str(path)))
+                    return
+            data = empty
+        write_data(data, path, manifest, net_id, metrics)
+        sinks.record(net, name, data)
+
+    def firewall_rules():
+        fw_rules = dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(net_id)
+        return fw_rules.get("rules", []) if isinstance(fw_rules, dict) else fw_rules
+
+    # 1. SSID data
+    export_service("ssids", lambda: dashboard.wireless.getNetworkWirelessSsids(net_id), [])
+
+    # 2. MX Firewall rules (L3)
+    export_service("firewall_rules", firewall_rules, [])
+
+    # 3. Webhook servers
+    export_service("webhook_servers", lambda: dashboard.networks.getNetworkWebhooksHttpServers(net_id), [])
+
+    # 4. Alert settings
+    export_service("alerts", lambda: dashboard.networks.getNetworkAlertsSettings(net_id), {})
+
+    # 5. VLANs from MX firewall
+    export_service("vlans_mx", lambda: dashboard.appliance.getNetworkApplianceVlans(net_id), [])
+    return failed
 
 def ensure_directory(path: Path) -> None:
     """
@@ -72,16 +153,224 @@ def ensure_directory(path: Path) -> None:
     """
     path.mkdir(parents=True, exist_ok=True)
 
-def run_subprocess(cmd, cwd=None):
+def run_subprocess(cmd, cwd=None, env=None):
     """
     Run a subprocess command; print stderr if it fails.
     """
     try:
-        subprocess.run(cmd, cwd=cwd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        subprocess.run(cmd, cwd=cwd, env=env, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     except subprocess.CalledProcessError as e:
         print(f"Command '{' '.join(cmd)}' failed with exit code {e.returncode}", file=sys.stderr)
         print(e.stderr.decode(), file=sys.stderr)
 
+def terraform_env(plugin_cache_dir: Path) -> dict:
+    """
+    Environment for terraform subprocesses sharing one provider plugin cache, so
+    providers are downloaded once instead of on every init.
+    """
+    ensure_directory(plugin_cache_dir)
+    env = os.environ.copy()
+    env["TF_PLUGIN_CACHE_DIR"] = str(plugin_cache_dir)
+    return env
+
+def list_workspaces(cwd, env=None) -> set:
+    """
+    Return the names of the Terraform workspaces that already exist in cwd.
+    """
+    try:
+        result = subprocess.run(
+            ["terraform", "workspace", "list"], cwd=cwd, env=env, check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Could not list Terraform workspaces: {e}", file=sys.stderr)
+        return set()
+    return {line.strip().lstrip("*").strip() for line in result.stdout.decode().splitlines() if line.strip()}
+
+def create_workspace(name: str, cwd, env=None):
+    """
+    Run `terraform workspace new <name>`; return (name, seconds, error or None).
+    """
+    start = time.monotonic()
+    try:
+        result = subprocess.run(
+            ["terraform", "workspace", "new", name], cwd=cwd, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        error = (result.stderr.decode().strip() or f"exit code {result.returncode}") if result.returncode else None
+    except OSError as e:
+        error = str(e)
+    return name, time.monotonic() - start, error
+
+def provision_workspaces(names, cwd, workers: int, env=None) -> None:
+    """
+    Create the missing workspaces in a bounded pool of terraform processes, skipping
+    those that already exist, then report timings and failures once at the end.
+    """
+    existing = list_workspaces(cwd, env)
+    pending = [name for name in names if name not in existing]
+    print(f"  {len(pending)} to create, {len(names) - len(pending)} already exist ({workers} in parallel)")
+
+    start = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(create_workspace, name, cwd, env) for name in pending]
+        for future in as_completed(futures):
+            results.append(future.result())
+    elapsed = time.monotonic() - start
+
+    failed = [r for r in results if r[2]]
+    print(f"  Created {len(results) - len(failed)} workspaces in {elapsed:.1f}s, {len(failed)} failed")
+    for name, seconds, _ in sorted(results, key=lambda r: r[1], reverse=True)[:5]:
+        print(f"    {name}: {seconds:.1f}s")
+    for name, seconds, error in failed:
+        print(f"  Workspace '{name}' failed after {seconds:.1f}s:\n    {error}", file=sys.stderr)
+
+# ----------------------------- Sharding ----------------------------- #
+
+SHARD_MODES = ("count", "tag", "region")
+DEFAULT_SHARDS = 4
+
+def shard_group(net: dict, shard_by: str) -> str:
+    """
+    Stack name for a network when sharding by tag (its first tag, alphabetically) or by
+    region (the continent part of its time zone, e.g. "America/Chicago" -> america).
+    """
+    if shard_by == "tag":
+        tags = sorted(net.get("tags") or [])
+        return sanitize_name(tags[0]) if tags else "untagged"
+    time_zone = net.get("timeZone") or ""
+    return sanitize_name(time_zone.split("/")[0]) if "/" in time_zone else "other"
+
+def load_stack_index(path: Path) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def assign_shards(networks: dict, shard_by: str, shards: int, previous: dict) -> dict:
+    """
+    Map each network name to its stack. networks is {sanitized_name: network object}.
+    With shard_by="count", networks are spread over `shards` stacks; a network keeps
+    the stack it had in the previous index and new networks go to the smallest stack,
+    so adding networks never moves existing state.
+    """
+    if shard_by != "count":
+        return {name: shard_group(net, shard_by) for name, net in networks.items()}
+
+    stack_names = [f"shard_{i:02d}" for i in range(1, shards + 1)]
+    previous_stacks = {
+        name: entry.get("stack") for name, entry in previous.get("networks", {}).items()
+        if previous.get("shard_by") == "count"
+    }
+    assignment = {}
+    sizes = {stack: 0 for stack in stack_names}
+    for name in networks:
+        stack = previous_stacks.get(name)
+        if stack in sizes:
+            assignment[name] = stack
+            sizes[stack] += 1
+    for name in sorted(networks):
+        if name not in assignment:
+            stack = min(stack_names, key=lambda s: (sizes[s], s))
+            assignment[name] = stack
+            sizes[stack] += 1
+    return assignment
+
+def module_blocks(names, source_prefix: str) -> str:
+    """
+    Root module blocks instantiating each network module without count.
+    """
+    main_tf_lines = []
+    for sanitized in names:
+        block = [
+            f'module "{sanitized}" {{',
+            f'  source     = "{source_prefix}/{sanitized}"',
+            f'  network_id = var.network_id_map["{sanitized}"]',
+            f'  meraki_api_key = var.meraki_api_key',
+            f'}}',
+            ""
+        ]
+        main_tf_lines.extend(block)
+    return "\n".join(main_tf_lines)
+
+def network_id_map_tfvars(names, network_map: dict) -> str:
+    network_id_map_literal = "{\n"
+    for sanitized in names:
+        network_id_map_literal += f'  "{sanitized}" = "{network_map[sanitized]}"\n'
+    network_id_map_literal += "}"
+    return f'network_id_map = {network_id_map_literal}\n'
+
+def write_stacks(stacks_root: Path, assignment: dict, network_map: dict, shard_by: str, previous: dict) -> dict:
+    """
+    Write one root stack per shard (main.tf, variables.tf, terraform.tfvars) and
+    stacks/index.json. Returns {stack: [network names]}.
+    """
+    stacks = {}
+    for name in network_map:
+        stacks.setdefault(assignment[name], []).append(name)
+
+    for stack, names in sorted(stacks.items()):
+        stack_dir = stacks_root / stack
+        ensure_directory(stack_dir)
+        with open(stack_dir / "variables.tf", "w") as f:
+            f.write(ROOT_VARIABLES_TF)
+        with open(stack_dir / "terraform.tfvars", "w") as f:
+            f.write(network_id_map_tfvars(names, network_map))
+        with open(stack_dir / "main.tf", "w") as f:
+            f.write("\n" + ROOT_PROVIDER_TF + module_blocks(names, "../../modules"))
+
+    for name, entry in previous.get("networks", {}).items():
+        if name in assignment and entry.get("stack") != assignment[name]:
+            print(f"Warning: network '{name}' moved from stack '{entry.get('stack')}' to '{assignment[name]}'; "
+                  f"move its resources with terraform state mv or re-import them.", file=sys.stderr)
+    for stack in sorted(set(previous.get("stacks", {})) - set(stacks)):
+        print(f"Warning: stack '{stack}' no longer owns any network; its directory was left in place.",
+              file=sys.stderr)
+
+    index = {
+        "shard_by": shard_by,
+        "stacks": {stack: names for stack, names in sorted(stacks.items())},
+        "networks": {name: {"stack": assignment[name], "network_id": network_map[name]} for name in network_map},
+    }
+    with open(stacks_root / "index.json", "w") as f:
+        json.dump(index, f, indent=2)
+    return stacks
+
+def init_stack(stack_dir: Path, env=None):
+    """
+    Run `terraform init` in a stack; return (stack, seconds, error or None).
+    """
+    start = time.monotonic()
+    try:
+        result = subprocess.run(
+            ["terraform", "init", "-upgrade", "-input=false"], cwd=str(stack_dir), env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        error = (result.stderr.decode().strip() or f"exit code {result.returncode}") if result.returncode else None
+    except OSError as e:
+        error = str(e)
+    return stack_dir.name, time.monotonic() - start, error
+
+def init_stacks(stack_dirs, workers: int, env=None) -> None:
+    """
+    Initialize every stack. The first init fills the shared plugin cache (which is not
+    safe for concurrent writes); the others then run in parallel and only link from it.
+    """
+    if not stack_dirs:
+        return
+    start = time.monotonic()
+    results = [init_stack(stack_dirs[0], env)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(init_stack, stack_dir, env) for stack_dir in stack_dirs[1:]]
+        for future in as_completed(futures):
+            results.append(future.result())
+    failed = [r for r in results if r[2]]
+    print(f"  Initialized {len(results) - len(failed)} stacks in {time.monotonic() - start:.1f}s, {len(failed)} failed")
+    for name, seconds, error in failed:
+        print(f"  Stack '{name}' failed after {seconds:.1f}s:\n    {error}", file=sys.stderr)
+
 # --------------------------- Terraform File Templates --------------------------- #
 
 # Updated root provider with version 1.1.3-beta
@@ -302,35 +591,35 @@ provider "meraki" {{
 module "ssids" {{
   source     = "../../modules/shared_modules/ssids"
   network_id = var.network_id
-  yaml_file  = "./data/{net_name}/ssids.yaml"
+  yaml_file  = "{data_dir}/{net_name}/ssids.{ext}"
   meraki_api_key = var.meraki_api_key
 }}
 
 #module "firewall" {{
   #source     = "../../modules/shared_modules/firewall"
   #network_id = var.network_id
-  #yaml_file  = "./data/{net_name}/firewall_rules.yaml"
+  #yaml_file  = "{data_dir}/{net_name}/firewall_rules.{ext}"
   #meraki_api_key = var.meraki_api_key
 #}}
 
 module "webhooks" {{
   source     = "../../modules/shared_modules/webhooks"
   network_id = var.network_id
-  yaml_file  = "./data/{net_name}/webhook_servers.yaml"
+  yaml_file  = "{data_dir}/{net_name}/webhook_servers.{ext}"
   meraki_api_key = var.meraki_api_key
 }}
 
 module "alerts" {{
   source     = "../../modules/shared_modules/alerts"
   network_id = var.network_id
-  yaml_file  = "./data/{net_name}/alerts.yaml"
+  yaml_file  = "{data_dir}/{net_name}/alerts.{ext}"
   meraki_api_key = var.meraki_api_key
 }}
 
 module "vlans_mx" {{
   source     = "../../modules/shared_modules/vlans_mx"
   network_id = var.network_id
-  yaml_file  = "./data/{net_name}/vlans_mx.yaml"
+  yaml_file  = "{data_dir}/{net_name}/vlans_mx.{ext}"
   meraki_api_key = var.meraki_api_key
 }}
 
@@ -346,25 +635,127 @@ def main():
         "--api_key", "-k", required=True, help="Meraki Dashboard API key"
     )
     parser.add_argument(
-        "--org_name", "-n", required=True, help="Name of the Meraki Organization"
+        "--org_name", "-n", help="Name of the Meraki Organization"
+    )
+    parser.add_argument(
+        "--org_id", help="ID of the Meraki Organization (instead of --org_name)"
     )
     parser.add_argument(
         "--output_dir",
         "-d",
         default="meraki_tf_project",
-        help="Directory to generate Terraform project in",
+        help="Directory to generate Terraform project in (with --all_orgs/--org: one project per "
+             "organization under <output_dir>/<organization>)",
+    )
+    parser.add_argument(
+        "--rate_limit",
+        "-r",
+        type=float,
+        default=dashboard_scheduler.DEFAULT_RATE,
+        help="Dashboard requests per second for this organization (default: 10)",
+    )
+    parser.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Only refetch networks changed since the last run and only rewrite changed YAML",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=None,
+        help=f"Directory of the on-disk response cache (default: <output_dir>/{response_cache.DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache_ttl",
+        type=int,
+        default=response_cache.DEFAULT_TTL,
+        help=f"Seconds a cached response stays fresh (default: {response_cache.DEFAULT_TTL})",
     )
+    parser.add_argument(
+        "--no_cache", action="store_true", help="Always call the Dashboard, bypassing the cache"
+    )
+    parser.add_argument(
+        "--data_format",
+        "-f",
+        choices=serialization.DATA_FORMATS,
+        default=serialization.DEFAULT_FORMAT,
+        help="Format of the exported data files; json is read with jsondecode (default: yaml)",
+    )
+    parser.add_argument(
+        "--workspace_workers",
+        type=int,
+        default=8,
+        help="Number of terraform workspace commands to run in parallel (default: 8)",
+    )
+    parser.add_argument(
+        "--metrics_file",
+        default=None,
+        help="JSON-lines record of every Dashboard call and data file write (default: <output_dir>/metrics.jsonl)",
+    )
+    network_filter.add_arguments(parser)
+    export_sinks.add_arguments(parser)
+    parser.add_argument(
+        "--shard_by",
+        choices=SHARD_MODES,
+        default=None,
+        help="Split networks into independent root stacks under stacks/ instead of one root main.tf",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=DEFAULT_SHARDS,
+        help=f"Number of stacks with --shard_by count (default: {DEFAULT_SHARDS})",
+    )
+    parser.add_argument(
+        "--plugin_cache_dir",
+        default=os.environ.get("TF_PLUGIN_CACHE_DIR", "~/.terraform.d/plugin-cache"),
+        help="Provider plugin cache shared across runs (default: $TF_PLUGIN_CACHE_DIR or ~/.terraform.d/plugin-cache)",
+    )
+    multi_org.add_arguments(parser)
     args = parser.parse_args()
+    multi_org.validate(parser, args)
+    selection = network_filter.from_args(args)
+    if args.rate_limit <= 0:
+        parser.error("--rate_limit must be positive")
+    if args.workspace_workers < 1:
+        parser.error("--workspace_workers must be at least 1")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
 
     api_key = args.api_key
     org_name = args.org_name
+    data_format = args.data_format
     output_dir = Path(args.output_dir).resolve()
     data_root = output_dir / "data"
     modules_root = output_dir / "modules"
     shared_modules_root = modules_root / "shared_modules"
 
-    print(f"Looking up organization '{org_name}' using provided API key...")
-    dashboard = meraki.DashboardAPI(api_key, output_log=False, print_console=False)
+    scheduler = dashboard_scheduler.RequestScheduler(default_rate=args.rate_limit)
+    dashboard = dashboard_scheduler.ScheduledDashboard(
+        meraki.DashboardAPI(api_key, output_log=False, print_console=False, wait_on_rate_limit=False),
+        scheduler,
+    )
+
+    if multi_org.active(args):
+        # One project per organization, each generated by its own process.
+        def launch_org(org, root):
+            cmd = [sys.executable, str(Path(__file__).resolve())] + multi_org.child_argv(valued=("--output_dir", "-d"))
+            return {"cmd": cmd + ["--org_id", str(org["id"]), "--output_dir", "."],
+                    "metrics": args.metrics_file or "metrics.jsonl"}
+
+        sys.exit(multi_org.export_organizations(args, dashboard, launch_org, str(output_dir)))
+
+    print(f"Looking up organization '{args.org_id or org_name}' using provided API key...")
+    ensure_directory(output_dir)
+    metrics_file = Path(args.metrics_file) if args.metrics_file else output_dir / "metrics.jsonl"
+    metrics = instrumentation.MetricsRecorder(metrics_file)
+    dashboard = instrumentation.InstrumentedDashboard(dashboard, metrics, scheduler)
+
+    cache = None
+    if not args.no_cache:
+        cache_dir = Path(args.cache_dir) if args.cache_dir else output_dir / response_cache.DEFAULT_CACHE_DIR
+        cache = response_cache.ResponseCache(cache_dir, namespace=api_key, default_ttl=args.cache_ttl)
+        dashboard = response_cache.CachedDashboard(dashboard, cache)
 
     try:
         orgs = dashboard.organizations.getOrganizations()
@@ -374,17 +765,23 @@ def main():
 
     org_id = None
     for org in orgs:
-        if org.get("name", "").lower() == org_name.lower():
+        if args.org_id:
+            matched = str(org.get("id")) == str(args.org_id)
+        else:
+            matched = org.get("name", "").lower() == org_name.lower()
+        if matched:
             org_id = org.get("id")
+            org_name = org.get("name")
             break
 
     if not org_id:
-        print(f"Organization '{org_name}' not found. Available organizations:", file=sys.stderr)
+        print(f"Organization '{args.org_id or org_name}' not found. Available organizations:", file=sys.stderr)
         for org in orgs:
             print(f"  - {org.get('name')} (ID: {org.get('id')})", file=sys.stderr)
         sys.exit(1)
 
     print(f"Matched organization '{org_name}' → ID: {org_id}")
+    dashboard = dashboard.for_org(org_id)
     print(f"Generating Terraform project in: {output_dir}")
 
     # Create base folders
@@ -392,16 +789,36 @@ def main():
     ensure_directory(data_root)
     ensure_directory(shared_modules_root)
 
-    print(f"Fetching networks for organization ID {org_id}...")
-    try:
-        networks = dashboard.organizations.getOrganizationNetworks(org_id)
-    except Exception as e:
-        print(f"Error fetching networks: {e}", file=sys.stderr)
-        sys.exit(1)
+    manifest = None
+    changed = None
+    if args.incremental:
+        manifest = export_manifest.ExportManifest(data_root / "manifest.json", org_id)
+        if cache is not None:
+            # Organization-wide listings must show the changes the change log reports.
+            cache.invalidate(org_id)
+        try:
+            changed = manifest.changed_networks(dashboard, org_id)
+        except Exception as e:
+            print(f"Error fetching configuration changes, refreshing all networks: {e}", file=sys.stderr)
 
-    # Build mapping: sanitized network name → network ID
-    network_map = {}
-    for net in networks:
+    # Networks are listed page by page; each selected network's data is fetched and
+    # written as soon as it is listed.
+    sinks = export_sinks.from_args(args, org_id, "workspace", org_name)
+
+    print(f"Fetching networks for organization ID {org_id}...")
+    networks = org_inventory.iter_networks(dashboard, org_id)
+    network_map = {}  # sanitized network name → network ID
+    network_info = {}
+    selected = {}  # networks whose data and modules are (re)generated in this run
+    refreshed = 0
+    while True:
+        try:
+            net = next(networks, None)
+        except Exception as e:
+            print(f"Error fetching networks: {e}", file=sys.stderr)
+            sys.exit(1)
+        if net is None:
+            break
         net_name = net.get("name", "")
         net_id = net.get("id")
         if not net_id or not net_name:
@@ -410,51 +827,56 @@ def main():
         if sanitized in network_map:
             sanitized = f"{sanitized}_{net_id}"
         network_map[sanitized] = net_id
+        network_info[sanitized] = net
 
-    # Fetch data and write YAML for each network
-    for sanitized, net_id in network_map.items():
-        print(f"Processing network '{sanitized}' (ID: {net_id})")
-        network_data_dir = data_root / sanitized
-        ensure_directory(network_data_dir)
-
-        # 1. SSID data
-        try:
-
-            ssids = dashboard.wireless.getNetworkWirelessSsids(net_id)
-
-        except Exception:
-            ssids = []
-        write_yaml(ssids, network_data_dir / "ssids.yaml")
-
-        # 2. MX Firewall rules (L3)
-        try:
-            fw_rules = dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(net_id)
-            fw_rules_list = fw_rules.get("rules", []) if isinstance(fw_rules, dict) else fw_rules
-        except Exception:
-            fw_rules_list = []
-        write_yaml(fw_rules_list, network_data_dir / "firewall_rules.yaml")
-
-        # 3. Webhook servers
-        try:
-            webhook_servers = dashboard.networks.getNetworkWebhooksHttpServers(net_id)
-        except Exception:
-            webhook_servers = []
-        write_yaml(webhook_servers, network_data_dir / "webhook_servers.yaml")
-
-        # 4. Alert settings
-        try:
-            alerts = dashboard.networks.getNetworkAlertsSettings(net_id)
-        except Exception:
-            alerts = {}
-        write_yaml(alerts, network_data_dir / "alerts.yaml")
-
-        # 5. VLANs from MX firewall
-        try:
-            vlans_mx = dashboard.appliance.getNetworkApplianceVlans(net_id)
-        except Exception:
-            vlans_mx = []
-        write_yaml(vlans_mx, network_data_dir / "vlans_mx.yaml")
+        if not selection.matches(net):
+            continue
+        selected[sanitized] = net_id
+        if manifest is not None:
+            if not manifest.needs_refresh(net_id, changed):
+                continue
+            if cache is not None:
+                # Changed networks must be read from the Dashboard, not from the cache.
+                cache.invalidate(net_id)
+        refreshed += 1
 
+        print(f"Processing network '{sanitized}' (ID: {net_id})")
+        failed = export_network_data(dashboard, net, data_root / sanitized, data_format, manifest, metrics, sinks)
+        if failed:
+            # Fetch the network again on the next run; its previous files are kept.
+            print(f"Failed to fetch {', '.join(failed)} for network '{sanitized}'", file=sys.stderr)
+            if manifest is not None:
+                manifest.forget(net_id)
+        elif manifest is not None:
+            manifest.mark_fetched(net_id)
+
+    print(f"Found {len(network_map)} networks")
+    sinks.close(network_map.values())
+    if args.inventory_file:
+        print(f"Inventory written to {args.inventory_file}")
+    if args.ansible_dir:
+        print(f"Ansible inventory written to {args.ansible_dir}")
+    if selection.active:
+        print(f"Filter ({selection.describe()}): {len(selected)} of {len(network_map)} networks selected")
+        # Networks generated by earlier runs stay in terraform.tfvars, main.tf and the
+        # stacks; their data and modules are left untouched.
+        network_map = {
+            name: net_id for name, net_id in network_map.items()
+            if name in selected or (modules_root / name).is_dir()
+        }
+    if manifest is not None:
+        print(f"Incremental export: {refreshed} of {len(selected)} networks changed since the last run")
+
+    if manifest is not None:
+        manifest.save(advance=not selection.active)
+
+    if cache is not None:
+        print(f"Response cache: {cache.hits} hits, {cache.misses} misses")
+
+    metrics.close()
+    print(f"Metrics ({metrics_file}):")
+    for line in metrics.summary_lines():
+        print(line)
 
     # ------------------- Create Shared Modules ------------------- #
     print("Scaffolding shared Terraform modules for services...")
@@ -466,9 +888,11 @@ def main():
         "vlans_mx": SHARED_MODULE_VLANS_MX_MAIN_TF,
     }
 
+    decode = serialization.decode_function(data_format)
     for svc_name, main_tf_content in services.items():
         svc_dir = shared_modules_root / svc_name
         ensure_directory(svc_dir)
+        main_tf_content = main_tf_content.replace("yamldecode(", f"{decode}(")
 
         # variables.tf inside shared module
         with open(svc_dir / "variables.tf", "w") as f:
@@ -480,7 +904,10 @@ def main():
 
     # ------------------- Create Network-specific Modules ------------------- #
     print("Scaffolding Terraform modules for each network...")
-    for sanitized, net_id in network_map.items():
+    # Data paths are resolved from the directory terraform runs in: the project root,
+    # or stacks/<shard>/ when sharded.
+    data_dir = "${path.root}/../../data" if args.shard_by else "./data"
+    for sanitized, net_id in selected.items():
         net_module_dir = modules_root / sanitized
         ensure_directory(net_module_dir)
 
@@ -490,40 +917,49 @@ def main():
             f.write('variable "meraki_api_key" {\n description = "Meraki API key"\n  type        = string\n}\n')
 
         # main.tf invokes shared modules (no count)
-        main_tf_filled = MODULE_NETWORK_MAIN_TF_TEMPLATE.format(net_name=sanitized)
+        main_tf_filled = MODULE_NETWORK_MAIN_TF_TEMPLATE.format(net_name=sanitized, ext=data_format, data_dir=data_dir)
         with open(net_module_dir / "main.tf", "w") as f:
             f.write(main_tf_filled)
 
+    tf_env = terraform_env(Path(args.plugin_cache_dir).expanduser())
+
+    if args.shard_by:
+        # ------------------- Create Sharded Root Stacks ------------------- #
+        stacks_root = output_dir / "stacks"
+        ensure_directory(stacks_root)
+        previous = load_stack_index(stacks_root / "index.json")
+        assignment = assign_shards({name: network_info[name] for name in network_map}, args.shard_by, args.shards, previous)
+        stacks = write_stacks(stacks_root, assignment, network_map, args.shard_by, previous)
+        print(f"Wrote {len(stacks)} root stacks by {args.shard_by} under {stacks_root} (index: stacks/index.json)")
+
+        print("Initializing Terraform in each stack...")
+        init_stacks(
+            [stacks_root / stack for stack in sorted(stacks) if any(name in selected for name in stacks[stack])],
+            args.workspace_workers, env=tf_env,
+        )
+        print(
+            f"""
+Project scaffold complete. Each stack has its own state; plan one with:
+  cd {stacks_root}/<stack>
+  terraform plan
+
+Find a network's stack in {stacks_root / "index.json"}.
+"""
+        )
+        return
+
     # ------------------- Create Root Terraform Files ------------------- #
     print("Writing root Terraform files (variables.tf, terraform.tfvars, main.tf)...")
 
     with open(output_dir / "variables.tf", "w") as f:
         f.write(ROOT_VARIABLES_TF)
 
-    # Build the map literal for terraform.tfvars
-    network_id_map_literal = "{\n"
-    for sanitized, net_id in network_map.items():
-        network_id_map_literal += f'  "{sanitized}" = "{net_id}"\n'
-    network_id_map_literal += "}"
-
     with open(output_dir / "terraform.tfvars", "w") as f:
-        f.write(f'network_id_map = {network_id_map_literal}\n')
+        f.write(network_id_map_tfvars(network_map, network_map))
 
     # Root main.tf: instantiate each module without count
-    main_tf_lines = []
-    for sanitized in network_map.keys():
-        block = [
-            f'module "{sanitized}" {{',
-            f'  source     = "./modules/{sanitized}"',
-            f'  network_id = var.network_id_map["{sanitized}"]',
-            f'  meraki_api_key = var.meraki_api_key',
-            f'}}',
-            ""
-        ]
-        main_tf_lines.extend(block)
-
     with open(output_dir / "main.tf", "w") as f:
-        f.write("\n" + ROOT_PROVIDER_TF + "\n".join(main_tf_lines))
+        f.write("\n" + ROOT_PROVIDER_TF + module_blocks(network_map, "./modules"))
 
     # ------------------- Clean up old Terraform state and lock files ------------------- #
     lockfile = output_dir / ".terraform.lock.hcl"
@@ -538,12 +974,10 @@ def main():
 
     # ------------------- Initialize Terraform and Create Workspaces ------------------- #
     print("Initializing Terraform (with –upgrade to regenerate lock file)...")
-    run_subprocess(["terraform", "init", "-upgrade", "-input=false"], cwd=str(output_dir))
+    run_subprocess(["terraform", "init", "-upgrade", "-input=false"], cwd=str(output_dir), env=tf_env)
 
     print("Creating Terraform workspaces for each network...")
-    for sanitized in network_map.keys():
-        print(f"  - Workspace: {sanitized}")
-        run_subprocess(["terraform", "workspace", "new", sanitized], cwd=str(output_dir))
+    provision_workspaces(list(selected.keys()), str(output_dir), args.workspace_workers, env=tf_env)
 
     print("All workspaces created. Project scaffold complete.")
     print(